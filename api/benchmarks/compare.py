@@ -0,0 +1,87 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+# Keys of a latency summary (see run.summarize) that are worth comparing
+LATENCY_KEYS = {"mean", "p50", "p90", "p99", "max"}
+
+
+def metrics(node, prefix: str = "") -> Iterator[Tuple[str, float, bool]]:
+    """
+    Flatten a scenario report into comparable metrics
+
+    Yields:
+        Tuple[str, float, bool]: Dotted name, value and whether higher is better
+    """
+    for key, value in node.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from metrics(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            if key.endswith("_per_second"):
+                yield name, float(value), True
+            elif key in LATENCY_KEYS or key == "errors":
+                yield name, float(value), False
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float) -> Tuple[list, int]:
+    """
+    Compare two run.py reports
+
+    Args:
+        baseline: Report of the reference commit
+        candidate: Report of the commit under test
+        threshold: Relative change (e.g. 0.1 for 10%) that counts as a regression
+
+    Returns:
+        Tuple[list, int]: Table rows and the number of regressions
+    """
+    base = {name: (value, higher) for name, value, higher in metrics(baseline["scenarios"])}
+    rows = []
+    regressions = 0
+    for name, value, higher_is_better in metrics(candidate["scenarios"]):
+        if name not in base:
+            continue
+        before = base[name][0]
+        change = (value - before) / before if before else (0.0 if value == before else float("inf"))
+        worse = -change if higher_is_better else change
+        status = ""
+        if worse > threshold:
+            status = "REGRESSION"
+            regressions += 1
+        elif worse < -threshold:
+            status = "improved"
+        rows.append((name, before, value, change, status))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change that counts as a regression (default: 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 when any metric regressed")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    rows, regressions = compare(baseline, candidate, args.threshold)
+
+    print(f"baseline:  {(baseline.get('commit') or '?')[:10]}{' (dirty)' if baseline.get('dirty') else ''}")
+    print(f"candidate: {(candidate.get('commit') or '?')[:10]}{' (dirty)' if candidate.get('dirty') else ''}")
+    width = max((len(row[0]) for row in rows), default=10)
+    print(f"{'metric':<{width}}  {'baseline':>12}  {'candidate':>12}  {'change':>8}")
+    for name, before, after, change, status in rows:
+        print(f"{name:<{width}}  {before:>12.4f}  {after:>12.4f}  {change:>+8.1%}  {status}")
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+
+    if args.fail_on_regression and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
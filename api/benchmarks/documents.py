@@ -0,0 +1,71 @@
+import random
+from typing import List
+
+_WORDS = (
+    "retrieval augmented generation vector store embedding chunk session history "
+    "question answer document index latency throughput model token context prompt "
+    "database cache stream server client request response memory search query file"
+).split()
+
+
+def make_text(rng: random.Random, lines: int = 40, words_per_line: int = 12) -> str:
+    """Random prose built from a small vocabulary, so questions hit real chunks"""
+    return "\n".join(
+        " ".join(rng.choice(_WORDS) for _ in range(words_per_line))
+        for _ in range(lines)
+    )
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """
+    Build a minimal, valid PDF with one text page per entry
+
+    Only the standard Helvetica font and plain text operators are used,
+    which is all PyPDFLoader needs to extract the text again.
+
+    Args:
+        pages: Text of each page, lines separated by newlines
+
+    Returns:
+        bytes: The PDF file
+    """
+    font_ref = 3 + 2 * len(pages)
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode(),
+    ]
+
+    for i, text in enumerate(pages):
+        operators = []
+        for j, line in enumerate(text.split("\n")):
+            line = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            operators.append(f"BT /F1 10 Tf 40 {800 - 12 * j} Td ({line}) Tj ET")
+        stream = "\n".join(operators).encode("latin-1", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 {font_ref} 0 R >> >> /Contents {4 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def make_document(rng: random.Random, pages: int = 5) -> bytes:
+    """Random PDF document with the given number of pages"""
+    return make_pdf([make_text(rng) for _ in range(pages)])
+
+
+def make_question(rng: random.Random, words: int = 8) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)) + "?"
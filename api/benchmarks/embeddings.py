@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.documents import make_question, make_text
+from benchmarks.fake_ollama import FakeOllama, add_config_arguments, config_from_arguments
+from benchmarks.run import RESULTS_DIR, git_revision, summarize
+
+
+def create_backend(name: str, args: argparse.Namespace, ollama_url: Optional[str]) -> Embeddings:
+    from src.config import settings
+    from src.services.embeddings import OnnxEmbeddings
+
+    if name == "ollama":
+        from langchain_ollama import OllamaEmbeddings
+        return OllamaEmbeddings(model=settings.EMBEDDING_MODEL, base_url=ollama_url)
+    return OnnxEmbeddings(
+        model_dir=args.model_dir or Path(settings.MODEL_CACHE) / settings.ONNX_EMBEDDING_MODEL,
+        batch_size=args.batch_size,
+        max_wait_ms=args.batch_wait_ms,
+        max_length=settings.ONNX_MAX_LENGTH,
+        intra_op_threads=args.threads
+    )
+
+
+async def bench_backend(embeddings: Embeddings, args: argparse.Namespace) -> Dict:
+    """
+    Throughput of document embedding (one call per uploaded file, like the
+    indexer) and latency of concurrent query embeddings (like chat requests)
+    """
+    rng = random.Random(args.seed)
+    files = [
+        [make_text(rng, lines=8) for _ in range(args.chunks_per_file)]
+        for _ in range(args.files)
+    ]
+    queries = [make_question(rng) for _ in range(args.queries)]
+
+    # Warm up connections / the inference session
+    await embeddings.aembed_query(queries[0])
+
+    start = time.perf_counter()
+    for chunks in files:
+        await asyncio.to_thread(embeddings.embed_documents, chunks)
+    document_duration = time.perf_counter() - start
+    chunk_count = sum(len(chunks) for chunks in files)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+
+    async def query(text: str):
+        async with semaphore:
+            started = time.perf_counter()
+            await embeddings.aembed_query(text)
+            latencies.append(time.perf_counter() - started)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(query(text) for text in queries))
+    query_duration = time.perf_counter() - start
+
+    return {
+        "chunks": chunk_count,
+        "chunks_per_second": round(chunk_count / document_duration, 3),
+        "queries": len(latencies),
+        "concurrency": args.concurrency,
+        "queries_per_second": round(len(latencies) / query_duration, 3),
+        "query_latency": summarize(latencies),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> Dict:
+    report = {
+        **git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {key: str(value) for key, value in vars(args).items() if key != "output"},
+        "scenarios": {},
+    }
+
+    fake_ollama = None
+    ollama_url = args.ollama_url
+    if "ollama" in args.backends and not ollama_url:
+        fake_ollama = FakeOllama(config=config_from_arguments(args)).start()
+        ollama_url = fake_ollama.url
+        report["fake_ollama"] = fake_ollama.config.to_dict()
+    try:
+        for name in args.backends:
+            print(f"Benchmarking {name} ...", flush=True)
+            embeddings = create_backend(name, args, ollama_url)
+            report["scenarios"][f"embeddings_{name}"] = await bench_backend(embeddings, args)
+    finally:
+        if fake_ollama is not None:
+            fake_ollama.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare embedding backends. Run from the api/ directory: python -m benchmarks.embeddings"
+    )
+    parser.add_argument("--backends", nargs="+", choices=["ollama", "onnx"], default=["ollama", "onnx"])
+    parser.add_argument("--ollama-url", help="Real Ollama to benchmark (default: start a fake one)")
+    parser.add_argument("--model-dir", type=Path, help="ONNX model directory (default: MODEL_CACHE/ONNX_EMBEDDING_MODEL)")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads")
+    parser.add_argument("--batch-size", type=int, default=32, help="ONNX max texts per inference run")
+    parser.add_argument("--batch-wait-ms", type=float, default=2.0, help="ONNX batching window")
+    parser.add_argument("--files", type=int, default=10, help="Files embedded in the document phase")
+    parser.add_argument("--chunks-per-file", type=int, default=50, help="Chunks per file")
+    parser.add_argument("--queries", type=int, default=500, help="Query embeddings in the query phase")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent query embeddings")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/)")
+    add_config_arguments(parser.add_argument_group("fake Ollama (without --ollama-url)"))
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-embeddings-{(report['commit'] or 'unknown')[:10]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+
+    print(json.dumps(report["scenarios"], indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import hashlib
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+class FakeOllamaConfig:
+    """
+    Latency model of the fake Ollama server
+
+    Args:
+        embed_latency: Seconds added to every /api/embed call
+        embed_latency_per_input: Seconds added per embedded text
+        first_token_latency: Seconds before the first chat token
+        tokens_per_second: Chat token rate after the first token (0 = no delay)
+        answer_tokens: Tokens per chat answer
+        dimensions: Embedding size
+    """
+
+    def __init__(
+        self,
+        embed_latency: float = 0.005,
+        embed_latency_per_input: float = 0.001,
+        first_token_latency: float = 0.05,
+        tokens_per_second: float = 100.0,
+        answer_tokens: int = 32,
+        dimensions: int = 256
+    ):
+        self.embed_latency = embed_latency
+        self.embed_latency_per_input = embed_latency_per_input
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.dimensions = dimensions
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def embed_text(text: str, dimensions: int) -> List[float]:
+    """
+    Deterministic bag-of-words embedding
+
+    Each word is hashed into one dimension, so texts sharing words end up
+    close to each other and retrieval results are stable across runs.
+    """
+    vector = [0.0] * dimensions
+    for word in text.lower().split():
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        vector[int.from_bytes(digest, "little") % dimensions] += 1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _make_handler(config: FakeOllamaConfig):
+    class FakeOllamaHandler(BaseHTTPRequestHandler):
+        """Implements the Ollama endpoints used by OllamaEmbeddings and ChatOllama"""
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload: dict, status: int = 200):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _write_chunk(self, payload: dict):
+            data = (json.dumps(payload) + "\n").encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/api/version":
+                self._send_json({"version": "0.0.0-fake"})
+            elif self.path == "/api/tags":
+                self._send_json({"models": []})
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path == "/api/embed":
+                inputs = body.get("input") or []
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                time.sleep(config.embed_latency + config.embed_latency_per_input * len(inputs))
+                self._send_json({
+                    "model": body.get("model"),
+                    "embeddings": [embed_text(text, config.dimensions) for text in inputs]
+                })
+            elif self.path == "/api/chat":
+                self._chat(body)
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def _chat(self, body: dict):
+            model = body.get("model")
+            tokens = [f"token{i} " for i in range(config.answer_tokens)]
+            delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+            def message(content: str, done: bool) -> dict:
+                payload = {
+                    "model": model,
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "message": {"role": "assistant", "content": content},
+                    "done": done
+                }
+                if done:
+                    payload.update(done_reason="stop", eval_count=len(tokens))
+                return payload
+
+            time.sleep(config.first_token_latency)
+            if body.get("stream") is False:
+                time.sleep(delay * max(len(tokens) - 1, 0))
+                self._send_json(message("".join(tokens), True))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for i, token in enumerate(tokens):
+                    if i and delay:
+                        time.sleep(delay)
+                    self._write_chunk(message(token, False))
+                self._write_chunk(message("", True))
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The API aborted generation, e.g. because its client disconnected
+                self.close_connection = True
+
+    return FakeOllamaHandler
+
+
+class FakeOllama:
+    """
+    Local stand-in for the Ollama HTTP API
+
+    Serves /api/embed and /api/chat (streaming and non-streaming) with a
+    configurable latency model, so the API can be benchmarked without a
+    GPU or real models. Point the API at it with OLLAMA_HOST.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[FakeOllamaConfig] = None):
+        self.config = config or FakeOllamaConfig()
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self.config))
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port"""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Add the latency model options to a command line parser"""
+    defaults = FakeOllamaConfig()
+    parser.add_argument("--embed-latency", type=float, default=defaults.embed_latency,
+                        help="Seconds per /api/embed call")
+    parser.add_argument("--embed-latency-per-input", type=float, default=defaults.embed_latency_per_input,
+                        help="Extra seconds per embedded text")
+    parser.add_argument("--first-token-latency", type=float, default=defaults.first_token_latency,
+                        help="Seconds before the first chat token")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second,
+                        help="Chat token rate, 0 streams without delay")
+    parser.add_argument("--answer-tokens", type=int, default=defaults.answer_tokens,
+                        help="Tokens per chat answer")
+    parser.add_argument("--dimensions", type=int, default=defaults.dimensions,
+                        help="Embedding size")
+
+
+def config_from_arguments(args: argparse.Namespace) -> FakeOllamaConfig:
+    return FakeOllamaConfig(
+        embed_latency=args.embed_latency,
+        embed_latency_per_input=args.embed_latency_per_input,
+        first_token_latency=args.first_token_latency,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        dimensions=args.dimensions
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeOllama(args.host, args.port, config_from_arguments(args))
+    print(f"Fake Ollama listening on {server.url}", flush=True)
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
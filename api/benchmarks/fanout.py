@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.documents import make_question, make_text
+from benchmarks.fake_ollama import FakeOllama, add_config_arguments, config_from_arguments
+from benchmarks.run import RESULTS_DIR, git_revision, summarize
+
+
+def bench_fanout(args: argparse.Namespace, workdir: Path) -> Dict:
+    """
+    Retrieval latency and result diversity over sessions of growing file
+    counts: one `$in` filtered search, the same search over-fetched with a
+    per-file cap, and the capped search with its follow-up searches. The first --dominant-files files hold
+    --dominant-chunks one-line chunks each, so they crowd the other files
+    out of a plain search.
+    """
+    from langchain_core.documents import Document
+    from src.config import settings
+    from src.services.indexer import Indexer
+
+    rng = random.Random(args.seed)
+    settings.PERSIST_DIR = workdir / "chroma"
+    indexer = Indexer()
+    indexer.initialize()
+
+    file_ids = [f"bench-{f}" for f in range(max(args.file_counts))]
+    total_chunks = 0
+    for f, file_id in enumerate(file_ids):
+        # Dominant files: many one-line chunks, which sit closer to short questions
+        dominant = f < args.dominant_files
+        chunks = args.dominant_chunks if dominant else args.chunks_per_file
+        total_chunks += chunks
+        indexer.add_documents([
+            Document(
+                page_content=make_text(rng, lines=1 if dominant else 8),
+                metadata={"file_id": file_id, "chunk_index": i}
+            )
+            for i in range(chunks)
+        ])
+    embeddings = indexer.embedding_model.embed_documents([make_question(rng) for _ in range(args.queries)])
+
+    def measure(search, scope: List[str]) -> Dict:
+        latencies = []
+        distinct_files = []
+        for embedding in embeddings:
+            start = time.perf_counter()
+            hits = search([embedding], scope)[0]
+            latencies.append(time.perf_counter() - start)
+            distinct_files.append(len({document.metadata["file_id"] for document, _ in hits}))
+        return {"latency": summarize(latencies), "distinct_files": round(statistics.fmean(distinct_files), 2)}
+
+    def overfetch_only(embeddings: List[List[float]], scope: List[str]) -> List[List]:
+        # The per-file cap over a single over-fetched search, without follow-up searches
+        capped = []
+        for hits in indexer.search_by_vectors(embeddings, args.k * args.overfetch, scope):
+            taken: Dict[str, int] = {}
+            kept = []
+            for document, distance in hits:
+                file_id = document.metadata["file_id"]
+                if len(kept) < args.k and taken.get(file_id, 0) < args.per_file_k:
+                    taken[file_id] = taken.get(file_id, 0) + 1
+                    kept.append((document, distance))
+            capped.append(kept)
+        return capped
+
+    results = {}
+    for count in args.file_counts:
+        scope = file_ids[:count]
+        results[str(count)] = {
+            "global": measure(lambda e, s: indexer.search_by_vectors(e, args.k, s), scope),
+            "overfetch_only": measure(overfetch_only, scope),
+            "capped": measure(
+                lambda e, s: indexer.search_by_vectors_capped(e, args.k, s, args.per_file_k, args.overfetch), scope
+            ),
+        }
+    return {
+        "chunks": total_chunks,
+        "partitioning": settings.VECTOR_STORE_PARTITIONING,
+        "file_counts": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare a single filtered search with a search capped per file. "
+                    "Run from the api/ directory: python -m benchmarks.fanout"
+    )
+    parser.add_argument("--file-counts", type=int, nargs="+", default=[2, 8, 32, 64], help="Files per session")
+    parser.add_argument("--chunks-per-file", type=int, default=20, help="Chunks per file")
+    parser.add_argument("--dominant-files", type=int, default=2, help="Files with --dominant-chunks chunks instead")
+    parser.add_argument("--dominant-chunks", type=int, default=400, help="Chunks of each dominant file")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per file count and strategy")
+    parser.add_argument("--k", type=int, default=3, help="Results per query")
+    parser.add_argument("--per-file-k", type=int, default=1, help="Results one file may contribute when capped")
+    parser.add_argument("--overfetch", type=int, default=4, help="Candidates fetched per result when capped")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/)")
+    add_config_arguments(parser.add_argument_group("fake Ollama"))
+    args = parser.parse_args()
+
+    fake_ollama = FakeOllama(config=config_from_arguments(args)).start()
+    os.environ["OLLAMA_HOST"] = fake_ollama.url
+    report = {
+        **git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {key: str(value) for key, value in vars(args).items() if key != "output"},
+        "fake_ollama": fake_ollama.config.to_dict(),
+    }
+    try:
+        with tempfile.TemporaryDirectory(prefix="rag-fanout-") as workdir:
+            report["scenarios"] = {"fanout": bench_fanout(args, Path(workdir))}
+    finally:
+        fake_ollama.stop()
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-fanout-{(report['commit'] or 'unknown')[:10]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+
+    print(json.dumps(report["scenarios"], indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from benchmarks.run import API_ROOT
+
+# Imported in a fresh interpreter; prints import and lifespan startup times as JSON
+_PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+from src.__main__ import app
+imported = time.perf_counter()
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+started = asyncio.run(startup())
+print(json.dumps({"import": imported - start, "startup": started - imported}))
+"""
+
+# Modules that must not be imported just by importing the app
+HEAVY_MODULES = ("langchain_community", "langchain_chroma", "chromadb", "pypdf", "onnxruntime")
+
+
+def probe(env: Dict[str, str]) -> Dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=env["BENCH_WORKDIR"], env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env: Dict[str, str], top: int) -> Tuple[List[Tuple[str, float]], List[str]]:
+    """
+    Run `python -X importtime` on the app import
+
+    Returns:
+        Tuple: The `top` modules by cumulative import time (seconds), and any
+        HEAVY_MODULES that were imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.__main__"],
+        cwd=env["BENCH_WORKDIR"], env=env, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(cumulative) / 1e6))
+    heavy = sorted({name.split(".")[0] for name, _ in modules if name.split(".")[0] in HEAVY_MODULES})
+    return sorted(modules, key=lambda m: m[1], reverse=True)[:top], heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report import and startup time of src.__main__:app and check them against a budget. "
+                    "Run from the api/ directory: python -m benchmarks.import_time. "
+                    "Not run automatically: a manual check, exits with status 1 when over budget"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--import-budget", type=float, default=1.5, help="Max median import seconds")
+    parser.add_argument("--startup-budget", type=float, default=1.0, help="Max median lifespan startup seconds")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rag-import-") as workdir:
+        env = dict(os.environ)
+        env.update(
+            PYTHONPATH=os.pathsep.join(filter(None, [str(API_ROOT), env.get("PYTHONPATH")])),
+            DB_NAME=str(Path(workdir) / "rag.db"),
+            PERSIST_DIR=str(Path(workdir) / "chroma"),
+            WARMUP_ON_STARTUP="False",
+            LOG_LEVEL="WARNING",
+            BENCH_WORKDIR=workdir,
+        )
+        runs = [probe(env) for _ in range(args.runs)]
+        top, heavy = slowest_imports(env, args.top)
+
+    import_median = statistics.median(run["import"] for run in runs)
+    startup_median = statistics.median(run["startup"] for run in runs)
+
+    print(f"{'module':<50} {'cumulative':>10}")
+    for name, seconds in top:
+        print(f"{name:<50} {seconds:>9.3f}s")
+    print()
+    print(f"import  median {import_median:.3f}s  (budget {args.import_budget:.3f}s)")
+    print(f"startup median {startup_median:.3f}s  (budget {args.startup_budget:.3f}s)")
+
+    failures = []
+    if import_median > args.import_budget:
+        failures.append("import time over budget")
+    if startup_median > args.startup_budget:
+        failures.append("startup time over budget")
+    if heavy:
+        failures.append(f"heavy modules imported eagerly: {', '.join(heavy)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
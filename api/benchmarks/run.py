@@ -0,0 +1,462 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.documents import make_document, make_question
+from benchmarks.fake_ollama import FakeOllama, add_config_arguments, config_from_arguments
+
+API_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+Scenario = Callable[["BenchContext"], Awaitable[Dict]]
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(name: str):
+    """Register a benchmark scenario under name"""
+    def register(func: Scenario) -> Scenario:
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+class BenchContext:
+    """State shared by the scenarios of one benchmark run"""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.rng = random.Random(args.seed)
+
+
+def summarize(samples: List[float]) -> Dict:
+    """
+    Latency summary of samples in seconds
+
+    Percentiles use linear interpolation between closest ranks.
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(q: float) -> float:
+        position = (len(ordered) - 1) * q
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    return {
+        "count": len(ordered),
+        "min": round(ordered[0], 6),
+        "mean": round(sum(ordered) / len(ordered), 6),
+        "p50": round(percentile(0.50), 6),
+        "p90": round(percentile(0.90), 6),
+        "p99": round(percentile(0.99), 6),
+        "max": round(ordered[-1], 6),
+    }
+
+
+async def upload_document(ctx: BenchContext, content: bytes, name: str, session_id: Optional[str] = None) -> Dict:
+    params = {"session_id": session_id} if session_id else None
+    response = await ctx.client.post(
+        "/documents/upload",
+        params=params,
+        files={"file": (name, content, "application/pdf")}
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def stream_answer(ctx: BenchContext, session_id: str, question: str) -> Tuple[float, float]:
+    """
+    Ask one question over /chat/stream
+
+    Returns:
+        Tuple[float, float]: Time to the first answer text and total time, in seconds
+    """
+    start = time.perf_counter()
+    first_token = None
+    async with ctx.client.stream(
+        "POST",
+        "/chat/stream",
+        json={"question": question, "session_id": session_id}
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line.startswith("data:") and json.loads(line[5:]).get("answer"):
+                first_token = time.perf_counter() - start
+    total = time.perf_counter() - start
+    if first_token is None:
+        raise RuntimeError("stream ended without an answer")
+    return first_token, total
+
+
+async def create_sessions(ctx: BenchContext, count: int) -> List[str]:
+    """Create sessions with one small document each (not timed)"""
+    uploads = await asyncio.gather(*(
+        upload_document(ctx, make_document(ctx.rng, pages=1), f"session-{i}.pdf")
+        for i in range(count)
+    ))
+    return [upload["session_id"] for upload in uploads]
+
+
+async def run_users(ctx: BenchContext, session_ids: List[str], requests_per_user: int) -> Dict:
+    """Every session streams requests_per_user questions in a row, all sessions concurrently"""
+    ttft: List[float] = []
+    totals: List[float] = []
+    errors = 0
+
+    async def user(session_id: str):
+        nonlocal errors
+        for _ in range(requests_per_user):
+            try:
+                first, total = await stream_answer(ctx, session_id, make_question(ctx.rng))
+                ttft.append(first)
+                totals.append(total)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(session_id) for session_id in session_ids))
+    duration = time.perf_counter() - start
+    return {
+        "users": len(session_ids),
+        "requests": len(totals),
+        "errors": errors,
+        "duration": round(duration, 3),
+        "requests_per_second": round(len(totals) / duration, 3) if duration else 0.0,
+        "ttft": summarize(ttft),
+        "latency": summarize(totals),
+    }
+
+
+@scenario("upload")
+async def upload_scenario(ctx: BenchContext) -> Dict:
+    """/documents/upload throughput with `--upload-concurrency` uploads in flight"""
+    args = ctx.args
+    documents = [make_document(ctx.rng, pages=args.pages) for _ in range(args.uploads)]
+    semaphore = asyncio.Semaphore(args.upload_concurrency)
+    latencies: List[float] = []
+    chunks = 0
+    errors = 0
+
+    async def upload(index: int, content: bytes):
+        nonlocal chunks, errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await upload_document(ctx, content, f"bench-{index}.pdf")
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            chunks += result["chunks_created"]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(i, content) for i, content in enumerate(documents)))
+    duration = time.perf_counter() - start
+    return {
+        "files": len(latencies),
+        "pages_per_file": args.pages,
+        "concurrency": args.upload_concurrency,
+        "chunks": chunks,
+        "errors": errors,
+        "duration": round(duration, 3),
+        "files_per_second": round(len(latencies) / duration, 3),
+        "chunks_per_second": round(chunks / duration, 3),
+        "bytes_per_second": round(sum(len(d) for d in documents) / duration, 1),
+        "latency": summarize(latencies),
+    }
+
+
+@scenario("stream")
+async def stream_scenario(ctx: BenchContext) -> Dict:
+    """/chat/stream time-to-first-token and latency at `--users` concurrent users"""
+    session_ids = await create_sessions(ctx, ctx.args.users)
+    # Warm up model clients and the vector store
+    await stream_answer(ctx, session_ids[0], make_question(ctx.rng))
+    return await run_users(ctx, session_ids, ctx.args.requests)
+
+
+@scenario("history")
+async def history_scenario(ctx: BenchContext) -> Dict:
+    """
+    Sessions with long histories: chat latency once the history window is
+    full, paging through the whole history and exporting it as NDJSON
+    """
+    args = ctx.args
+    session_ids = await create_sessions(ctx, args.users)
+
+    async def seed(session_id: str):
+        for _ in range(args.history_turns):
+            await stream_answer(ctx, session_id, make_question(ctx.rng))
+
+    seed_start = time.perf_counter()
+    await asyncio.gather(*(seed(session_id) for session_id in session_ids))
+    seed_duration = time.perf_counter() - seed_start
+
+    chat = await run_users(ctx, session_ids, args.requests)
+
+    page_latencies: List[float] = []
+    export_latencies: List[float] = []
+    messages_paged = 0
+    for session_id in session_ids:
+        before = None
+        while True:
+            params = {"session_id": session_id, "limit": args.history_page_size}
+            if before:
+                params["before"] = before
+            start = time.perf_counter()
+            response = await ctx.client.post("/chat/history", params=params)
+            response.raise_for_status()
+            page_latencies.append(time.perf_counter() - start)
+            page = response.json()
+            messages_paged += len(page["messages"])
+            before = page.get("next_before")
+            if not before:
+                break
+
+        start = time.perf_counter()
+        async with ctx.client.stream(
+            "POST", "/chat/history", params={"session_id": session_id, "format": "ndjson"}
+        ) as response:
+            response.raise_for_status()
+            async for _ in response.aiter_lines():
+                pass
+        export_latencies.append(time.perf_counter() - start)
+
+    return {
+        "sessions": len(session_ids),
+        "turns_per_session": args.history_turns,
+        "seed_duration": round(seed_duration, 3),
+        "chat": chat,
+        "messages_paged": messages_paged,
+        "history_page": summarize(page_latencies),
+        "history_export": summarize(export_latencies),
+    }
+
+
+@scenario("batch")
+async def batch_scenario(ctx: BenchContext) -> Dict:
+    """
+    `--batch-size` questions over one session's files: one /chat/batch
+    request versus the same questions sent to /chat one at a time
+    """
+    args = ctx.args
+    session_id = (await create_sessions(ctx, 1))[0]
+    questions = [make_question(ctx.rng) for _ in range(args.batch_size)]
+
+    start = time.perf_counter()
+    for question in questions:
+        response = await ctx.client.post("/chat/", json={"question": question, "session_id": session_id})
+        response.raise_for_status()
+    sequential_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response = await ctx.client.post("/chat/batch", json={"questions": questions, "session_id": session_id})
+    response.raise_for_status()
+    batch_duration = time.perf_counter() - start
+    result = response.json()
+
+    return {
+        "questions": len(questions),
+        "failed": result["failed"],
+        "sequential_seconds": round(sequential_duration, 3),
+        "batch_seconds": round(batch_duration, 3),
+        "sequential_questions_per_second": round(len(questions) / sequential_duration, 3),
+        "batch_questions_per_second": round(len(questions) / batch_duration, 3),
+        "speedup": round(sequential_duration / batch_duration, 2),
+        "embedding_time": result["embedding_time"],
+        "search_time": result["search_time"],
+        "generation_time": summarize([item["generation_time"] for item in result["items"]]),
+    }
+
+
+def git_revision() -> Dict:
+    """Commit the benchmark ran against, and whether the tree had local changes"""
+    def git(*command: str) -> str:
+        return subprocess.run(
+            ["git", *command], cwd=API_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", "."))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class SpawnedStack:
+    """
+    Fake Ollama plus an API server on a throwaway database and vector
+    store, so a run never touches local data
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.ollama: Optional[FakeOllama] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.workdir = tempfile.TemporaryDirectory(prefix="rag-bench-")
+        self.base_url = ""
+
+    def environment(self) -> Dict[str, str]:
+        workdir = Path(self.workdir.name)
+        env = dict(os.environ)
+        env.update(
+            PYTHONPATH=os.pathsep.join(filter(None, [str(API_ROOT), env.get("PYTHONPATH")])),
+            OLLAMA_HOST=self.ollama.url,
+            CHROMA_PORT=str(_free_port()),
+            DB_NAME=str(workdir / "rag.db"),
+            ARCHIVE_DB_NAME=str(workdir / "rag-archive.db"),
+            PERSIST_DIR=str(workdir / "chroma"),
+            LOG_LEVEL="WARNING",
+            ANONYMIZED_TELEMETRY="False",
+        )
+        return env
+
+    def server_command(self, port: int) -> List[str]:
+        if self.args.workers > 1:
+            # Multi-worker mode with a shared Chroma server, see src/cli.py
+            return [
+                sys.executable, "-m", "src", "serve",
+                "--host", "127.0.0.1", "--port", str(port), "--workers", str(self.args.workers),
+            ]
+        return [
+            sys.executable, "-m", "uvicorn", "src.__main__:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ]
+
+    async def __aenter__(self) -> "SpawnedStack":
+        self.ollama = FakeOllama(config=config_from_arguments(self.args)).start()
+        port = _free_port()
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.process = subprocess.Popen(
+            self.server_command(port),
+            cwd=self.workdir.name,
+            env=self.environment()
+        )
+
+        deadline = time.monotonic() + self.args.startup_timeout
+        async with httpx.AsyncClient(base_url=self.base_url) as client:
+            while True:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"API server exited with code {self.process.returncode}")
+                try:
+                    if (await client.get("/check-health")).status_code == 200:
+                        return self
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("API server did not become healthy in time")
+                await asyncio.sleep(0.2)
+
+    async def __aexit__(self, *exc_info):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.ollama is not None:
+            self.ollama.stop()
+        self.workdir.cleanup()
+
+
+async def run_benchmarks(args: argparse.Namespace, base_url: str) -> Dict:
+    limits = httpx.Limits(max_connections=max(args.users, args.upload_concurrency) + 8)
+    timeout = httpx.Timeout(args.timeout)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        ctx = BenchContext(client, args)
+        for name in args.scenarios:
+            print(f"Running {name} ...", flush=True)
+            results[name] = await SCENARIOS[name](ctx)
+    return results
+
+
+async def main_async(args: argparse.Namespace) -> Dict:
+    report = {
+        **git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "base_url")
+        },
+    }
+
+    if args.spawn:
+        async with SpawnedStack(args) as stack:
+            report["target"] = "spawned"
+            report["fake_ollama"] = stack.ollama.config.to_dict()
+            report["scenarios"] = await run_benchmarks(args, stack.base_url)
+    else:
+        report["target"] = args.base_url
+        report["scenarios"] = await run_benchmarks(args, args.base_url)
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Load-test the RAG API. Run from the api/ directory: python -m benchmarks.run --spawn"
+    )
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000",
+                        help="API to benchmark (ignored with --spawn)")
+    parser.add_argument("--spawn", action="store_true",
+                        help="Start a fake Ollama and an API server on temporary storage")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="API worker processes of the spawned server (more than one uses a Chroma server)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=["upload", "stream", "history"])
+    parser.add_argument("--users", type=int, default=8, help="Concurrent chat users")
+    parser.add_argument("--requests", type=int, default=5, help="Chat requests per user")
+    parser.add_argument("--uploads", type=int, default=20, help="Documents uploaded by the upload scenario")
+    parser.add_argument("--upload-concurrency", type=int, default=4, help="Uploads in flight")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per uploaded document")
+    parser.add_argument("--history-turns", type=int, default=50, help="Turns seeded per history session")
+    parser.add_argument("--history-page-size", type=int, default=50, help="Page size when walking history")
+    parser.add_argument("--batch-size", type=int, default=50, help="Questions sent by the batch scenario")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed for documents and questions")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=60.0, help="Seconds to wait for a spawned API")
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    add_config_arguments(parser.add_argument_group("fake Ollama (with --spawn)"))
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    report = asyncio.run(main_async(args))
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{(report['commit'] or 'unknown')[:10]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+
+    print(json.dumps(report["scenarios"], indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
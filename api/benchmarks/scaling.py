@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.run import RESULTS_DIR, git_revision, main_async, parse_args
+
+# Per-scenario throughput metric used for the speedup column
+THROUGHPUT_KEYS = {"upload": "files_per_second", "stream": "requests_per_second", "history": "requests_per_second"}
+
+
+def speedups(runs: Dict[int, Dict], scenario: str) -> Dict[int, float]:
+    """Throughput of every worker count relative to the smallest one"""
+    key = THROUGHPUT_KEYS[scenario]
+    baseline = runs[min(runs)]["scenarios"][scenario][key]
+    return {
+        workers: round(report["scenarios"][scenario][key] / baseline, 3) if baseline else 0.0
+        for workers, report in runs.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Throughput of the spawned API at several worker counts. Unknown arguments are passed "
+                    "to benchmarks.run. Run from the api/ directory: python -m benchmarks.scaling"
+    )
+    parser.add_argument("--worker-counts", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/scaling-<time>.json)")
+    args, passthrough = parser.parse_known_args(argv)
+
+    runs: Dict[int, Dict] = {}
+    for workers in args.worker_counts:
+        print(f"== {workers} worker(s)", flush=True)
+        run_args = parse_args(["--spawn", "--scenarios", "upload", "stream", *passthrough])
+        run_args.workers = workers
+        runs[workers] = asyncio.run(main_async(run_args))
+
+    scenarios = list(runs[args.worker_counts[0]]["scenarios"])
+    report = {
+        **git_revision(),
+        "created_at": datetime.now().isoformat(),
+        "cpu_count": os.cpu_count(),
+        "worker_counts": args.worker_counts,
+        "speedup": {name: speedups(runs, name) for name in scenarios},
+        "runs": {str(workers): report for workers, report in runs.items()},
+    }
+
+    output = args.output or RESULTS_DIR / f"scaling-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+
+    print(f"{'workers':>7} " + " ".join(f"{name + ' ' + THROUGHPUT_KEYS[name]:>32} {'speedup':>8}" for name in scenarios))
+    for workers, run in runs.items():
+        cells = []
+        for name in scenarios:
+            cells.append(f"{run['scenarios'][name][THROUGHPUT_KEYS[name]]:>32} {report['speedup'][name][workers]:>8}")
+        print(f"{workers:>7} " + " ".join(cells))
+    if os.cpu_count() and max(args.worker_counts) > os.cpu_count():
+        print(f"note: {os.cpu_count()} CPU(s) available, worker counts above that cannot scale")
+
+
+if __name__ == "__main__":
+    main()
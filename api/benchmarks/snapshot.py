@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict
+
+from benchmarks.documents import make_text
+from benchmarks.fake_ollama import FakeOllama, add_config_arguments, config_from_arguments
+from benchmarks.run import RESULTS_DIR, git_revision
+
+
+def bench_snapshot(args: argparse.Namespace, workdir: Path) -> Dict:
+    """
+    Bootstrap a node two ways: re-ingest every chunk (embedding + write)
+    versus export-index on the source and import-index on the new node
+    """
+    from langchain_core.documents import Document
+    from src.config import settings
+    from src.services.indexer import Indexer
+    from src.services.snapshot import SnapshotService
+
+    rng = random.Random(args.seed)
+    files = []
+    for f in range(args.files):
+        file_id = f"bench-{f}"
+        files.append([
+            Document(page_content=make_text(rng, lines=8), metadata={"file_id": file_id, "chunk_index": i})
+            for i in range(args.chunks_per_file)
+        ])
+    chunks = sum(len(chunk_list) for chunk_list in files)
+
+    settings.PERSIST_DIR = workdir / "source"
+    source = Indexer()
+    source.initialize()
+    start = time.perf_counter()
+    for chunk_list in files:
+        source.add_documents(chunk_list)
+    ingest_duration = time.perf_counter() - start
+
+    snapshot_dir = workdir / "snapshot"
+    start = time.perf_counter()
+    SnapshotService(source).export(snapshot_dir)
+    export_duration = time.perf_counter() - start
+
+    settings.PERSIST_DIR = workdir / "target"
+    target = Indexer()
+    target.initialize()
+    start = time.perf_counter()
+    SnapshotService(target).load(snapshot_dir)
+    import_duration = time.perf_counter() - start
+
+    size = sum(path.stat().st_size for path in snapshot_dir.iterdir())
+    return {
+        "chunks": chunks,
+        "ingest_seconds": round(ingest_duration, 3),
+        "export_seconds": round(export_duration, 3),
+        "import_seconds": round(import_duration, 3),
+        "ingest_chunks_per_second": round(chunks / ingest_duration, 1),
+        "import_chunks_per_second": round(chunks / import_duration, 1),
+        "import_speedup": round(ingest_duration / import_duration, 2),
+        "snapshot_bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare bootstrapping a node from a snapshot with re-ingesting. "
+                    "Run from the api/ directory: python -m benchmarks.snapshot"
+    )
+    parser.add_argument("--files", type=int, default=20, help="Files in the source index")
+    parser.add_argument("--chunks-per-file", type=int, default=100, help="Chunks per file")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/)")
+    add_config_arguments(parser.add_argument_group("fake Ollama"))
+    args = parser.parse_args()
+
+    fake_ollama = FakeOllama(config=config_from_arguments(args)).start()
+    os.environ["OLLAMA_HOST"] = fake_ollama.url
+    report = {
+        **git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {key: str(value) for key, value in vars(args).items() if key != "output"},
+        "fake_ollama": fake_ollama.config.to_dict(),
+    }
+    try:
+        with tempfile.TemporaryDirectory(prefix="rag-snapshot-") as workdir:
+            report["scenarios"] = {"snapshot": bench_snapshot(args, Path(workdir))}
+    finally:
+        fake_ollama.stop()
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-snapshot-{(report['commit'] or 'unknown')[:10]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+
+    print(json.dumps(report["scenarios"], indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import random
+from pathlib import Path
+from typing import Iterable, List
+
+import numpy as np
+
+from benchmarks.documents import make_question, make_text
+
+# ONNX protobuf field numbers and enums used below, see onnx/onnx.proto
+_FLOAT = 1
+_INT64 = 7
+_ATTRIBUTE_INTS = 7
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    value &= (1 << 64) - 1
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _int(field: int, value: int) -> bytes:
+    return _varint(field << 3) + _varint(value)
+
+
+def _bytes(field: int, value: bytes) -> bytes:
+    return _varint(field << 3 | 2) + _varint(len(value)) + value
+
+
+def _str(field: int, value: str) -> bytes:
+    return _bytes(field, value.encode("utf-8"))
+
+
+def _tensor(name: str, array: np.ndarray) -> bytes:
+    data_type = _FLOAT if array.dtype == np.float32 else _INT64
+    return b"".join([
+        *(_int(1, dim) for dim in array.shape),
+        _int(2, data_type),
+        _str(8, name),
+        _bytes(9, np.ascontiguousarray(array).tobytes()),
+    ])
+
+
+def _value_info(name: str, elem_type: int, dims: Iterable) -> bytes:
+    shape = b"".join(
+        _bytes(1, _str(2, dim) if isinstance(dim, str) else _int(1, dim))
+        for dim in dims
+    )
+    return _str(1, name) + _bytes(2, _bytes(1, _int(1, elem_type) + _bytes(2, shape)))
+
+
+def _node(op_type: str, inputs: List[str], outputs: List[str], **ints: List[int]) -> bytes:
+    node = b"".join(_str(1, name) for name in inputs) + b"".join(_str(2, name) for name in outputs)
+    node += _str(4, op_type)
+    for name, values in ints.items():
+        node += _bytes(5, _str(1, name) + b"".join(_int(8, v) for v in values) + _int(20, _ATTRIBUTE_INTS))
+    return node
+
+
+def build_model(vocab_size: int, hidden: int, layers: int, seed: int) -> bytes:
+    """
+    A transformer-sized stand-in for a sentence embedding model: token
+    embeddings followed by `layers` residual feed-forward blocks. It has
+    the inputs and the last_hidden_state output of an optimum export, and
+    about the per-token cost of the feed-forward half of each layer.
+    """
+    rng = np.random.default_rng(seed)
+    initializers = [_tensor("embeddings", rng.standard_normal((vocab_size, hidden), dtype=np.float32) * 0.02)]
+    nodes = [_node("Gather", ["embeddings", "input_ids"], ["hidden_0"])]
+    for layer in range(layers):
+        up, down = f"up_{layer}", f"down_{layer}"
+        initializers.append(_tensor(up, rng.standard_normal((hidden, hidden * 4), dtype=np.float32) * 0.02))
+        initializers.append(_tensor(down, rng.standard_normal((hidden * 4, hidden), dtype=np.float32) * 0.02))
+        output = "last_hidden_state" if layer == layers - 1 else f"hidden_{layer + 1}"
+        nodes += [
+            _node("MatMul", [f"hidden_{layer}", up], [f"up_out_{layer}"]),
+            _node("Relu", [f"up_out_{layer}"], [f"act_{layer}"]),
+            _node("MatMul", [f"act_{layer}", down], [f"down_out_{layer}"]),
+            _node("Add", [f"hidden_{layer}", f"down_out_{layer}"], [output]),
+        ]
+    # attention_mask is unused by the graph but keeps the export's signature
+    nodes.append(_node("Unsqueeze", ["attention_mask", "mask_axes"], ["mask_unused"]))
+    initializers.append(_tensor("mask_axes", np.array([2], dtype=np.int64)))
+
+    graph = b"".join([
+        *(_bytes(1, node) for node in nodes),
+        _str(2, "synthetic_embedding"),
+        *(_bytes(5, tensor) for tensor in initializers),
+        _bytes(11, _value_info("input_ids", _INT64, ["batch", "sequence"])),
+        _bytes(11, _value_info("attention_mask", _INT64, ["batch", "sequence"])),
+        _bytes(12, _value_info("last_hidden_state", _FLOAT, ["batch", "sequence", hidden])),
+    ])
+    return _int(1, 8) + _str(2, "benchmarks.synthetic_onnx") + _bytes(7, graph) + _bytes(8, _int(2, 13))
+
+
+def build_tokenizer(vocab_size: int, seed: int):
+    """WordPiece tokenizer trained on the benchmark's synthetic text"""
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, trainers
+
+    rng = random.Random(seed)
+    corpus = [make_text(rng, lines=8) for _ in range(500)] + [make_question(rng) for _ in range(500)]
+    tokenizer = Tokenizer(models.WordPiece(unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.train_from_iterator(
+        corpus,
+        trainers.WordPieceTrainer(vocab_size=vocab_size, special_tokens=["[PAD]", "[UNK]", "[CLS]", "[SEP]"])
+    )
+    return tokenizer
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic ONNX embedding model (model.onnx + tokenizer.json) for "
+                    "benchmarking the onnx backend without downloading a model. "
+                    "Run from the api/ directory: python -m benchmarks.synthetic_onnx <directory>"
+    )
+    parser.add_argument("directory", type=Path, help="Model directory to create")
+    parser.add_argument("--hidden", type=int, default=384, help="Embedding size (all-MiniLM-L6-v2: 384)")
+    parser.add_argument("--layers", type=int, default=6, help="Feed-forward blocks (all-MiniLM-L6-v2: 6 layers)")
+    parser.add_argument("--vocab-size", type=int, default=8000, help="Maximum tokenizer vocabulary")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    args.directory.mkdir(parents=True, exist_ok=True)
+    tokenizer = build_tokenizer(args.vocab_size, args.seed)
+    tokenizer.save(str(args.directory / "tokenizer.json"))
+    model = build_model(tokenizer.get_vocab_size(), args.hidden, args.layers, args.seed)
+    (args.directory / "model.onnx").write_bytes(model)
+    print(f"Wrote {args.directory} (vocabulary {tokenizer.get_vocab_size()}, "
+          f"{len(model) / 1024 / 1024:.1f} MB model)")
+
+
+if __name__ == "__main__":
+    main()
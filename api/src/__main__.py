@@ -1,11 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from src.config import settings
+from src.services.memory import memory_governor
+from src.services.message_log import message_log
+from src.services.retention import retention_service
+from src.utils.dependency import Dependency
+from src.utils.metrics import RequestContextMiddleware, render_prometheus
+from src.utils.profiling import ProfilingMiddleware
+from src.routes import admin
 from src.routes import document
 from src.routes import rag
+from src.routes import search
 from src.routes import website
 
 
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    """
+    Start background services on startup and drain them on shutdown
+    """
+    await Dependency.startup()
+    await message_log.start()
+    if settings.RETENTION_ENABLED:
+        await retention_service.start()
+    if settings.MEMORY_BUDGET_MB:
+        await memory_governor.start()
+    try:
+        yield
+    finally:
+        await memory_governor.stop()
+        await retention_service.stop()
+        # Make sure no buffered chat message is lost on shutdown
+        await message_log.stop()
+        await Dependency.shutdown()
+
+
 def create_app() -> FastAPI:
     """
     Function to create FastAPI instance
@@ -16,7 +47,8 @@ def create_app() -> FastAPI:
     application = FastAPI(
         title=settings.APP_NAME,
         version=settings.APP_VERSION,
-        description="RAG chatbot API"
+        description="RAG chatbot API",
+        lifespan=lifespan
     )
 
     # Add CORS middleware
@@ -28,15 +60,28 @@ def create_app() -> FastAPI:
         allow_credentials=True
     )
 
+    # Profile single requests on demand; not installed at all unless enabled
+    if settings.PROFILING_ENABLED:
+        application.add_middleware(ProfilingMiddleware)
+
+    # Assign request ids and record HTTP metrics
+    application.add_middleware(RequestContextMiddleware)
+
     # Include document router
     application.include_router(document.router)
 
     # Include RAG route
     application.include_router(rag.router)
 
+    # Include Search route
+    application.include_router(search.router)
+
     # Include Website route
     application.include_router(website.router)
 
+    # Include Admin route
+    application.include_router(admin.router)
+
     # Endpoint to check application health
     @application.get("/check-health")
     def health_check():
@@ -55,16 +100,26 @@ def create_app() -> FastAPI:
             "Version": settings.APP_VERSION
         }
 
+    # Endpoint exposing metrics in Prometheus text format
+    @application.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        """
+        Endpoint to scrape application metrics
+
+        Returns:
+            str: All metrics in Prometheus text exposition format
+        """
+        return PlainTextResponse(
+            render_prometheus(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
     return application
 
 
 app = create_app()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "main:app",
-        host=settings.API_HOST,
-        port=settings.API_PORT,
-        reload=True
-    )
+    # python -m src [serve --workers N | ...], see src/cli.py
+    from src.cli import main
+    raise SystemExit(main())
@@ -65,7 +65,7 @@ def get_chat_history():
                 params={"session_id": st.session_state.session_id}
             )
             response.raise_for_status()
-            return response.json()
+            return response.json().get("messages", [])
     except Exception as e:
         st.error(f"Error fetching chat history: {str(e)}")
         return []
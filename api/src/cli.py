@@ -0,0 +1,346 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from src.config import settings
+
+Command = Callable[[argparse.Namespace], int]
+COMMANDS: Dict[str, Command] = {}
+
+
+def command(name: str, help: str, configure: Callable[[argparse.ArgumentParser], None] = None):
+    """Register a `python -m src <name>` sub-command"""
+    def register(func: Command) -> Command:
+        COMMANDS[name] = func
+        func.cli_help = help
+        func.cli_configure = configure
+        return func
+    return register
+
+
+def start_chroma_server(host: str, port: int, path: Path, timeout: float = 60.0) -> subprocess.Popen:
+    """
+    Start a Chroma server on PERSIST_DIR and wait until it answers
+
+    It is the only process that opens the vector store files, so API
+    workers in client mode can share one index safely.
+    """
+    from src.services.memory import chroma_cache_limit_bytes
+
+    Path(path).mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ)
+    env.update(
+        IS_PERSISTENT="True",
+        PERSIST_DIRECTORY=str(path),
+        ANONYMIZED_TELEMETRY="False",
+    )
+    cache_limit = chroma_cache_limit_bytes()
+    if cache_limit:
+        # The server holds the vector segments in client mode
+        env.update(CHROMA_SEGMENT_CACHE_POLICY="LRU", CHROMA_MEMORY_LIMIT_BYTES=str(cache_limit))
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "chromadb.app:app",
+            "--host", host, "--port", str(port),
+            "--workers", "1", "--log-level", "warning", "--timeout-keep-alive", "30",
+        ],
+        env=env
+    )
+
+    heartbeat = f"http://{host}:{port}/api/v1/heartbeat"
+    deadline = time.monotonic() + timeout
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(f"Chroma server exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(heartbeat, timeout=1):
+                return process
+        except OSError:
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError("Chroma server did not start in time")
+            time.sleep(0.2)
+
+
+def _configure_serve(parser: argparse.ArgumentParser):
+    parser.add_argument("--host", default=settings.API_HOST)
+    parser.add_argument("--port", type=int, default=settings.API_PORT)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="API worker processes; more than one starts a shared Chroma server")
+    parser.add_argument("--reload", action="store_true", help="Reload on code changes (single worker only)")
+    parser.add_argument("--external-chroma", action="store_true",
+                        help="Use the Chroma server at CHROMA_HOST:CHROMA_PORT instead of starting one")
+
+
+@command("serve", "Run the API server", _configure_serve)
+def serve(args: argparse.Namespace) -> int:
+    """
+    Run the API with uvicorn
+
+    With --workers > 1 (or VECTOR_STORE_MODE=client) a Chroma server is
+    started on PERSIST_DIR and every worker connects to it as a client.
+    Per-process session caching is turned off and chat messages are
+    flushed right away, so a session can move between workers between
+    requests without reading stale history. Retention runs in whichever
+    worker holds its lease in the database; every worker checks its own
+    memory.
+    """
+    import uvicorn
+
+    chroma: Optional[subprocess.Popen] = None
+    if args.workers > 1 or settings.VECTOR_STORE_MODE == "client":
+        if args.reload:
+            print("--reload cannot be combined with several workers", file=sys.stderr)
+            return 2
+        if not args.external_chroma:
+            chroma = start_chroma_server(settings.CHROMA_HOST, settings.CHROMA_PORT, settings.PERSIST_DIR)
+        os.environ["VECTOR_STORE_MODE"] = "client"
+        if args.workers > 1:
+            os.environ.setdefault("SESSION_CACHE_SIZE", "0")
+            os.environ.setdefault("MESSAGE_FLUSH_BATCH_SIZE", "1")
+
+    try:
+        uvicorn.run(
+            "src.__main__:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            reload=args.reload
+        )
+    finally:
+        if chroma is not None:
+            chroma.terminate()
+            try:
+                chroma.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                chroma.kill()
+    return 0
+
+
+def _configure_partition_index(parser: argparse.ArgumentParser):
+    parser.add_argument("--batch-size", type=int, default=500, help="Chunks moved per batch")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how chunks would be split")
+
+
+@command("partition-index", "Split the default vector collection into partitions", _configure_partition_index)
+def partition_index(args: argparse.Namespace) -> int:
+    """
+    Move existing chunks into per-file or per-group collections
+
+    Uses VECTOR_STORE_PARTITIONING and VECTOR_STORE_PARTITION_GROUPS.
+    Stored embeddings are copied, so the embedding model is not called.
+    Stop the API first (or run it against the Chroma server in client
+    mode); an interrupted run can be started again.
+    """
+    from src.services.indexer import Indexer
+
+    indexer = Indexer()
+    indexer.initialize()
+    if not indexer.is_initialized:
+        print("Could not initialize the vector store", file=sys.stderr)
+        return 1
+    try:
+        moved = indexer.split_into_partitions(batch_size=args.batch_size, dry_run=args.dry_run)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+    verb = "would move" if args.dry_run else "moved"
+    for name, count in sorted(moved.items()):
+        print(f"{name}: {count}")
+    print(f"{verb} {sum(moved.values())} chunks into {len(moved)} partitions")
+    return 0
+
+
+def _configure_export_index(parser: argparse.ArgumentParser):
+    parser.add_argument("directory", type=Path, help="Snapshot directory to create")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Chunks read from Chroma at a time")
+
+
+@command("export-index", "Export the vector store to a snapshot directory", _configure_export_index)
+def export_index(args: argparse.Namespace) -> int:
+    """
+    Export all chunks with their embeddings to a snapshot
+
+    The snapshot holds embeddings.npy (float32), chunks.parquet (text and
+    metadata) and manifest.json (embedding model and dimension). Copy it
+    to a new node and load it with `import-index`.
+    """
+    from src.services.snapshot import SnapshotService
+
+    try:
+        manifest = SnapshotService().export(args.directory, batch_size=args.batch_size)
+    except (RuntimeError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(json.dumps(manifest, indent=2))
+    return 0
+
+
+def _configure_import_index(parser: argparse.ArgumentParser):
+    parser.add_argument("directory", type=Path, help="Snapshot directory written by export-index")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Chunks written to Chroma at a time")
+    parser.add_argument("--force", action="store_true",
+                        help="Load even if the snapshot was made with another embedding model")
+    session = parser.add_mutually_exclusive_group()
+    session.add_argument("--session", help="Link the loaded files to this existing session")
+    session.add_argument("--new-session", action="store_true", help="Link the loaded files to a new session")
+
+
+@command("import-index", "Load a snapshot into the vector store", _configure_import_index)
+def import_index(args: argparse.Namespace) -> int:
+    """
+    Bulk-load a snapshot written by `export-index`
+
+    Stored embeddings are written directly, the embedding model is not
+    called. Chunks are upserted by id into the collections of the current
+    VECTOR_STORE_PARTITIONING. Run it before starting the API, or against
+    the Chroma server in client mode.
+
+    The loaded files are pinned so retention keeps them. Chat only sees
+    files linked to its session: pass --session or --new-session, or copy
+    the session database (DB_NAME) of the exporting node along.
+    """
+    from src.services.session import SessionService
+    from src.services.snapshot import SnapshotService
+
+    session_id = args.session
+    if session_id and not SessionService().get_session(session_id):
+        print(f"Session {session_id} not found", file=sys.stderr)
+        return 1
+    if args.new_session:
+        session_id = SessionService().create_session()
+
+    try:
+        stats = SnapshotService().load(
+            args.directory,
+            batch_size=args.batch_size,
+            force=args.force,
+            session_id=session_id
+        )
+    except (OSError, RuntimeError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+def _configure_ingest(parser: argparse.ArgumentParser):
+    parser.add_argument("directory", type=Path, help="Directory searched recursively for supported files")
+    parser.add_argument("--workers", type=int, default=0, help="Parser processes (default: one per core)")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Texts per embedding call")
+    parser.add_argument("--write-batch-chunks", type=int, default=2048,
+                        help="Chunks buffered before they are embedded, written and checkpointed")
+    parser.add_argument("--session-id", help="Session to add the files to (default: the previous run's, or a new one)")
+    parser.add_argument("--limit", type=int, help="Ingest at most this many pending files")
+
+
+@command("ingest", "Bulk-index a directory of documents", _configure_ingest)
+def ingest(args: argparse.Namespace) -> int:
+    """
+    Index every supported file below a directory, without the HTTP API
+
+    Files are parsed and split in a process pool with CHUNK_SIZE and
+    CHUNK_OVERLAP, embedded in large batches and written to the vector
+    store in bulk. Progress is checkpointed to the database, so running
+    the same command again after an interruption only processes the
+    files that are not done yet (or changed since).
+    """
+    from src.services.bulk_ingest import BulkIngestService
+    from src.services.indexer import Indexer
+
+    service = BulkIngestService(
+        Indexer(),
+        workers=args.workers,
+        embed_batch_size=args.embed_batch_size,
+        write_batch_chunks=args.write_batch_chunks
+    )
+    try:
+        stats = service.run(args.directory, session_id=args.session_id, limit=args.limit)
+    except (RuntimeError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(json.dumps(stats, indent=2))
+    return 1 if stats["files_failed"] else 0
+
+
+def _configure_tune_index(parser: argparse.ArgumentParser):
+    parser.add_argument("--k", type=int, default=4, help="Results per query")
+    parser.add_argument("--target-recall", type=float, default=0.95, help="Minimum mean recall@k to recommend")
+    parser.add_argument("--corpus-size", type=int, default=5000, help="Indexed chunks sampled as the corpus")
+    parser.add_argument("--queries", type=int, default=200, help="Sampled chunks used as queries")
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], default=settings.HNSW_SPACE)
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 32, 64, 128])
+    parser.add_argument("--seed", type=int, default=1234, help="Sampling seed; same seed and index = same sample")
+    parser.add_argument("--output", type=Path, help="Also write the JSON report to this file")
+
+
+@command("tune-index", "Recommend HNSW parameters from a recall / latency sweep", _configure_tune_index)
+def tune_index(args: argparse.Namespace) -> int:
+    """
+    Sweep HNSW parameters on a sample of the indexed chunks
+
+    Recall@k is measured against an exact NumPy search. The recommendation
+    is the combination with the lowest median query latency that reaches
+    --target-recall; set it with HNSW_SPACE, HNSW_M, HNSW_CONSTRUCTION_EF
+    and HNSW_SEARCH_EF. The settings apply to collections created
+    afterwards, e.g. by importing a snapshot into an empty PERSIST_DIR.
+    """
+    from src.services.index_tuning import IndexTuner
+
+    try:
+        report = IndexTuner(seed=args.seed).run(
+            k=args.k,
+            target_recall=args.target_recall,
+            corpus_size=args.corpus_size,
+            query_count=args.queries,
+            space=args.space,
+            m_values=args.m,
+            construction_ef_values=args.construction_ef,
+            search_ef_values=args.search_ef
+        )
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    print(f"{'M':>4} {'constr_ef':>9} {'search_ef':>9} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}")
+    for r in report["results"]:
+        print(f"{r['M']:>4} {r['construction_ef']:>9} {r['search_ef']:>9} {r['recall']:>7.3f} "
+              f"{r['latency_p50_ms']:>8.3f} {r['latency_p99_ms']:>8.3f} {r['build_seconds']:>8.2f}")
+    recommended = report["recommended"]
+    if recommended is None:
+        print(f"No combination reaches recall {args.target_recall}")
+    else:
+        print(f"Recommended: HNSW_SPACE={args.space} HNSW_M={recommended['M']} "
+              f"HNSW_CONSTRUCTION_EF={recommended['construction_ef']} HNSW_SEARCH_EF={recommended['search_ef']}")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0 if recommended is not None else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of `python -m src`; runs `serve` when no command is given"""
+    parser = argparse.ArgumentParser(prog="python -m src", description=settings.APP_NAME)
+    subparsers = parser.add_subparsers(dest="command")
+    for name, func in COMMANDS.items():
+        subparser = subparsers.add_parser(
+            name,
+            help=func.cli_help,
+            description=textwrap.dedent(func.__doc__ or "").strip(),
+            formatter_class=argparse.RawDescriptionHelpFormatter
+        )
+        if func.cli_configure is not None:
+            func.cli_configure(subparser)
+
+    argv = sys.argv[1:] if argv is None else argv
+    args = parser.parse_args(argv or ["serve"])
+    return COMMANDS[args.command](args)
@@ -1,8 +1,6 @@
-from typing import Dict, Type
-from langchain_core.document_loaders.base import BaseLoader
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader
 
 
 class Settings(BaseSettings):
@@ -24,23 +22,107 @@ class Settings(BaseSettings):
     # API Server Settings
     API_HOST: str = "0.0.0.0"  # Host address for the API server (0.0.0.0 allows external access)
     API_PORT: int = 8000  # Port number for the API server
+    WARMUP_ON_STARTUP: bool = True  # Build the indexer and RAG service in the background once the server is up
 
     # Embedding model Settings
-    EMBEDDING_MODEL: str = "nomic-embed-text"
+    # Changing the backend or model changes the vector dimensions, re-index documents after switching
+    EMBEDDING_BACKEND: str = "ollama"  # "ollama" (HTTP to Ollama) or "onnx" (in-process ONNX Runtime)
+    EMBEDDING_MODEL: str = "nomic-embed-text"  # Ollama embedding model
+    ONNX_EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"  # Directory under MODEL_CACHE with model.onnx and tokenizer.json
+    ONNX_THREADS: int = 0  # ONNX Runtime intra-op threads (0 = one per core)
+    ONNX_MAX_LENGTH: int = 256  # Token limit per text, longer texts are truncated
+    EMBEDDING_BATCH_SIZE: int = 32  # Max texts per ONNX inference run
+    EMBEDDING_BATCH_WAIT_MS: float = 2.0  # How long a text waits for concurrent requests to batch with
+
+    # Indexing Settings
+    CHUNK_SIZE: int = 1000  # Max characters per chunk
+    CHUNK_OVERLAP: int = 200  # Characters shared by consecutive chunks
 
     # Database Settings
     DB_NAME: str = "rag.db"
+    SQLITE_WAL: bool = True  # Write-ahead logging: readers never block the writer (needed with several workers)
+    SQLITE_BUSY_TIMEOUT: float = 5.0  # Seconds a connection waits for another process's write lock
+    MESSAGE_FLUSH_BATCH_SIZE: int = 64  # Buffered chat messages that trigger an immediate flush
+    MESSAGE_FLUSH_INTERVAL: float = 0.5  # Max seconds a chat message waits in the write-behind buffer
+    MESSAGE_FLUSH_MAX_ATTEMPTS: int = 5  # Flushes a batch is retried on a locked database before it is dropped
+
+    # Session Settings
+    CHAT_HISTORY_WINDOW: int = 20  # Most recent messages passed to the LLM as chat history
+    SESSION_CACHE_SIZE: int = 1024  # Hot session contexts kept in memory
+    SESSION_CACHE_TTL: float = 300.0  # Seconds a cached session context stays valid
+    HISTORY_PAGE_SIZE: int = 50  # Default number of messages per chat history page
+    HISTORY_MAX_PAGE_SIZE: int = 500  # Upper bound for the chat history page size
+
+    # Streaming Settings
+    SSE_COALESCE_MS: float = 20.0  # Max time tokens are held back to be sent in one SSE frame (0 disables)
+    SSE_COALESCE_MAX_CHARS: int = 256  # Send a frame as soon as this many characters are buffered
+    SSE_HEARTBEAT_SECONDS: float = 15.0  # Keep-alive comment interval on idle streams (0 disables)
+    SSE_DISCONNECT_POLL_SECONDS: float = 0.5  # How often streams check whether the client went away
+
+    # Batch Settings
+    BATCH_MAX_QUESTIONS: int = 500  # Questions accepted by one /chat/batch request
+    BATCH_GENERATION_CONCURRENCY: int = 4  # LLM generations in flight per /chat/batch request
+    SEARCH_MAX_QUERIES: int = 500  # Queries accepted by one /search request
+
+    # Memory Settings
+    MEMORY_BUDGET_MB: int = 0  # Resident memory budget per process; 0 only reports memory usage
+    MEMORY_HIGH_WATERMARK: float = 0.85  # Fraction of the budget above which caches are evicted and ingestion waits
+    MEMORY_CHECK_INTERVAL_SECONDS: float = 5.0  # How often the governor samples RSS in the background
+    MEMORY_THROTTLE_MAX_WAIT_SECONDS: float = 30.0  # Longest an ingest batch waits for memory before it goes ahead
+
+    # Retention Settings
+    RETENTION_ENABLED: bool = False  # Run the retention job periodically in the background
+    RETENTION_INTERVAL_HOURS: float = 24.0  # Hours between scheduled retention runs
+    SESSION_TTL_DAYS: float = 30.0  # Sessions idle for longer than this are expired
+    RETENTION_ARCHIVE: bool = True  # Copy expired sessions to ARCHIVE_DB_NAME before deleting them
+    ARCHIVE_DB_NAME: str = "rag-archive.db"
+    VECTOR_GC_GRACE_SECONDS: float = 3600.0  # Never collect chunks uploaded more recently than this
+    VECTOR_GC_BATCH_SIZE: int = 1000  # Chunks scanned / deleted per vector store call
+
+    # Admin Settings
+    ADMIN_TOKEN: Optional[str] = None  # Required in the X-Admin-Token header; admin routes are disabled when unset
 
     # Chroma Settings
     PERSIST_DIR: Path = PROJECT_ROOT / "data/chroma-db"
+    VECTOR_STORE_MODE: str = "embedded"  # "embedded" (in-process, one worker) or "client" (shared Chroma server)
+    CHROMA_HOST: str = "127.0.0.1"  # Chroma server address in client mode
+    CHROMA_PORT: int = 8001
+    CHROMA_CACHE_LIMIT_MB: int = 0  # LRU limit on loaded vector segments (by size on disk); 0 = half of MEMORY_BUDGET_MB, unlimited without a budget
+    VECTOR_STORE_PARTITIONING: str = "none"  # "none" (one collection), "file" (collection per file) or "group" (file ids hashed into groups); run `python -m src partition-index` after switching
+    VECTOR_STORE_PARTITION_GROUPS: int = 16  # Number of collections with "group" partitioning
+    VECTOR_SEARCH_WORKERS: int = 4  # Partitions searched in parallel per query
+    RETRIEVAL_FANOUT_MIN_FILES: int = 8  # Cap the chunks per file when a chat covers at least this many files (0 = never)
+    RETRIEVAL_FANOUT_PER_FILE_K: int = 1  # Chunks one file may contribute to a capped search
+    RETRIEVAL_FANOUT_OVERFETCH: int = 4  # Candidates fetched per result of a capped search
+    # HNSW index of new collections; existing collections keep the values they were created with.
+    # `python -m src tune-index` measures the recall / latency trade-off on the indexed chunks.
+    HNSW_SPACE: str = "l2"  # Distance: "l2", "cosine" or "ip"
+    HNSW_M: int = 16  # Neighbours per graph node: better recall, more memory and slower inserts
+    HNSW_CONSTRUCTION_EF: int = 100  # Candidate list size while building the graph
+    HNSW_SEARCH_EF: int = 10  # Candidate list size while searching: better recall, slower queries
     MODEL_CACHE: Path = PROJECT_ROOT / "cache"
 
+    # Observability Settings
+    TRACING_ENABLED: bool = False  # Emit per-stage spans (OpenTelemetry when installed) with the request id
+
+    # Profiling Settings
+    PROFILING_ENABLED: bool = False  # Install the profiling middleware (no overhead at all when False)
+    PROFILE_MODE: str = "cprofile"  # "cprofile" (pstats, event loop thread) or "sampling" (collapsed stacks, all threads)
+    PROFILE_SAMPLE_RATE: float = 0.0  # Fraction of PROFILE_PATHS requests profiled without the X-Profile header
+    PROFILE_PATHS: List[str] = ["/chat/", "/chat/stream", "/documents/upload"]  # Request paths that may be profiled
+    PROFILE_SAMPLING_INTERVAL_MS: float = 5.0  # Stack sampling interval in "sampling" mode
+    PROFILE_DIR: Path = PROJECT_ROOT / "data/profiles"
+    PROFILE_MAX_FILES: int = 100  # Oldest profiles are deleted beyond this count
+
     # Log Settings
-    LOG_LEVEL: str = "DEBUG"
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # Console output format: "text" or "json" (the log file is always JSON)
+    LOG_SAMPLE_RATES: Dict[str, float] = {}  # Fraction of DEBUG/INFO records kept per `event`, e.g. {"rag.request": 0.1}
+    LOG_RATE_LIMIT_PER_SECOND: float = 100.0  # Max DEBUG/INFO records per second per message type (0 disables)
 
-    # Supported file type
-    SUPPORTED_FILE_TYPE: Dict[str, Type[BaseLoader]] = {
-        ".pdf": PyPDFLoader
+    # Supported file type, mapped to the import path of its document loader (imported on first use)
+    SUPPORTED_FILE_TYPE: Dict[str, str] = {
+        ".pdf": "langchain_community.document_loaders.PyPDFLoader"
     }
 
     class Config:
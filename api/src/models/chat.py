@@ -1,10 +1,89 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Literal, Optional, Union
+
+
+class StreamOptions(BaseModel):
+    coalesce_ms: Optional[float] = Field(None, ge=0)
+    max_chars: Optional[int] = Field(None, ge=1)
+    heartbeat_seconds: Optional[float] = Field(None, ge=0)
 
 
 class ChatRequest(BaseModel):
     question: str
     session_id: Optional[str] = None
+    stream_options: Optional[StreamOptions] = None
+
+
+class ChatBatchRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1)
+    file_ids: Optional[List[str]] = None
+    session_id: Optional[str] = None
+    k: int = Field(3, ge=1, le=50)
+
+
+class ChatBatchItem(BaseModel):
+    index: int
+    question: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    chunks: int
+    queue_time: float
+    generation_time: float
+    total_time: float
+
+
+class ChatBatchResponse(BaseModel):
+    items: List[ChatBatchItem]
+    failed: int
+    embedding_time: float
+    search_time: float
+    processing_time: float
+
+
+class SearchRequest(BaseModel):
+    queries: Union[str, List[str]]
+    file_ids: Optional[List[str]] = None
+    k: int = Field(4, ge=1, le=100)
+    score_threshold: Optional[float] = None
+
+    @field_validator("queries")
+    @classmethod
+    def as_list(cls, value: Union[str, List[str]]) -> List[str]:
+        queries = [value] if isinstance(value, str) else value
+        if not queries:
+            raise ValueError("At least one query is required")
+        return queries
+
+
+class SearchHit(BaseModel):
+    rank: int
+    chunk_id: Optional[str] = None
+    file_id: Optional[str] = None
+    file_name: Optional[str] = None
+    chunk_index: Optional[int] = None
+    score: float
+    distance: float
+    content: str
+    metadata: Dict[str, Any]
+
+
+class SearchResult(BaseModel):
+    index: int
+    query: str
+    hits: List[SearchHit]
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult]
+    processing_time: float
+
+
+class ChatSocketMessage(BaseModel):
+    type: Literal["chat", "cancel", "refresh"]
+    request_id: str
+    question: Optional[str] = None
+    session_id: Optional[str] = None
+    stream_options: Optional[StreamOptions] = None
 
 
 class ChatResponse(BaseModel):
@@ -19,6 +98,21 @@ class DocumentUploadRersponse(BaseModel):
     file_id: str
     chunks_created: int
     session_id: str
+    version: int = 1
+    chunks_reused: int = 0
+    chunks_embedded: int = 0
+    chunks_deleted: int = 0
+
+
+class DocumentVersion(BaseModel):
+    file_id: str
+    version: int
+    file_name: Optional[str] = None
+    chunks: int
+    chunks_reused: int
+    chunks_embedded: int
+    chunks_deleted: int
+    created_at: str
 
 
 class WebsiteUploadResponse(BaseModel):
@@ -27,3 +121,17 @@ class WebsiteUploadResponse(BaseModel):
     file_id: str
     chunks_created: int
     session_id: str
+
+
+class ChatMessage(BaseModel):
+    message_id: str
+    role: str
+    content: str
+    timestamp: str
+
+
+class ChatHistoryPage(BaseModel):
+    messages: List[ChatMessage]
+    has_more: bool
+    next_before: Optional[str] = None
+    next_after: Optional[str] = None
@@ -0,0 +1,127 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import Literal
+from src.services.memory import memory_governor
+from src.services.retention import retention_service
+from src.utils.dependency import require_admin
+from src.utils.logger import logger
+from src.utils.profiling import get_profile, list_profiles, profile_file, render_profile
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.post("/retention")
+async def run_retention():
+    """
+    Run the session retention and storage compaction job now
+
+    Returns:
+        dict: Retention report with counts and bytes reclaimed
+    """
+    try:
+        return await retention_service.run()
+    except Exception as e:
+        logger.error("Error while running retention: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to run retention: {str(e)}"
+        )
+
+
+@router.get("/memory")
+async def get_memory():
+    """
+    Memory usage of this worker: RSS against MEMORY_BUDGET_MB, sizes of
+    the indexer and Chroma caches, and what the memory governor did
+
+    Returns:
+        dict: Memory governor status
+    """
+    try:
+        return await asyncio.to_thread(memory_governor.status)
+    except Exception as e:
+        logger.error("Error while reading memory status: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to read memory status: {str(e)}"
+        )
+
+
+@router.post("/memory/release")
+async def release_memory():
+    """
+    Evict caches and return freed memory to the OS now, whatever the memory usage
+
+    Returns:
+        dict: RSS before and after, and what was evicted
+    """
+    try:
+        return await asyncio.to_thread(memory_governor.release)
+    except Exception as e:
+        logger.error("Error while releasing memory: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to release memory: {str(e)}"
+        )
+
+
+@router.get("/profiles")
+async def get_profiles():
+    """
+    List stored request profiles, newest first
+
+    Returns:
+        list: Profile metadata (id, mode, path, status, duration, request id)
+    """
+    return list_profiles()
+
+
+def _load_profile(profile_id: str) -> dict:
+    profile = get_profile(profile_id)
+    if profile is None or not profile_file(profile).exists():
+        raise HTTPException(
+            status_code=404,
+            detail="Profile not found"
+        )
+    return profile
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def view_profile(
+    profile_id: str,
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """
+    Show a profile as text: a pstats table for cProfile profiles, the
+    hottest stacks for sampling profiles
+
+    Args:
+        profile_id: Id from the X-Profile-Id response header
+        sort: Sort order of the pstats table
+        limit: Number of rows to show
+    """
+    profile = _load_profile(profile_id)
+    try:
+        return PlainTextResponse(render_profile(profile, sort=sort, limit=limit))
+    except Exception as e:
+        logger.error("Error while rendering profile %s: %s", profile_id, e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to render profile: {str(e)}"
+        )
+
+
+@router.get("/profiles/{profile_id}/download")
+async def download_profile(profile_id: str):
+    """
+    Download the raw profile: a .pstats file (snakeviz, pstats) or
+    collapsed stacks (flamegraph.pl, speedscope)
+
+    Args:
+        profile_id: Id from the X-Profile-Id response header
+    """
+    profile = _load_profile(profile_id)
+    path = profile_file(profile)
+    return FileResponse(path, filename=path.name, media_type="application/octet-stream")
@@ -1,20 +1,25 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, TYPE_CHECKING
 from src.config import settings
-from src.services.indexer import Indexer
-from src.utils.dependency import get_indexer
+from src.utils.dependency import get_document_version_service, get_indexer, get_session_service
+from src.services.memory import memory_governor
 from src.utils.logger import logger
 from src.utils.logger import log_time
-from src.models.chat import DocumentUploadRersponse
-from src.services.session import SessionService
-from src.utils.process_file import process_file
+from src.utils.metrics import span, INGEST_STAGE_SECONDS
+from src.models.chat import DocumentUploadRersponse, DocumentVersion
+from src.utils.process_file import chunk_hash, process_file
+import asyncio
 import tempfile
 import uuid
 import time
 
+if TYPE_CHECKING:
+    from src.services.document_version import DocumentVersionService
+    from src.services.indexer import Indexer
+    from src.services.session import SessionService
+
 router = APIRouter(prefix="/documents", tags=["documents"])
-session_service = SessionService()
 
 
 @router.post("/upload", response_model=DocumentUploadRersponse)
@@ -22,18 +27,25 @@ session_service = SessionService()
 async def upload_document(
         file: UploadFile = File(...),
         # Depends(get_indexer) tells FastAPI to inject the Indexer instance
-        indexer: Indexer = Depends(get_indexer),
-        session_id: Optional[str] = None
+        indexer: "Indexer" = Depends(get_indexer),
+        session_service: "SessionService" = Depends(get_session_service),
+        version_service: "DocumentVersionService" = Depends(get_document_version_service),
+        session_id: Optional[str] = None,
+        replaces_file_id: Optional[str] = None
 ):
     """
     Upload and process the file
 
     Args:
         file (UploadFile): the file to be uploaded and processed
+        replaces_file_id: Index the file as a new version of this file_id.
+            Only new or changed chunks are embedded; unchanged ones keep
+            their embeddings and chunks missing from the new version are
+            deleted. The file_id stays the same.
     """
     try:
 
-        logger.debug(f"Processing file: {file.filename}")
+        logger.debug("Processing file: %s", file.filename)
         # Verify the uploaded file
         if file.filename is None:
             raise HTTPException(
@@ -43,14 +55,14 @@ async def upload_document(
 
         file_extension = Path(str(file.filename)).suffix.lower()
         if file_extension not in settings.SUPPORTED_FILE_TYPE:
-            logger.error(f"Unsupported file format: {file_extension}")
+            logger.error("Unsupported file format: %s", file_extension)
             raise HTTPException(
                 status_code=400,
                 detail=f"Unsupported file types. Supported filetypes are: {', '.join(settings.SUPPORTED_FILE_TYPE.keys())}"
             )
 
         # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
+        with span("read", INGEST_STAGE_SECONDS), tempfile.NamedTemporaryFile(delete=False) as tmp_file:
             # Write uploaded contents to tmp file
             content = await file.read()
             tmp_file.write(content)
@@ -58,11 +70,12 @@ async def upload_document(
 
         try:
             # Process the file content
-            logger.debug(f"Extarcting document: {file.filename}")
-            documents = process_file(tmp_file_path, file_extension)
+            logger.debug("Extarcting document: %s", file.filename)
+            with span("parse", INGEST_STAGE_SECONDS):
+                documents = process_file(tmp_file_path, file_extension)
 
             if not indexer.is_initialized:
-                indexer.initialize()
+                await asyncio.to_thread(indexer.initialize)
 
             if indexer.text_splitter is None:
                 raise RuntimeError("Text spliter is not initialized properly.")
@@ -72,11 +85,18 @@ async def upload_document(
 
             # split document into chunks
             logger.debug("Splititng documents into chunks.")
-            chunks = indexer.text_splitter.split_documents(documents)
-            logger.debug(f"Documents splitted into {len(chunks)} chunks.")
+            with span("split", INGEST_STAGE_SECONDS):
+                chunks = indexer.text_splitter.split_documents(documents)
+            logger.debug("Documents splitted into %d chunks.", len(chunks))
+
+            if replaces_file_id and not await asyncio.to_thread(indexer.has_file, replaces_file_id):
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"File {replaces_file_id} not found"
+                )
 
             # Generate unique file_id for each files
-            file_id = str(uuid.uuid4())
+            file_id = replaces_file_id or str(uuid.uuid4())
             current_time = time.time()
 
             # Add metadata to chunks
@@ -89,33 +109,87 @@ async def upload_document(
                     "chunk_size": len(chunk.page_content),
                     "chunk_index": i,  # Add index to track chunk order
                     "total_chunks": len(chunks),
-                    "source_type": "upload"
+                    "source_type": "upload",
+                    "chunk_hash": chunk_hash(chunk.page_content)
                 })
 
-            # Add chunks to vector store
-            indexer.vector_store.add_documents(chunks)
+            # Hold back embedding while the process is short on memory
+            await memory_governor.athrottle(indexer)
+
+            # Add chunks to vector store (embedding + write)
+            with span("index", INGEST_STAGE_SECONDS):
+                if replaces_file_id:
+                    delta = await asyncio.to_thread(indexer.replace_file, file_id, chunks)
+                else:
+                    indexer.add_documents(chunks)
+                    delta = {"reused": 0, "embedded": len(chunks), "deleted": 0}
+
+            version = await version_service.arecord_version(
+                file_id, file.filename, len(chunks),
+                delta["reused"], delta["embedded"], delta["deleted"],
+                replaced=bool(replaces_file_id)
+            )
+            if replaces_file_id:
+                logger.info("Replaced file %s with version %d: %d chunks reused, %d embedded, %d deleted",
+                            file_id, version, delta["reused"], delta["embedded"], delta["deleted"])
 
             if not session_id:
-                session_id = session_service.create_session(file_id)
-            elif session_service.get_session(session_id):
+                session_id = await session_service.acreate_session(file_id)
+            elif await session_service.aget_session(session_id):
                 logger.debug("Session is already initiated")
-                session_service.insert_file_id(session_id, file_id)
-                logger.debug(f"New file id {file_id} is added to the session.")
+                await session_service.ainsert_file_id(session_id, file_id)
+                logger.debug("New file id %s is added to the session.", file_id)
 
             return {
                 "status": "success",
                 "message": f"File {file.filename} processed and indexed sucessfully.",
                 "file_id": file_id,
                 "chunks_created": len(chunks),
-                "session_id": session_id
+                "session_id": session_id,
+                "version": version,
+                "chunks_reused": delta["reused"],
+                "chunks_embedded": delta["embedded"],
+                "chunks_deleted": delta["deleted"]
             }
 
         finally:
             if tmp_file_path and Path(tmp_file_path).exists():
                 Path(tmp_file_path).unlink()
 
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to process file: {str(e)}"
         )
+
+
+@router.get("/{file_id}/versions", response_model=List[DocumentVersion])
+async def get_document_versions(
+        file_id: str,
+        version_service: "DocumentVersionService" = Depends(get_document_version_service)
+):
+    """
+    List the indexed versions of a document, oldest first
+
+    Args:
+        file_id: File id returned by /documents/upload
+    """
+    try:
+        versions = await version_service.aget_versions(file_id)
+        if not versions:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No versions recorded for file {file_id}"
+            )
+        return [{**version, "created_at": str(version["created_at"])} for version in versions]
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error("Error loading versions of %s: %s", file_id, e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to load document versions: {str(e)}"
+        )
@@ -1,25 +1,159 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
-from src.services.rag import RAGService
-from src.models.chat import ChatRequest, ChatResponse
-from src.services.session import SessionService
+from src.config import settings
+from src.models.chat import (
+    ChatBatchRequest, ChatBatchResponse, ChatRequest, ChatResponse, ChatHistoryPage, ChatSocketMessage
+)
+from src.services.session import session_context_cache
+from src.utils.dependency import get_chat_service, get_rag_service, get_session_service
 from src.utils.logger import logger
-from src.services.chat import ChatService
-import json
+from src.utils.sse import coalesce, dumps, resolve_stream_options, sse_frames
+from pydantic import ValidationError
+from starlette.websockets import WebSocketState
+from typing import AsyncIterator, Dict, List, Literal, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.services.chat import ChatService
+    from src.services.rag import RAGService
+    from src.services.session import SessionContext, SessionService
 
 router = APIRouter(prefix="/chat", tags=["chat"])
-rag_service = RAGService()
-session_service = SessionService()
-chat_service = ChatService()
 
 
-@router.post("/history")
-async def get_chat_history(session_id: str):
+async def load_session_context(session_service: "SessionService", session_id: Optional[str]) -> "SessionContext":
+    """
+    Load the context of an existing session or create a new one
+
+    Args:
+        session_service: Session service
+        session_id: Optional session id from the request
+
+    Returns:
+        SessionContext: Session row, file ids and recent chat history
+    """
+    if not session_id:
+        logger.debug("No session id creating a new seesion.")
+        session_id = await session_service.acreate_session()
+
+    context = await session_service.aload_context(session_id)
+    if context is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Session not found"
+        )
+    logger.debug("Session Id: %s", session_id, extra={"event": "session.loaded"})
+    return context
+
+
+async def answer_tokens(
+    rag_service: "RAGService",
+    chat_service: "ChatService",
+    session_id: str,
+    question: str,
+    chat_history: List[Dict],
+    file_ids: Optional[List[str]],
+    turn: Optional[Dict] = None
+) -> AsyncIterator[str]:
+    """
+    Stream the answer text for one chat turn and persist it when done
+
+    If the stream is cancelled (client disconnect or explicit cancel), the
+    partial answer is saved with a "cancelled" marker in its metadata. If
+    generation fails, the partial answer is saved with an "error" instead.
+
+    Args:
+        rag_service: RAG service generating the answer
+        chat_service: Chat service persisting the answer
+        session_id: Session the turn belongs to
+        question: User's question
+        chat_history: Recent chat history of the session
+        file_ids: Files the answer is grounded on
+        turn: Optional dict that receives the final "answer", "processing_time",
+            "completed" and, if generation failed, "error"
     """
-    Get chat history based on session_id
+    turn = turn if turn is not None else {}
+    full_response = ""
+    processing_time = 0.0
+    completed = False
+    cancelled = False
+    error = None
+    try:
+        async for chunk in rag_service.generate_stream_response(
+            question=question,
+            chat_history=chat_history,
+            file_ids=file_ids
+        ):
+            processing_time = chunk.get("processing_time", processing_time)
+            if chunk["is_complete"]:
+                completed = True
+                error = chunk.get("error")
+                metadata = {"processing_time": processing_time}
+                if error:
+                    metadata["error"] = error
+                # Save the complete response to the database
+                await chat_service.asave_message(
+                    session_id=session_id,
+                    role="assistant",
+                    content=full_response,
+                    metadata=str(metadata)
+                )
+            else:
+                full_response += chunk.get("answer", "")
+                yield chunk.get("answer", "")
+    except (asyncio.CancelledError, GeneratorExit):
+        cancelled = True
+        raise
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        if not completed:
+            error = None if cancelled else error or "Answer stream ended before completion"
+            metadata = {"processing_time": processing_time}
+            if cancelled:
+                # Client went away mid-answer: keep what was generated
+                logger.info("Stream cancelled for session %s after %d chars", session_id, len(full_response),
+                            extra={"event": "rag.cancelled"})
+                metadata["cancelled"] = True
+            else:
+                logger.error("Stream failed for session %s after %d chars: %s", session_id, len(full_response), error,
+                             extra={"event": "rag.error"})
+                metadata["error"] = error
+            # save_message only buffers, so it is safe while cancelling
+            chat_service.save_message(
+                session_id=session_id,
+                role="assistant",
+                content=full_response,
+                metadata=str(metadata)
+            )
+        turn.update(answer=full_response, processing_time=processing_time, completed=completed, error=error)
+
+
+@router.post("/history", response_model=ChatHistoryPage)
+async def get_chat_history(
+    session_id: str,
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    chat_service: "ChatService" = Depends(get_chat_service)
+):
+    """
+    Get chat history based on session_id, one page at a time
+
+    Without a cursor the most recent `limit` messages are returned. Pass
+    `next_before` as `before` to page backwards and `next_after` as `after`
+    to page forwards. With `format=ndjson` the whole history (or everything
+    after `after`) is streamed as one JSON message per line; `before` is
+    rejected there.
 
     Args:
         session_id: Seesion id for the chat
+        limit: Maximum number of messages per page
+        before: Return messages older than this message id
+        after: Return messages newer than this message id
+        format: "json" for a single page, "ndjson" to stream an export
     """
     try:
         if not session_id:
@@ -29,79 +163,121 @@ async def get_chat_history(session_id: str):
                 detail="No session id provided."
             )
 
-        return chat_service.get_chat_history(session_id)
+        if before and after:
+            raise HTTPException(
+                status_code=400,
+                detail="Use either 'before' or 'after', not both."
+            )
+
+        if format == "ndjson":
+            if before:
+                raise HTTPException(
+                    status_code=400,
+                    detail="The NDJSON export reads forwards: use 'after', not 'before'."
+                )
+            # Read the first batch before streaming, so an unknown cursor is still a 400
+            first_page = await chat_service.aget_history_page(
+                session_id,
+                settings.HISTORY_MAX_PAGE_SIZE,
+                after=after,
+                from_start=after is None
+            )
+            return StreamingResponse(
+                _export_history(chat_service, session_id, first_page),
+                media_type="application/x-ndjson"
+            )
+
+        messages, has_more = await chat_service.aget_history_page(
+            session_id,
+            limit,
+            before=before,
+            after=after
+        )
+
+        if after:
+            older_exist, newer_exist = bool(messages), has_more
+        else:
+            older_exist, newer_exist = has_more, bool(before and messages)
+
+        return ChatHistoryPage(
+            messages=messages,
+            has_more=has_more,
+            next_before=messages[0]["message_id"] if older_exist else None,
+            next_after=messages[-1]["message_id"] if newer_exist else None
+        )
+    except HTTPException as he:
+        raise he
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     except Exception as e:
-        logger.error(f"Error while retiving the chat history: {str(e)}")
+        logger.error("Error while retiving the chat history: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve chat history: {str(e)}"
+        )
+
+
+async def _export_history(chat_service: "ChatService", session_id: str, first_page: Tuple[List[Dict], bool]):
+    """
+    Stream the chat history as NDJSON, reading it in keyset batches so memory
+    stays constant regardless of session length
+    """
+    messages, has_more = first_page
+    while True:
+        for message in messages:
+            yield dumps(message) + b"\n"
+        if not has_more:
+            break
+        messages, has_more = await chat_service.aget_history_page(
+            session_id,
+            settings.HISTORY_MAX_PAGE_SIZE,
+            after=messages[-1]["message_id"]
+        )
 
 
 @router.post("/stream")
-async def stream(request: ChatRequest):
+async def stream(
+    request: ChatRequest,
+    http_request: Request,
+    rag_service: "RAGService" = Depends(get_rag_service),
+    session_service: "SessionService" = Depends(get_session_service),
+    chat_service: "ChatService" = Depends(get_chat_service)
+):
     """
     Process chat request and generate streaming response using RAG.
 
     Args:
         request: The chat request containing question and optional parameters
+        http_request: The underlying HTTP request, used to detect client disconnects
     """
     try:
-        # Get or create session
-        session_id = request.session_id
-
-        if not session_id:
-            logger.debug("No session id creating a new seesion.")
-            session_id = session_service.create_session()
-        elif not session_service.get_session(session_id):
-            raise HTTPException(
-                status_code=404,
-                detail="Session not found"
-            )
-        logger.debug(f"Session Id: {session_id}")
-
-        # Get chat history
-        chat_history = chat_service.get_chat_history(session_id)
-
-        # Get file_id
-        file_ids = session_service.get_file_id(session_id) if session_service.get_file_id(session_id) else None
-        logger.debug(f"Retrieved file_id from session: {file_ids}")
+        # Get or create session, with its files and recent history
+        context = await load_session_context(session_service, request.session_id)
+        session_id = context.session_id
+        chat_history = context.chat_history
+        file_ids = context.file_ids or None
+        logger.debug("Retrieved file_id from session: %s", file_ids, extra={"event": "session.files"})
 
         # Save user message
-        chat_service.save_message(
+        await chat_service.asave_message(
             session_id=session_id,
             role="user",
             content=request.question
         )
 
-        async def generate():
-            full_response = ""
-            async for chunk in rag_service.generate_stream_response(
-                question=request.question,
-                chat_history=chat_history,
-                file_ids=file_ids
-            ):
-                if chunk["is_complete"]:
-                    # Save the complete response to the database
-                    # logger.debug(f"Full response: {full_response}")
-                    chat_service.save_message(
-                        session_id=session_id,
-                        role="assistant",
-                        content=full_response,
-                        metadata=str({
-                            "processing_time": chunk.get("processing_time", 0.0),
-                        })
-                    )
-                else:
-                    # Return individual chunk along with metadata if needed
-                    full_response += chunk.get("answer", "")
-                    response_data = {
-                        "answer": chunk.get("answer", ""),
-                        # "processing_time": chunk.get("processing_time", 0.0),
-                        # "session_id": session_id,
-                        # "is_complete": chunk.get("is_complete", False)
-                    }
-                    yield f"data: {json.dumps(response_data)}\n\n"
-
+        # Tokens are batched into fewer, larger SSE frames (see sse_frames),
+        # and generation is cancelled as soon as the client disconnects
         return StreamingResponse(
-            generate(),
-            media_type="text/event-stream"
+            sse_frames(
+                answer_tokens(rag_service, chat_service, session_id, request.question, chat_history, file_ids),
+                request.stream_options,
+                http_request.is_disconnected
+            ),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
         )
 
     except HTTPException as he:
@@ -114,7 +290,12 @@ async def stream(request: ChatRequest):
 
 
 @router.post("/", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(
+    request: ChatRequest,
+    rag_service: "RAGService" = Depends(get_rag_service),
+    session_service: "SessionService" = Depends(get_session_service),
+    chat_service: "ChatService" = Depends(get_chat_service)
+):
     """
     Process chat request and generate response using RAG.
 
@@ -122,28 +303,15 @@ async def chat(request: ChatRequest):
         request: The chat request containing question and optional parameters
     """
     try:
-        # Get or create session
-        session_id = request.session_id
-
-        if not session_id:
-            logger.debug("No session id creating a new seesion.")
-            session_id = session_service.create_session()
-        elif not session_service.get_session(session_id):
-            raise HTTPException(
-                status_code=404,
-                detail="Session not found"
-            )
-        logger.debug(f"Session Id: {session_id}")
-
-        # Get chat history
-        chat_history = chat_service.get_chat_history(session_id)
-
-        # Get file_id
-        file_ids = session_service.get_file_id(session_id) if session_service.get_file_id(session_id) else None
-        logger.debug(f"Retrieved file_id from session: {file_ids}")
+        # Get or create session, with its files and recent history
+        context = await load_session_context(session_service, request.session_id)
+        session_id = context.session_id
+        chat_history = context.chat_history
+        file_ids = context.file_ids or None
+        logger.debug("Retrieved file_id from session: %s", file_ids, extra={"event": "session.files"})
 
         # Save user message
-        chat_service.save_message(
+        await chat_service.asave_message(
             session_id=session_id,
             role="user",
             content=request.question
@@ -162,7 +330,7 @@ async def chat(request: ChatRequest):
             )
 
         # Save assistant response
-        chat_service.save_message(
+        await chat_service.asave_message(
             session_id=session_id,
             role="assistant",
             content=response.get("answer", "No answer generated"),
@@ -184,3 +352,196 @@ async def chat(request: ChatRequest):
             status_code=500,
             detail=f"Failed to process chat request: {str(e)}"
         )
+
+
+@router.post("/batch", response_model=ChatBatchResponse)
+async def chat_batch(
+    request: ChatBatchRequest,
+    rag_service: "RAGService" = Depends(get_rag_service),
+    session_service: "SessionService" = Depends(get_session_service)
+):
+    """
+    Answer many independent questions over the same files.
+
+    Meant for evaluation and report jobs: nothing is read from or written
+    to chat history. Questions are embedded and searched together, and
+    answered by at most BATCH_GENERATION_CONCURRENCY concurrent LLM calls.
+
+    Args:
+        request: Questions, and the files to answer from: file_ids, or the
+            files of session_id, or all documents when neither is given.
+            An empty file_ids list or a session without files is a 400.
+    """
+    try:
+        if len(request.questions) > settings.BATCH_MAX_QUESTIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.BATCH_MAX_QUESTIONS} questions per batch"
+            )
+
+        file_ids = request.file_ids
+        if file_ids is not None and not file_ids:
+            raise HTTPException(
+                status_code=400,
+                detail="file_ids is empty; omit it to answer from all documents."
+            )
+        if file_ids is None and request.session_id:
+            if not await session_service.aget_session(request.session_id):
+                raise HTTPException(
+                    status_code=404,
+                    detail="Session not found"
+                )
+            file_ids = await session_service.aget_file_id(request.session_id)
+            if not file_ids:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Session has no files."
+                )
+
+        result = await rag_service.generate_batch(
+            questions=request.questions,
+            file_ids=file_ids,
+            k=request.k,
+            concurrency=settings.BATCH_GENERATION_CONCURRENCY
+        )
+        logger.info("Answered batch of %d questions (%d failed) in %.3fs",
+                    len(request.questions), result["failed"], result["processing_time"],
+                    extra={"event": "rag.batch"})
+        return result
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process batch request: {str(e)}"
+        )
+
+
+@router.websocket("/ws")
+async def chat_socket(
+    websocket: WebSocket,
+    rag_service: "RAGService" = Depends(get_rag_service),
+    session_service: "SessionService" = Depends(get_session_service),
+    chat_service: "ChatService" = Depends(get_chat_service)
+):
+    """
+    Multiplexed streaming chat over a single WebSocket connection.
+
+    Client messages (JSON):
+        {"type": "chat", "request_id": str, "question": str, "session_id": str | null,
+         "stream_options": {...} | null}
+        {"type": "cancel", "request_id": str}   stop a running answer
+        {"type": "refresh", "request_id": str, "session_id": str}   drop a session from the context cache
+
+    Server messages carry the request_id they belong to:
+        {"type": "start", "request_id", "session_id"}
+        {"type": "token", "request_id", "answer"}
+        {"type": "done", "request_id", "session_id", "processing_time", "cancelled"}
+        {"type": "error", "request_id", "detail"}
+
+    Several chat requests may run at once. Every turn loads its session
+    context through the shared session cache, so it sees files linked and
+    messages saved by other connections.
+    """
+    await websocket.accept()
+    tasks: Dict[str, asyncio.Task] = {}
+    send_lock = asyncio.Lock()
+
+    async def send(payload: Dict):
+        async with send_lock:
+            await websocket.send_text(dumps(payload).decode("utf-8"))
+
+    async def run_turn(message: ChatSocketMessage):
+        request_id = message.request_id
+        session_id = message.session_id
+        turn: Dict = {}
+        try:
+            if not message.question:
+                raise HTTPException(status_code=400, detail="No question provided.")
+
+            context = await load_session_context(session_service, message.session_id)
+            session_id = context.session_id
+            await send({"type": "start", "request_id": request_id, "session_id": context.session_id})
+
+            chat_history = list(context.chat_history)
+            chat_service.save_message(
+                session_id=context.session_id,
+                role="user",
+                content=message.question
+            )
+
+            options = resolve_stream_options(message.stream_options)
+            options.heartbeat_seconds = 0  # WebSocket keep-alive is handled by ping frames
+            tokens = answer_tokens(
+                rag_service,
+                chat_service,
+                context.session_id,
+                message.question,
+                chat_history,
+                context.file_ids or None,
+                turn
+            )
+            async for text in coalesce(tokens, options):
+                await send({"type": "token", "request_id": request_id, "answer": text})
+            if turn.get("error"):
+                # Already logged and saved by answer_tokens
+                await send({"type": "error", "request_id": request_id,
+                            "detail": f"Failed to process chat request: {turn['error']}"})
+                return
+
+            await send({
+                "type": "done",
+                "request_id": request_id,
+                "session_id": context.session_id,
+                "processing_time": turn.get("processing_time", 0.0),
+                "cancelled": False
+            })
+        except asyncio.CancelledError:
+            # Explicit cancel: tell the client, unless the socket is gone
+            if websocket.client_state == WebSocketState.CONNECTED:
+                try:
+                    await send({
+                        "type": "done",
+                        "request_id": request_id,
+                        "session_id": session_id,
+                        "processing_time": turn.get("processing_time", 0.0),
+                        "cancelled": True
+                    })
+                except Exception:
+                    pass
+            raise
+        except HTTPException as he:
+            await send({"type": "error", "request_id": request_id, "detail": he.detail})
+        except Exception as e:
+            logger.error("Error in websocket chat request %s: %s", request_id, e)
+            await send({"type": "error", "request_id": request_id, "detail": f"Failed to process chat request: {str(e)}"})
+        finally:
+            tasks.pop(request_id, None)
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = ChatSocketMessage.model_validate_json(raw)
+            except ValidationError as e:
+                await send({"type": "error", "request_id": None, "detail": e.errors(include_url=False)})
+                continue
+
+            if message.type == "chat":
+                if message.request_id in tasks:
+                    await send({"type": "error", "request_id": message.request_id, "detail": "Duplicate request_id."})
+                    continue
+                tasks[message.request_id] = asyncio.create_task(run_turn(message))
+            elif message.type == "cancel":
+                task = tasks.get(message.request_id)
+                if task is not None:
+                    task.cancel()
+            elif message.type == "refresh" and message.session_id:
+                session_context_cache.invalidate(message.session_id)
+    except WebSocketDisconnect:
+        logger.debug("Chat websocket disconnected")
+    finally:
+        # Stop generating for a client that is gone
+        for task in list(tasks.values()):
+            task.cancel()
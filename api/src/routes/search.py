@@ -0,0 +1,106 @@
+import time
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from src.config import settings
+from src.models.chat import SearchRequest, SearchResponse
+from src.utils.dependency import get_indexer
+from src.utils.logger import logger
+from src.utils.sse import dumps
+from typing import Dict, List, Literal, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from src.services.indexer import Indexer
+
+router = APIRouter(tags=["search"])
+
+
+def _search_result(index: int, query: str, hits: List[Tuple["Document", float, float]]) -> Dict:
+    return {
+        "index": index,
+        "query": query,
+        "hits": [
+            {
+                "rank": rank,
+                "chunk_id": document.id,
+                "file_id": document.metadata.get("file_id"),
+                "file_name": document.metadata.get("file_name"),
+                "chunk_index": document.metadata.get("chunk_index"),
+                "score": score,
+                "distance": distance,
+                "content": document.page_content,
+                "metadata": document.metadata,
+            }
+            for rank, (document, score, distance) in enumerate(hits, start=1)
+        ],
+    }
+
+
+async def _stream_results(queries: List[str], results: List[List[Tuple["Document", float, float]]]):
+    """One NDJSON line per query, in query order"""
+    for index, (query, hits) in enumerate(zip(queries, results)):
+        yield dumps(_search_result(index, query, hits)) + b"\n"
+
+
+@router.post("/search", response_model=SearchResponse)
+async def search(
+    request: SearchRequest,
+    format: Literal["json", "ndjson"] = "json",
+    indexer: "Indexer" = Depends(get_indexer)
+):
+    """
+    Retrieve the chunks most relevant to one or many queries, without generating an answer
+
+    All queries are embedded in one call and searched in one vector store
+    query per collection.
+
+    Args:
+        request: Queries (a string or a list), optional file_ids to search
+            in (all documents when omitted, a 400 when empty), k results per
+            query and a minimum relevance score
+        format: "json" for one response, "ndjson" to stream one line per query
+    """
+    try:
+        if len(request.queries) > settings.SEARCH_MAX_QUERIES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.SEARCH_MAX_QUERIES} queries per request"
+            )
+        if request.file_ids is not None and not request.file_ids:
+            raise HTTPException(
+                status_code=400,
+                detail="file_ids is empty; omit it to search all documents."
+            )
+
+        start_time = time.perf_counter()
+        results = await indexer.search_queries(
+            request.queries,
+            k=request.k,
+            file_ids=request.file_ids,
+            score_threshold=request.score_threshold
+        )
+        processing_time = time.perf_counter() - start_time
+        logger.info("Searched %d queries in %.3fs", len(request.queries), processing_time,
+                    extra={"event": "search"})
+
+        if format == "ndjson":
+            return StreamingResponse(
+                _stream_results(request.queries, results),
+                media_type="application/x-ndjson"
+            )
+        return {
+            "results": [
+                _search_result(index, query, hits)
+                for index, (query, hits) in enumerate(zip(request.queries, results))
+            ],
+            "processing_time": processing_time,
+        }
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error("Error while searching: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to search documents: {str(e)}"
+        )
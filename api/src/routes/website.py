@@ -1,13 +1,11 @@
 from fastapi import APIRouter
 from typing import Optional
 from pydantic import BaseModel
-from src.services.session import SessionService
 from src.utils.logger import logger
 from src.models.chat import WebsiteUploadResponse
 from src.utils.scrape_website import load_website
 
 router = APIRouter(prefix="/website", tags=["website"])
-session_service = SessionService()
 
 
 class WebsiteProcessRequest(BaseModel):
@@ -27,7 +25,7 @@ async def upload_website(request: WebsiteProcessRequest):
         if not request.url:
             logger.error("Please provide URL to process.")
 
-        logger.debug(f"Start processing URL: {request.url}")
+        logger.debug("Start processing URL: %s", request.url)
         docs = load_website(request.url)
         print(docs)
 
@@ -40,4 +38,4 @@ async def upload_website(request: WebsiteProcessRequest):
         }
 
     except Exception as e:
-        logger.error(f"Error while processing website: {str(e)}")
+        logger.error("Error while processing website: %s", e)
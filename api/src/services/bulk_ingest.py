@@ -0,0 +1,329 @@
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+from src.config import settings
+from src.services.database import DatabaseService
+from src.services.memory import memory_governor
+from src.utils.logger import logger
+from src.utils.process_file import chunk_hash, create_text_splitter, process_file
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from src.services.indexer import Indexer
+
+# Namespace of the deterministic file ids, see BulkIngestService._file_id
+_FILE_ID_NAMESPACE = uuid.UUID("6f1c8a52-3d0e-4b7a-9a55-2c1f3e7d9b10")
+
+
+def _parse_and_split(path: str) -> List["Document"]:
+    """Worker process: extract a file and split it with the indexer's splitter"""
+    documents = process_file(path, Path(path).suffix.lower())
+    return create_text_splitter().split_documents(documents)
+
+
+class BulkIngestService:
+    """
+    Indexes every supported file below a directory
+
+    Pipeline:
+        parse + split: a process pool, `workers` files at a time
+        embed: buffered chunks of many files in `embed_batch_size` batches
+        write: one bulk upsert per partition, then one checkpoint transaction
+
+    Progress is stored in the ingest_files table. A run skips files that
+    are already done with the same size and mtime, so an interrupted run
+    resumes where it stopped. File and chunk ids derive from the path
+    only: a file that changed (or was just touched) is written over its
+    previous chunks, and chunks left over from a longer previous version
+    are deleted. Files written to the vector store but not checkpointed
+    before a crash are overwritten, not duplicated, on the next run.
+    Files that disappeared from root are removed from the vector store
+    and their session.
+
+    Ingested files are linked to a session (new or given); their
+    checkpoints also keep them from vector GC.
+    """
+
+    def __init__(
+        self,
+        indexer: "Indexer",
+        workers: int = 0,
+        embed_batch_size: int = 256,
+        write_batch_chunks: int = 2048
+    ):
+        """
+        Args:
+            indexer: Indexer whose embedding model and vector store are used
+            workers: Parser processes (0 = one per core)
+            embed_batch_size: Texts per embedding call
+            write_batch_chunks: Chunks buffered before they are embedded and written
+        """
+        self.indexer = indexer
+        self.db = DatabaseService()
+        self.workers = workers or os.cpu_count() or 1
+        self.embed_batch_size = embed_batch_size
+        self.write_batch_chunks = write_batch_chunks
+
+    def _discover(self, root: Path) -> List[Tuple[Path, int, float]]:
+        """Supported files below root with their size and mtime, in path order"""
+        files = []
+        for path in sorted(root.rglob("*")):
+            if path.is_file() and path.suffix.lower() in settings.SUPPORTED_FILE_TYPE:
+                stat = path.stat()
+                files.append((path.resolve(), stat.st_size, stat.st_mtime))
+        return files
+
+    def _done(self) -> Dict[str, Tuple[int, float]]:
+        with self.db.get_connection() as conn:
+            rows = conn.execute("SELECT path, size, mtime FROM ingest_files WHERE status = 'done'")
+            return {path: (size, mtime) for path, size, mtime in rows}
+
+    def _last_session(self, root: str) -> Optional[str]:
+        """Session of the previous run over root, so a resumed run keeps adding to it"""
+        with self.db.get_connection() as conn:
+            row = conn.execute(
+                """
+                SELECT session_id FROM ingest_files
+                WHERE root = ? AND session_id IS NOT NULL
+                ORDER BY updated_at DESC LIMIT 1
+                """,
+                (root,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _previous(self, root: Path) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """File id and session of every checkpointed file below root, by path"""
+        with self.db.get_connection() as conn:
+            rows = conn.execute("SELECT path, file_id, session_id FROM ingest_files WHERE root = ?", (str(root),))
+            return {path: (file_id, session_id) for path, file_id, session_id in rows}
+
+    @staticmethod
+    def _file_id(path: Path) -> str:
+        return str(uuid.uuid5(_FILE_ID_NAMESPACE, str(path)))
+
+    def _remove_missing(self, root: Path, files: List[Tuple[Path, int, float]]) -> int:
+        """Delete the chunks, session links and checkpoints of files no longer below root"""
+        present = {str(path) for path, _, _ in files}
+        missing = {path: entry for path, entry in self._previous(root).items() if path not in present}
+        for path, (file_id, _) in missing.items():
+            if file_id:
+                self.indexer.delete_file(file_id)
+        if missing:
+            with self.db.get_connection() as conn:
+                for path, (file_id, session_id) in missing.items():
+                    conn.execute("DELETE FROM session_files WHERE session_id = ? AND file_id = ?", (session_id, file_id))
+                    conn.execute("DELETE FROM ingest_files WHERE path = ?", (path,))
+                conn.commit()
+            logger.info("Removed %d files no longer below %s", len(missing), root)
+        return len(missing)
+
+    def run(self, root: Path, session_id: Optional[str] = None, limit: Optional[int] = None) -> Dict:
+        """
+        Ingest the pending files below root
+
+        Args:
+            root: Directory to walk
+            session_id: Session to link the files to (default: the previous run's, or a new one)
+            limit: Stop after this many files (for trial runs)
+
+        Returns:
+            Dict: Counts, duration, files/sec and chunks/sec
+        """
+        from src.services.session import SessionService
+
+        root = Path(root).resolve()
+        if not root.is_dir():
+            raise ValueError(f"{root} is not a directory")
+        if not self.indexer.is_initialized:
+            self.indexer.initialize()
+        if not self.indexer.is_initialized:
+            raise RuntimeError("Indexer could not be initialized.")
+
+        files = self._discover(root)
+        files_removed = self._remove_missing(root, files)
+        done = self._done()
+        changed = [f for f in files if done.get(str(f[0])) != (f[1], f[2])]
+        pending = changed if limit is None else changed[:limit]
+        stats = {
+            "root": str(root),
+            "files_found": len(files),
+            "files_skipped": len(files) - len(changed),
+            "files": 0,
+            "files_failed": 0,
+            "files_removed": files_removed,
+            "chunks": 0,
+        }
+        if not pending:
+            stats.update(session_id=session_id or self._last_session(str(root)), duration=0.0,
+                         files_per_second=0.0, chunks_per_second=0.0)
+            return stats
+
+        session_service = SessionService()
+        session_id = session_id or self._last_session(str(root))
+        if session_id is None or not session_service.get_session(session_id):
+            session_id = session_service.create_session()
+        stats["session_id"] = session_id
+        logger.info("Ingesting %d files from %s (%d already done) into session %s",
+                    len(pending), root, stats["files_skipped"], session_id)
+
+        start = time.perf_counter()
+        buffer: List[Tuple[Tuple[Path, int, float], List["Document"]]] = []
+        buffered_chunks = 0
+        queue = iter(pending)
+        # spawn: the parent holds embedding / Chroma threads that must not be forked
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            in_flight: Dict[Future, Tuple[Path, int, float]] = {}
+
+            def submit_next():
+                entry = next(queue, None)
+                if entry is not None:
+                    in_flight[pool.submit(_parse_and_split, str(entry[0]))] = entry
+
+            for _ in range(self.workers * 2):
+                submit_next()
+
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    entry = in_flight.pop(future)
+                    submit_next()
+                    try:
+                        chunks = future.result()
+                    except Exception as e:
+                        logger.error("Error parsing %s: %s", entry[0], e)
+                        self._checkpoint_failure(root, entry, str(e))
+                        stats["files_failed"] += 1
+                        continue
+                    buffer.append((entry, chunks))
+                    buffered_chunks += len(chunks)
+
+                # Parsing continues in the pool while the parent embeds and writes
+                if buffered_chunks >= self.write_batch_chunks:
+                    self._flush(root, session_id, buffer, stats, start)
+                    buffer, buffered_chunks = [], 0
+            self._flush(root, session_id, buffer, stats, start)
+
+        duration = time.perf_counter() - start
+        stats.update(
+            duration=round(duration, 3),
+            files_per_second=round(stats["files"] / duration, 3) if duration else 0.0,
+            chunks_per_second=round(stats["chunks"] / duration, 3) if duration else 0.0,
+        )
+        return stats
+
+    def _flush(
+        self,
+        root: Path,
+        session_id: str,
+        buffer: List[Tuple[Tuple[Path, int, float], List["Document"]]],
+        stats: Dict,
+        start: float
+    ):
+        """Embed and write the buffered files, then checkpoint them in one transaction"""
+        if not buffer:
+            return
+        # Parsed files wait here while the process is short on memory
+        memory_governor.throttle(self.indexer)
+        upload_time = time.time()
+        previous = self._previous(root)
+        chunks: List["Document"] = []
+        ids: List[str] = []
+        file_ids: List[str] = []
+        for (path, size, mtime), file_chunks in buffer:
+            file_id = self._file_id(path)
+            file_ids.append(file_id)
+            for i, chunk in enumerate(file_chunks):
+                # Same metadata as /documents/upload
+                chunk.metadata.update({
+                    "file_id": file_id,
+                    "file_name": path.name,
+                    "file_type": path.suffix.lower(),
+                    "upload_timestamp": upload_time,
+                    "chunk_size": len(chunk.page_content),
+                    "chunk_index": i,
+                    "total_chunks": len(file_chunks),
+                    "source_type": "bulk",
+                    "chunk_hash": chunk_hash(chunk.page_content)
+                })
+                chunks.append(chunk)
+                ids.append(f"{file_id}:{i}")
+
+        embeddings: List[List[float]] = []
+        for i in range(0, len(chunks), self.embed_batch_size):
+            batch = [chunk.page_content for chunk in chunks[i:i + self.embed_batch_size]]
+            embeddings.extend(self.indexer.embedding_model.embed_documents(batch))
+        if chunks:
+            self.indexer.add_embedded_documents(chunks, embeddings, ids)
+
+        # Drop what is left of previous versions once the new ones are searchable
+        written = set(ids)
+        for ((path, _, _), _), file_id in zip(buffer, file_ids):
+            previous_id, _ = previous.get(str(path), (None, None))
+            if previous_id is None:
+                continue
+            self.indexer.delete_file(file_id, keep_ids=written)
+            if previous_id != file_id:
+                self.indexer.delete_file(previous_id)
+
+        current_time = datetime.utcnow()
+        with self.db.get_connection() as conn:
+            for ((path, size, mtime), file_chunks), file_id in zip(buffer, file_ids):
+                previous_id, previous_session = previous.get(str(path), (None, None))
+                if previous_id is not None:
+                    # Relinked below unless the new version has no chunks
+                    conn.execute(
+                        "DELETE FROM session_files WHERE session_id = ? AND file_id = ?",
+                        (previous_session, previous_id)
+                    )
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO ingest_files
+                        (path, root, size, mtime, file_id, session_id, chunks, status, error, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 'done', NULL, ?)
+                    """,
+                    (str(path), str(root), size, mtime, file_id, session_id, len(file_chunks), current_time)
+                )
+                if file_chunks:
+                    conn.execute(
+                        """
+                        INSERT OR IGNORE INTO session_files (session_id, file_id, added_at)
+                        VALUES (?, ?, ?)
+                        """,
+                        (session_id, file_id, current_time)
+                    )
+            conn.execute("UPDATE sessions SET last_updated = ? WHERE session_id = ?", (current_time, session_id))
+            conn.commit()
+
+        stats["files"] += len(buffer)
+        stats["chunks"] += len(chunks)
+        elapsed = time.perf_counter() - start
+        logger.info("Ingested %d files, %d chunks (%.1f files/s, %.1f chunks/s)",
+                    stats["files"], stats["chunks"], stats["files"] / elapsed, stats["chunks"] / elapsed)
+
+    def _checkpoint_failure(self, root: Path, entry: Tuple[Path, int, float], error: str):
+        """
+        Record a file that could not be parsed; it is retried on the next run
+
+        The file id and session of a previously ingested version are kept,
+        so the next successful run still replaces that version's chunks.
+        """
+        path, size, mtime = entry
+        with self.db.get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO ingest_files
+                    (path, root, size, mtime, file_id, session_id, chunks, status, error, updated_at)
+                VALUES (?, ?, ?, ?, NULL, NULL, NULL, 'failed', ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    root = excluded.root, size = excluded.size, mtime = excluded.mtime,
+                    status = excluded.status, error = excluded.error, updated_at = excluded.updated_at
+                """,
+                (str(path), str(root), size, mtime, error[:1000], datetime.utcnow())
+            )
+            conn.commit()
@@ -1,45 +1,127 @@
-import uuid
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from src.services.database import DatabaseService
+from src.services.message_log import message_log
+from src.services.session import session_context_cache
 
 
 class ChatService:
     def __init__(self):
         self.db = DatabaseService()
+        self.message_log = message_log
 
     def save_message(self, session_id: str, role: str, content: str, metadata: str = None):
-        """Save a message to the chat history"""
-        message_id = str(uuid.uuid4())
-        current_time = datetime.utcnow()
-
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                INSERT INTO messages (message_id, session_id, role, content, timestamp, metadata)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (message_id, session_id, role, content, current_time, metadata)
-            )
-            cursor.execute(
-                """
-                UPDATE sessions SET last_updated = ? WHERE session_id = ?
-                """,
-                (current_time, session_id)
-            )
-            conn.commit()
+        """Save a message to the chat history (buffered, see MessageLog)"""
+        message_id = self.message_log.append(session_id, role, content, metadata)
+        session_context_cache.invalidate(session_id)
+        return message_id
 
     def get_chat_history(self, session_id: str) -> list:
         """Get chat history for a session"""
+        # Snapshot unflushed messages *before* reading the table: anything
+        # committed in between shows up in the query and is de-duplicated.
+        pending = self.message_log.pending(session_id)
+
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                SELECT role, content FROM messages
+                SELECT message_id, role, content FROM messages
                 WHERE session_id = ?
                 ORDER BY timestamp ASC
                 """,
                 (session_id,)
             )
             messages = cursor.fetchall()
-        return [{"role": msg[0], "content": msg[1]} for msg in messages]
+
+        stored_ids = {msg[0] for msg in messages}
+        history = [{"role": msg[1], "content": msg[2]} for msg in messages]
+        history.extend(
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in pending if msg["message_id"] not in stored_ids
+        )
+        return history
+
+    def get_history_page(
+        self,
+        session_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        from_start: bool = False
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Get one page of chat history using (timestamp, message_id) keyset cursors
+
+        Args:
+            session_id: Session to read
+            limit: Maximum number of messages to return
+            before: Return messages older than this message id
+            after: Return messages newer than this message id
+            from_start: Without a cursor, page from the oldest message instead of the newest
+
+        Returns:
+            Tuple[List[Dict], bool]: Messages oldest first, and whether more
+            messages exist beyond the page in the paging direction
+        """
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor_row = None
+            if before or after:
+                cursor.execute(
+                    "SELECT timestamp, message_id FROM messages WHERE message_id = ? AND session_id = ?",
+                    (before or after, session_id)
+                )
+                cursor_row = cursor.fetchone()
+                if cursor_row is None:
+                    raise ValueError(f"Unknown history cursor: {before or after}")
+
+            if before:
+                condition, order = "AND (timestamp, message_id) < (?, ?)", "DESC"
+            elif after:
+                condition, order = "AND (timestamp, message_id) > (?, ?)", "ASC"
+            else:
+                condition, order = "", "ASC" if from_start else "DESC"
+
+            cursor.execute(
+                f"""
+                SELECT message_id, role, content, timestamp FROM messages
+                WHERE session_id = ? {condition}
+                ORDER BY timestamp {order}, message_id {order}
+                LIMIT ?
+                """,
+                (session_id, *(cursor_row or ()), limit + 1)
+            )
+            rows = cursor.fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if order == "DESC":
+            rows.reverse()
+        messages = [
+            {"message_id": row[0], "role": row[1], "content": row[2], "timestamp": row[3]}
+            for row in rows
+        ]
+        return messages, has_more
+
+    async def asave_message(self, session_id: str, role: str, content: str, metadata: str = None):
+        """Async version of save_message"""
+        return self.save_message(session_id, role, content, metadata)
+
+    async def aget_chat_history(self, session_id: str) -> list:
+        """Async version of get_chat_history"""
+        return await self.db.run(self.get_chat_history, session_id)
+
+    async def aget_history_page(
+        self,
+        session_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        from_start: bool = False
+    ) -> Tuple[List[Dict], bool]:
+        """Async version of get_history_page"""
+        # Page reads go straight to the table, so commit buffered messages first
+        if self.message_log.has_pending(session_id):
+            await self.message_log.flush()
+        return await self.db.run(self.get_history_page, session_id, limit, before, after, from_start)
@@ -1,55 +1,304 @@
+import asyncio
+import functools
+import os
+import socket
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Set, Tuple
 from src.utils.logger import logger
+from src.utils.metrics import span, DB_CALL_SECONDS
 from src.config import settings
 
 
+def _migration_001_initial_schema(cursor: sqlite3.Cursor):
+    """Create the original (un-normalized) schema for fresh databases"""
+    # Create sessions table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT,
+            created_at TIMESTAMP,
+            last_updated TIMESTAMP,
+            file_id TEXT NULL
+        )
+    ''')
+
+    # Create messages table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            message_id TEXT PRIMARY KEY,
+            session_id TEXT,
+            role TEXT,
+            content TEXT,
+            timestamp TIMESTAMP,
+            metadata TEXT,
+            FOREIGN KEY (session_id) REFERENCES sessions (session_id)
+        )
+    ''')
+
+
+def _migration_002_normalize_sessions(cursor: sqlite3.Cursor):
+    """
+    Split the one-row-per-(session, file) sessions table into
+    `sessions` and `session_files`, and index messages by session.
+    """
+    cursor.execute('''
+        CREATE TABLE sessions_v2 (
+            session_id TEXT PRIMARY KEY,
+            created_at TIMESTAMP NOT NULL,
+            last_updated TIMESTAMP NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO sessions_v2 (session_id, created_at, last_updated)
+        SELECT session_id, MIN(created_at), MAX(last_updated)
+        FROM sessions
+        WHERE session_id IS NOT NULL
+        GROUP BY session_id
+    ''')
+
+    # WITHOUT ROWID keeps (session_id, file_id) clustered, so file lookups
+    # for a session are served by the primary key alone.
+    cursor.execute('''
+        CREATE TABLE session_files (
+            session_id TEXT NOT NULL REFERENCES sessions (session_id),
+            file_id TEXT NOT NULL,
+            added_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (session_id, file_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO session_files (session_id, file_id, added_at)
+        SELECT session_id, file_id, MIN(created_at)
+        FROM sessions
+        WHERE session_id IS NOT NULL AND file_id IS NOT NULL
+        GROUP BY session_id, file_id
+    ''')
+    cursor.execute("CREATE INDEX idx_session_files_file_id ON session_files (file_id)")
+
+    # Drop + rename (instead of renaming the legacy table away) so the
+    # messages foreign key keeps pointing at `sessions`.
+    cursor.execute("DROP TABLE sessions")
+    cursor.execute("ALTER TABLE sessions_v2 RENAME TO sessions")
+    cursor.execute("CREATE INDEX idx_sessions_last_updated ON sessions (last_updated)")
+
+    cursor.execute("CREATE INDEX idx_messages_session_timestamp ON messages (session_id, timestamp)")
+
+
+def _migration_003_message_cursor_index(cursor: sqlite3.Cursor):
+    """
+    Extend the messages index with message_id so (timestamp, message_id)
+    keyset cursors used by history pagination are fully index-backed.
+    """
+    cursor.execute("DROP INDEX IF EXISTS idx_messages_session_timestamp")
+    cursor.execute("CREATE INDEX idx_messages_session_timestamp ON messages (session_id, timestamp, message_id)")
+
+
+def _migration_004_ingest_checkpoints(cursor: sqlite3.Cursor):
+    """Progress of `python -m src ingest` runs, one row per source file"""
+    cursor.execute('''
+        CREATE TABLE ingest_files (
+            path TEXT PRIMARY KEY,
+            root TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            file_id TEXT,
+            session_id TEXT,
+            chunks INTEGER,
+            status TEXT NOT NULL,
+            error TEXT,
+            updated_at TIMESTAMP NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX idx_ingest_files_root ON ingest_files (root, updated_at)")
+
+
+def _migration_005_document_versions(cursor: sqlite3.Cursor):
+    """One row per indexed version of an uploaded document"""
+    cursor.execute('''
+        CREATE TABLE document_versions (
+            file_id TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            file_name TEXT,
+            chunks INTEGER NOT NULL,
+            chunks_reused INTEGER NOT NULL,
+            chunks_embedded INTEGER NOT NULL,
+            chunks_deleted INTEGER NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (file_id, version)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _migration_006_pinned_files(cursor: sqlite3.Cursor):
+    """File ids whose chunks vector GC keeps although no session references them"""
+    cursor.execute('''
+        CREATE TABLE pinned_files (
+            file_id TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            pinned_at TIMESTAMP NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+
+def _migration_007_leases(cursor: sqlite3.Cursor):
+    """Named leases, so only one API process runs each maintenance loop"""
+    cursor.execute('''
+        CREATE TABLE leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+
+# Ordered list of (version, description, migration). Append new migrations
+# to the end; never edit or reorder ones that have already shipped.
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "initial schema", _migration_001_initial_schema),
+    (2, "normalize sessions and index messages", _migration_002_normalize_sessions),
+    (3, "index messages for cursor pagination", _migration_003_message_cursor_index),
+    (4, "bulk ingestion checkpoints", _migration_004_ingest_checkpoints),
+    (5, "document versions", _migration_005_document_versions),
+    (6, "pinned files", _migration_006_pinned_files),
+    (7, "maintenance leases", _migration_007_leases),
+]
+
+
+# All SQLite I/O issued from async code goes through this single thread so
+# disk waits (and fsyncs on commit) never block the event loop, and writes
+# from concurrent requests are serialized instead of fighting over the lock.
+_db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+
 class DatabaseService:
     """Service class for database operations"""
 
+    # Database files already migrated by this process
+    _migrated: Set[str] = set()
+    _migration_lock = threading.Lock()
+
     def __init__(self):
         """
-        Initialize database service
-
-        Args:
-            db_path: Path to SQLite database file
+        Initialize database service. Construction does no I/O: the schema is
+        migrated once per process, at startup or on first connection.
         """
         self.db_path = settings.DB_NAME
-        self._initialize_db()
 
-    def _initialize_db(self):
-        """Initialize database tables"""
+    def initialize(self):
+        """Initialize database tables by applying pending migrations (once per process)"""
+        if self.db_path in DatabaseService._migrated:
+            return
+        with DatabaseService._migration_lock:
+            if self.db_path in DatabaseService._migrated:
+                return
+            try:
+                if settings.SQLITE_WAL:
+                    # Persistent database property, so setting it once is enough
+                    conn = sqlite3.connect(self.db_path, timeout=settings.SQLITE_BUSY_TIMEOUT)
+                    try:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                    finally:
+                        conn.close()
+                self._apply_migrations()
+            except Exception as e:
+                logger.error("Error initializing database: %s", e)
+                raise
+            DatabaseService._migrated.add(self.db_path)
+
+    def _apply_migrations(self):
+        """
+        Bring the database schema up to date.
+
+        The current schema version is tracked in `PRAGMA user_version`. Each
+        pending migration runs in its own transaction together with the
+        version bump, so an interrupted upgrade never leaves a half-applied
+        migration behind.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=settings.SQLITE_BUSY_TIMEOUT)
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for version, description, migration in MIGRATIONS:
+                if version <= current_version:
+                    continue
 
-                # Create sessions table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS sessions (
-                        session_id TEXT,
-                        created_at TIMESTAMP,
-                        last_updated TIMESTAMP,
-                        file_id TEXT NULL
-                    )
-                ''')
-
-                # Create messages table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS messages (
-                        message_id TEXT PRIMARY KEY,
-                        session_id TEXT,
-                        role TEXT,
-                        content TEXT,
-                        timestamp TIMESTAMP,
-                        metadata TEXT,
-                        FOREIGN KEY (session_id) REFERENCES sessions (session_id)
-                    )
-                ''')
-
-                conn.commit()
-        except Exception as e:
-            logger.error(f"Error initializing database: {str(e)}")
-            raise
+                logger.info("Applying database migration %s: %s", version, description)
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    # Another process may have migrated while we waited for the lock
+                    if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                        cursor.execute("ROLLBACK")
+                        continue
+                    migration(cursor)
+                    cursor.execute(f"PRAGMA user_version = {version}")
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
+        finally:
+            conn.close()
 
     def get_connection(self):
         """Get database connection"""
-        return sqlite3.connect(self.db_path)
+        self.initialize()
+        conn = sqlite3.connect(self.db_path, timeout=settings.SQLITE_BUSY_TIMEOUT)
+        if settings.SQLITE_WAL:
+            # Durable at checkpoints instead of every commit; safe with WAL
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a blocking database call on the dedicated database thread
+
+        Args:
+            func: Synchronous function performing the database work
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Any: The value returned by func
+        """
+        loop = asyncio.get_running_loop()
+        with span(f"db.{func.__name__}", DB_CALL_SECONDS, operation=func.__name__):
+            return await loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
+
+    def acquire_lease(self, name: str, ttl: float) -> bool:
+        """
+        Take or renew a named lease for this process
+
+        The lease is granted if it is free, expired or already held by this
+        process, and then lasts ttl seconds. Processes sharing the database
+        (e.g. `serve --workers N`) use it to elect one runner per job.
+
+        Args:
+            name: Lease name, e.g. "retention"
+            ttl: Seconds until the lease expires unless renewed
+
+        Returns:
+            bool: This process holds the lease
+        """
+        holder = f"{socket.gethostname()}:{os.getpid()}"
+        now = time.time()
+        with self.get_connection() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+                WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+                """,
+                (name, holder, now + ttl, now)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def release_lease(self, name: str):
+        """Give up a lease held by this process"""
+        with self.get_connection() as conn:
+            conn.execute(
+                "DELETE FROM leases WHERE name = ? AND holder = ?",
+                (name, f"{socket.gethostname()}:{os.getpid()}")
+            )
+            conn.commit()
@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from src.services.database import DatabaseService
+
+_COLUMNS = ("file_id", "version", "file_name", "chunks", "chunks_reused", "chunks_embedded", "chunks_deleted", "created_at")
+
+
+class DocumentVersionService:
+    """Tracks the indexed versions of uploaded documents"""
+
+    def __init__(self):
+        self.db = DatabaseService()
+
+    def record_version(
+        self,
+        file_id: str,
+        file_name: Optional[str],
+        chunks: int,
+        chunks_reused: int,
+        chunks_embedded: int,
+        chunks_deleted: int,
+        replaced: bool = False
+    ) -> int:
+        """
+        Record a newly indexed version of file_id
+
+        Args:
+            replaced: The upload replaced an existing file. Files indexed
+                before versions were tracked count as version 1, so their
+                first replacement becomes version 2.
+
+        Returns:
+            int: The version number
+        """
+        # One statement, so two workers replacing the same file cannot read
+        # the same MAX(version); the second insert waits for the write lock
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO document_versions
+                    (file_id, version, file_name, chunks, chunks_reused, chunks_embedded, chunks_deleted, created_at)
+                SELECT ?, COALESCE(MAX(version), ?) + 1, ?, ?, ?, ?, ?, ?
+                FROM document_versions WHERE file_id = ?
+                """,
+                (file_id, 1 if replaced else 0, file_name, chunks, chunks_reused, chunks_embedded, chunks_deleted,
+                 datetime.utcnow(), file_id)
+            )
+            # Still inside the write transaction, so this is the row just inserted
+            cursor.execute("SELECT MAX(version) FROM document_versions WHERE file_id = ?", (file_id,))
+            version = cursor.fetchone()[0]
+            conn.commit()
+        return version
+
+    def get_versions(self, file_id: str) -> List[Dict]:
+        """All versions of file_id, oldest first"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM document_versions WHERE file_id = ? ORDER BY version",
+                (file_id,)
+            )
+            return [dict(zip(_COLUMNS, row)) for row in cursor.fetchall()]
+
+    async def arecord_version(
+        self,
+        file_id: str,
+        file_name: Optional[str],
+        chunks: int,
+        chunks_reused: int,
+        chunks_embedded: int,
+        chunks_deleted: int,
+        replaced: bool = False
+    ) -> int:
+        """Async version of record_version"""
+        return await self.db.run(
+            self.record_version, file_id, file_name, chunks, chunks_reused, chunks_embedded, chunks_deleted, replaced
+        )
+
+    async def aget_versions(self, file_id: str) -> List[Dict]:
+        """Async version of get_versions"""
+        return await self.db.run(self.get_versions, file_id)
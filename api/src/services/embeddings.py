@@ -0,0 +1,195 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+from src.config import settings
+from src.utils.logger import logger
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embedding model running in-process on ONNX Runtime
+
+    The model directory must contain `model.onnx` (a transformer exported
+    with input_ids / attention_mask inputs, e.g. via `optimum-cli export
+    onnx`) and the matching HuggingFace `tokenizer.json`.
+
+    All calls go through one batching thread: texts from concurrent
+    requests are collected for up to `max_wait_ms` (or until `batch_size`
+    texts are queued) and embedded in a single inference run. Within a
+    run, texts are ordered by length so each batch pads as little as
+    possible.
+    """
+
+    def __init__(
+        self,
+        model_dir: Path,
+        batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        max_length: int = 256,
+        intra_op_threads: int = 0,
+        normalize: bool = True
+    ):
+        """
+        Args:
+            model_dir: Directory with model.onnx and tokenizer.json
+            batch_size: Maximum texts per inference run
+            max_wait_ms: How long the first queued text waits for others to batch with
+            max_length: Token limit, longer texts are truncated
+            intra_op_threads: ONNX Runtime intra-op threads (0 = runtime default)
+            normalize: L2-normalize the embeddings
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_path = model_dir / "model.onnx"
+        tokenizer_path = model_dir / "tokenizer.json"
+        for path in (model_path, tokenizer_path):
+            if not path.exists():
+                raise FileNotFoundError(
+                    f"{path} not found. Export a sentence embedding model to {model_dir}, e.g. "
+                    f"`optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 {model_dir}`"
+                )
+
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.normalize = normalize
+
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        # The batching thread is the only caller, so inter-op parallelism buys nothing
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="onnx-embeddings", daemon=True)
+        self._worker.start()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed search documents"""
+        if not texts:
+            return []
+        return self._submit(texts).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed query text"""
+        return self._submit([text]).result()[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed search documents without blocking the event loop"""
+        if not texts:
+            return []
+        return await asyncio.wrap_future(self._submit(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed query text without blocking the event loop"""
+        return (await asyncio.wrap_future(self._submit([text])))[0]
+
+    def _submit(self, texts: List[str]) -> Future:
+        future: Future = Future()
+        self._queue.put((list(texts), future))
+        return future
+
+    def _run(self):
+        """Batching loop: collect queued requests, embed them together, hand out results"""
+        while True:
+            pending = [self._queue.get()]
+            queued = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while queued < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                queued += len(request[0])
+
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                embeddings = self._embed(texts)
+            except Exception as e:
+                logger.error("Error computing ONNX embeddings: %s", e)
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for request_texts, future in pending:
+                future.set_result(embeddings[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Run inference over texts in length-sorted batches of batch_size"""
+        encodings = self.tokenizer.encode_batch(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            # Re-pad to the longest text of this batch only
+            width = max(sum(encodings[i].attention_mask) for i in batch)
+            input_ids = np.array([encodings[i].ids[:width] for i in batch], dtype=np.int64)
+            attention_mask = np.array([encodings[i].attention_mask[:width] for i in batch], dtype=np.int64)
+
+            feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feed["token_type_ids"] = np.zeros_like(input_ids)
+            output = self.session.run(None, feed)[0]
+
+            if output.ndim == 3:
+                # Token embeddings: mean-pool over the non-padding tokens
+                mask = attention_mask[..., None].astype(output.dtype)
+                output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                output = output / np.clip(np.linalg.norm(output, axis=1, keepdims=True), 1e-12, None)
+
+            for row, index in enumerate(batch):
+                results[index] = output[row].tolist()
+        return results
+
+
+def create_embeddings() -> Embeddings:
+    """
+    Create the embedding model selected by settings.EMBEDDING_BACKEND
+
+    Returns:
+        Embeddings: OllamaEmbeddings or OnnxEmbeddings
+    """
+    if settings.EMBEDDING_BACKEND == "ollama":
+        return OllamaEmbeddings(model=settings.EMBEDDING_MODEL)
+    if settings.EMBEDDING_BACKEND == "onnx":
+        return OnnxEmbeddings(
+            model_dir=Path(settings.MODEL_CACHE) / settings.ONNX_EMBEDDING_MODEL,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_WAIT_MS,
+            max_length=settings.ONNX_MAX_LENGTH,
+            intra_op_threads=settings.ONNX_THREADS
+        )
+    raise ValueError(f"Unknown embedding backend: {settings.EMBEDDING_BACKEND}")
+
+
+def embedding_model_name() -> str:
+    """Backend and model of create_embeddings(), e.g. "ollama:nomic-embed-text" """
+    if settings.EMBEDDING_BACKEND == "onnx":
+        return f"onnx:{settings.ONNX_EMBEDDING_MODEL}"
+    return f"{settings.EMBEDDING_BACKEND}:{settings.EMBEDDING_MODEL}"
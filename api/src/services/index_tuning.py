@@ -0,0 +1,197 @@
+import hashlib
+import itertools
+import platform
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+import chromadb
+import hnswlib
+import numpy as np
+from src.services.indexer import Indexer
+from src.utils.logger import logger
+
+
+def exact_neighbours(corpus: np.ndarray, queries: np.ndarray, query_rows: np.ndarray, k: int, space: str) -> np.ndarray:
+    """
+    Brute-force k nearest corpus rows of every query, excluding the query's own row
+
+    Args:
+        corpus: (n, d) float32 embeddings
+        queries: (q, d) float32 query embeddings
+        query_rows: Corpus row of every query, excluded from its neighbours
+        k: Neighbours per query
+        space: Chroma distance ("l2", "cosine" or "ip")
+
+    Returns:
+        np.ndarray: (q, k) corpus row indices, closest first
+    """
+    if space == "cosine":
+        corpus = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    if space == "l2":
+        # |q - c|^2 without the |q|^2 term, which does not change the ranking
+        distances = (corpus * corpus).sum(axis=1)[None, :] - 2.0 * queries @ corpus.T
+    else:
+        distances = -(queries @ corpus.T)
+    distances[np.arange(len(queries)), query_rows] = np.inf
+    nearest = np.argpartition(distances, k, axis=1)[:, :k]
+    order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1)
+    return np.take_along_axis(nearest, order, axis=1)
+
+
+class IndexTuner:
+    """
+    Measures recall@k and query latency of HNSW parameter combinations
+
+    The corpus is a seeded sample of the indexed chunks with their stored
+    embeddings, and the queries are a seeded sample of that corpus (each
+    query's own chunk is excluded from its results). Ground truth comes
+    from an exact NumPy search.
+
+    Indexes are built with hnswlib, the library inside Chroma's vector
+    segment, rather than through Chroma: Chroma inserts a batch in set
+    order, which changes between processes and makes recall irreproducible.
+    Latencies are therefore index search time only, without Chroma's
+    per-query overhead, which does not depend on these parameters.
+    """
+
+    def __init__(self, indexer: Optional[Indexer] = None, seed: int = 1234):
+        self.indexer = indexer or Indexer()
+        self.seed = seed
+
+    def sample(self, corpus_size: int, query_count: int) -> Dict:
+        """
+        Seeded sample of indexed chunk embeddings
+
+        Returns:
+            Dict: "ids", "embeddings" (n, d) and "query_rows" (q,) into them
+        """
+        if not self.indexer.is_initialized:
+            self.indexer.initialize()
+        ids: List[str] = []
+        vectors: List[np.ndarray] = []
+        for store in self.indexer.vector_stores():
+            offset = 0
+            while True:
+                batch = store.get(include=["embeddings"], limit=5000, offset=offset)
+                if not batch["ids"]:
+                    break
+                ids.extend(batch["ids"])
+                vectors.append(np.asarray(batch["embeddings"], dtype=np.float32))
+                offset += len(batch["ids"])
+        if len(ids) < 2:
+            raise ValueError("The vector store needs at least two chunks to tune on")
+
+        # Sorted first, so the sample does not depend on storage order
+        order = sorted(range(len(ids)), key=ids.__getitem__)
+        rng = random.Random(self.seed)
+        rows = sorted(rng.sample(order, min(corpus_size, len(ids))), key=ids.__getitem__)
+        embeddings = np.concatenate(vectors)[rows]
+        query_rows = np.array(sorted(rng.sample(range(len(rows)), min(query_count, len(rows)))))
+        return {"ids": [ids[row] for row in rows], "embeddings": embeddings, "query_rows": query_rows}
+
+    def run(
+        self,
+        k: int = 4,
+        target_recall: float = 0.95,
+        corpus_size: int = 5000,
+        query_count: int = 200,
+        space: str = "l2",
+        m_values: Sequence[int] = (8, 16, 32),
+        construction_ef_values: Sequence[int] = (64, 128, 256),
+        search_ef_values: Sequence[int] = (10, 32, 64, 128)
+    ) -> Dict:
+        """
+        Sweep HNSW parameters and recommend the fastest one reaching target_recall
+
+        Among combinations within 5% of the fastest median latency, the one
+        with the lowest search_ef, then M, then construction_ef wins, so
+        timing noise does not flip the recommendation between runs.
+
+        Args:
+            k: Results per query (RAGService retrieves 3 chunks)
+            target_recall: Minimum mean recall@k of the recommendation
+            corpus_size: Chunks sampled from the vector store
+            query_count: Sampled chunks used as queries
+            space: Distance of the tuned index
+            m_values, construction_ef_values, search_ef_values: Grid to sweep
+
+        Returns:
+            Dict: Parameters, sample fingerprint, one result per combination
+            and the recommended combination (None if no combination reaches
+            target_recall)
+        """
+        sample = self.sample(corpus_size, query_count)
+        corpus, query_rows = sample["embeddings"], sample["query_rows"]
+        queries = corpus[query_rows]
+        k = min(k, len(corpus) - 1)
+        truth = exact_neighbours(corpus, queries, query_rows, k, space)
+
+        results = []
+        for m, construction_ef in itertools.product(m_values, construction_ef_values):
+            # Chroma's own index library. Fixed insert order, seed and a single
+            # thread make the graph, and so the recall, identical between runs.
+            index = hnswlib.Index(space=space, dim=corpus.shape[1])
+            index.init_index(max_elements=len(corpus), ef_construction=construction_ef, M=m, random_seed=self.seed)
+            index.set_num_threads(1)
+            start = time.perf_counter()
+            index.add_items(corpus, np.arange(len(corpus)))
+            build_seconds = time.perf_counter() - start
+
+            # Unlike Chroma collections, search_ef can change on a built index
+            for search_ef in search_ef_values:
+                index.set_ef(search_ef)
+                latencies = []
+                recalls = []
+                for query, query_row, expected in zip(queries, query_rows, truth):
+                    start = time.perf_counter()
+                    labels, _ = index.knn_query(query, k=k + 1)
+                    latencies.append(time.perf_counter() - start)
+                    found = [label for label in labels[0].tolist() if label != query_row][:k]
+                    recalls.append(len(set(found) & set(expected.tolist())) / k)
+
+                latencies.sort()
+                result = {
+                    "M": m,
+                    "construction_ef": construction_ef,
+                    "search_ef": search_ef,
+                    "recall": round(statistics.fmean(recalls), 4),
+                    "latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 4),
+                    "latency_p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 4),
+                    "build_seconds": round(build_seconds, 3),
+                }
+                logger.info("M=%d construction_ef=%d search_ef=%d: recall %.3f, p50 %.4fms",
+                            m, construction_ef, search_ef, result["recall"], result["latency_p50_ms"])
+                results.append(result)
+
+        recommended = None
+        eligible = [r for r in results if r["recall"] >= target_recall]
+        if eligible:
+            # Latencies within 5% of the fastest are noise: prefer the cheapest index among them
+            fastest = min(r["latency_p50_ms"] for r in eligible)
+            recommended = min(
+                (r for r in eligible if r["latency_p50_ms"] <= fastest * 1.05),
+                key=lambda r: (r["search_ef"], r["M"], r["construction_ef"])
+            )
+        return {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "parameters": {
+                "seed": self.seed,
+                "k": k,
+                "target_recall": target_recall,
+                "space": space,
+                "corpus_size": len(corpus),
+                "queries": len(queries),
+                "dimension": int(corpus.shape[1]),
+                "m_values": list(m_values),
+                "construction_ef_values": list(construction_ef_values),
+                "search_ef_values": list(search_ef_values),
+            },
+            # Same fingerprint = same sampled chunks, so runs are comparable
+            "sample_fingerprint": hashlib.sha256("\n".join(sample["ids"]).encode()).hexdigest()[:16],
+            "versions": {"python": platform.python_version(), "numpy": np.__version__, "chromadb": chromadb.__version__},
+            "results": results,
+            "recommended": recommended,
+        }
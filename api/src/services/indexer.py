@@ -1,80 +1,797 @@
+import asyncio
+import hashlib
+import heapq
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Set, Tuple
+import chromadb
+from chromadb.api import ClientAPI
+from chromadb.api.models.Collection import Collection
 from chromadb.config import Settings
+from chromadb.errors import InvalidCollectionException
+from chromadb.telemetry.product import ProductTelemetryClient, ProductTelemetryEvent
 from langchain_text_splitters.character import RecursiveCharacterTextSplitter
-from langchain_ollama import OllamaEmbeddings
+from langchain_core.embeddings import Embeddings
 from langchain_chroma import Chroma
+from overrides import override
 from langchain_core.documents import Document
+from src.services.embeddings import create_embeddings
+from src.services.memory import chroma_cache_limit_bytes
+from src.utils.process_file import chunk_hash, create_text_splitter
 from src.utils.logger import logger
 from src.utils.logger import log_time
 from src.config import settings
 
+PARTITION_PREFIX = "part-"
+
+
+class NoProductTelemetry(ProductTelemetryClient):
+    """
+    Drops Chroma's product telemetry events
+
+    Chroma's default client batches query events in a dict without a lock,
+    even with anonymized_telemetry off, so parallel queries on one
+    collection can fail with a KeyError.
+    """
+
+    @override
+    def capture(self, event: ProductTelemetryEvent) -> None:
+        pass
+
+
+_TELEMETRY_IMPL = f"{NoProductTelemetry.__module__}.{NoProductTelemetry.__qualname__}"
+
 
 class Indexer:
     """
     Handles document indexing operations using Langchain components
     Manage text splitting, embedding and vector store operations
+
+    Components are built on the first call to initialize(), not on
+    construction, so creating an Indexer is free.
+
+    With settings.VECTOR_STORE_PARTITIONING other than "none", chunks are
+    routed to one collection per file or per group of files. A search then
+    only touches the partitions of the requested files, queried in
+    parallel, and the per-partition results are merged by distance.
+    `vector_store` stays the default, unpartitioned collection.
     """
 
     def __init__(self):
+        self.client: Optional[ClientAPI] = None
         self.vector_store: Optional[Chroma] = None
-        self.embedding_model: Optional[OllamaEmbeddings] = None
+        self._partitions: Dict[str, Chroma] = {}
+        self._partitions_lock = threading.Lock()
+        self._search_pool: Optional[ThreadPoolExecutor] = None
+        self.embedding_model: Optional[Embeddings] = None
         self.text_splitter: Optional[RecursiveCharacterTextSplitter] = None
         self.is_initialized: bool = False
-        self.initialize()
+        self._init_lock = threading.Lock()
 
     def initialize(self) -> None:
         """
         Initialize text spliter, embedding model, and vector store
         """
         if self.is_initialized:
-            logger.debug("Indexer already initilaized")
             return
 
-        try:
-            self._initialize_text_splitter()
-            self._initialize_embedding_model()
-            self._initialze_vector_store()
-            self.is_initialized = True
+        # Startup warm-up and the first requests may race to initialize
+        with self._init_lock:
+            if self.is_initialized:
+                logger.debug("Indexer already initilaized")
+                return
 
-        except Exception as e:
-            logger.error("Error initilaizing ")
-            print(e)
+            try:
+                self._initialize_text_splitter()
+                self._initialize_embedding_model()
+                self._initialze_vector_store()
+                self.is_initialized = True
+
+            except Exception as e:
+                logger.error("Error initilaizing indexer: %s", e)
 
     @log_time
     def _initialize_text_splitter(self):
         """Initialize text splitter component"""
 
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        self.text_splitter = create_text_splitter()
 
     @log_time
     def _initialze_vector_store(self):
         """Initialize vector store component"""
         # Initialze chroma vector store
         # https://python.langchain.com/docs/integrations/vectorstores/chroma/
+        self.client = self._create_client()
+        self.vector_store = Chroma(
+            client=self.client,
+            embedding_function=self.embedding_model,
+            collection_metadata=self.collection_metadata()
+        )
+
+    @staticmethod
+    def collection_metadata() -> Dict:
+        """HNSW parameters for new collections (ignored for existing ones)"""
+        return {
+            "hnsw:space": settings.HNSW_SPACE,
+            "hnsw:M": settings.HNSW_M,
+            "hnsw:construction_ef": settings.HNSW_CONSTRUCTION_EF,
+            "hnsw:search_ef": settings.HNSW_SEARCH_EF,
+        }
+
+    def collection(self, name: str) -> Collection:
+        """
+        Raw Chroma collection, created with collection_metadata() if missing
+
+        Used to write precomputed embeddings, which the LangChain wrapper cannot do.
+        """
+        if self.client is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+        return self.client.get_or_create_collection(
+            name=name,
+            embedding_function=None,
+            metadata=self.collection_metadata()
+        )
+
+    def _create_client(self) -> ClientAPI:
+        """
+        Create the Chroma client for settings.VECTOR_STORE_MODE
+
+        "embedded" opens PERSIST_DIR in this process, so only one process
+        may use it. "client" talks to a Chroma server (see `python -m src
+        serve`), which is then the single writer and lets any number of
+        API workers share the index.
+        """
+        if settings.VECTOR_STORE_MODE == "client":
+            return chromadb.HttpClient(
+                host=settings.CHROMA_HOST,
+                port=settings.CHROMA_PORT,
+                settings=Settings(anonymized_telemetry=False, chroma_product_telemetry_impl=_TELEMETRY_IMPL)
+            )
+        if settings.VECTOR_STORE_MODE != "embedded":
+            raise ValueError(f"Unknown vector store mode: {settings.VECTOR_STORE_MODE}")
 
         # Create persist dir if not present
         Path(settings.PERSIST_DIR).mkdir(parents=True, exist_ok=True)
-
-        self.vector_store = Chroma(
-            persist_directory=str(settings.PERSIST_DIR),
-            embedding_function=self.embedding_model,
-            client_settings=Settings(anonymized_telemetry=False, is_persistent=True)
+        # Unload the least recently used vector segments beyond the cache limit
+        cache_limit = chroma_cache_limit_bytes()
+        return chromadb.PersistentClient(
+            path=str(settings.PERSIST_DIR),
+            settings=Settings(
+                anonymized_telemetry=False,
+                chroma_product_telemetry_impl=_TELEMETRY_IMPL,
+                chroma_segment_cache_policy="LRU" if cache_limit else None,
+                chroma_memory_limit_bytes=cache_limit,
+                is_persistent=True
+            )
         )
 
+    def cache_stats(self) -> Dict:
+        """
+        Sizes of the in-process caches of the indexer and Chroma
+
+        Returns:
+            Dict: Cached partition stores and, in embedded mode, Chroma's
+            vector segment cache policy
+        """
+        stats = {"partition_stores": len(self._partitions)}
+        if settings.VECTOR_STORE_MODE == "embedded":
+            stats["chroma_cache_policy"] = "LRU" if chroma_cache_limit_bytes() else "unbounded"
+        return stats
+
+    def release_memory(self) -> Dict:
+        """
+        Drop cached partition stores
+
+        Loaded Chroma vector segments are not touched: with a cache limit,
+        Chroma's LRU policy unloads them (see chroma_cache_limit_bytes).
+
+        Returns:
+            Dict: Partition stores dropped and who evicts vector segments
+        """
+        with self._partitions_lock:
+            partitions = len(self._partitions)
+            self._partitions.clear()
+        if settings.VECTOR_STORE_MODE != "embedded":
+            segments = "chroma server"
+        elif chroma_cache_limit_bytes():
+            segments = "chroma lru (CHROMA_CACHE_LIMIT_MB)"
+        else:
+            segments = "never (no cache limit)"
+        return {"partition_stores": partitions, "chroma_segments_evicted_by": segments}
+
     @log_time
     def _initialize_embedding_model(self):
-        """Initialize vector store component"""
-        # Initialze embedding model
-        # https://python.langchain.com/docs/integrations/vectorstores/chroma/
-        self.embedding_model = OllamaEmbeddings(
-            model=settings.EMBEDDING_MODEL,
+        """Initialize embedding model component"""
+        # Ollama or in-process ONNX, see settings.EMBEDDING_BACKEND
+        self.embedding_model = create_embeddings()
+
+    @property
+    def partitioned(self) -> bool:
+        return settings.VECTOR_STORE_PARTITIONING != "none"
+
+    def partition_name(self, file_id: str) -> str:
+        """
+        Collection holding the chunks of file_id
+
+        Args:
+            file_id: File id of the chunks
+
+        Returns:
+            str: Collection name for settings.VECTOR_STORE_PARTITIONING
+        """
+        strategy = settings.VECTOR_STORE_PARTITIONING
+        if strategy == "file":
+            return f"{PARTITION_PREFIX}file-{file_id}"
+        if strategy == "group":
+            # Stable across processes, unlike hash()
+            digest = hashlib.md5(file_id.encode()).digest()
+            group = int.from_bytes(digest[:4], "big") % settings.VECTOR_STORE_PARTITION_GROUPS
+            return f"{PARTITION_PREFIX}group-{group:04d}"
+        raise ValueError(f"Unknown vector store partitioning: {strategy}")
+
+    def partition(self, name: str, create: bool = False) -> Optional[Chroma]:
+        """
+        Vector store of one partition
+
+        Args:
+            name: Collection name
+            create: Create the collection when it does not exist
+
+        Returns:
+            Optional[Chroma]: The partition, None if it does not exist and create is False
+        """
+        store = self._partitions.get(name)
+        if store is not None:
+            return store
+        if self.client is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+        try:
+            store = Chroma(
+                client=self.client,
+                collection_name=name,
+                embedding_function=self.embedding_model,
+                collection_metadata=self.collection_metadata(),
+                create_collection_if_not_exists=create
+            )
+        except (InvalidCollectionException, ValueError):
+            # Missing partitions are not cached, another worker may create them
+            return None
+        with self._partitions_lock:
+            return self._partitions.setdefault(name, store)
+
+    def partition_names(self) -> List[str]:
+        """Names of all partition collections in the vector store"""
+        if self.client is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+        # chromadb < 0.6 returns collections, later versions return names
+        names = [getattr(collection, "name", collection) for collection in self.client.list_collections()]
+        return sorted(name for name in names if name.startswith(PARTITION_PREFIX))
+
+    def drop_partition(self, name: str) -> None:
+        """Delete a partition collection with all its chunks"""
+        if self.client is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+        with self._partitions_lock:
+            self._partitions.pop(name, None)
+        self.client.delete_collection(name)
+        logger.info("Dropped partition %s", name)
+
+    def vector_stores(self) -> List[Chroma]:
+        """The default collection followed by every existing partition"""
+        if not self.is_initialized:
+            self.initialize()
+        if self.vector_store is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+        stores = [self.vector_store]
+        for name in self.partition_names():
+            store = self.partition(name)
+            if store is not None:
+                stores.append(store)
+        return stores
+
+    def add_documents(self, chunks: List[Document]) -> None:
+        """
+        Embed and store chunks, routed to their partitions
+
+        Args:
+            chunks: Chunks with a "file_id" in their metadata
+        """
+        if not self.is_initialized:
+            self.initialize()
+
+        if self.vector_store is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+
+        if not self.partitioned:
+            self.vector_store.add_documents(chunks)
+            return
+
+        routed: Dict[str, List[Document]] = defaultdict(list)
+        for chunk in chunks:
+            routed[self.partition_name(chunk.metadata["file_id"])].append(chunk)
+        for name, partition_chunks in routed.items():
+            self.partition(name, create=True).add_documents(partition_chunks)
+
+    def add_embedded_documents(self, chunks: List[Document], embeddings: List[List[float]], ids: List[str]) -> None:
+        """
+        Store chunks whose embeddings are already computed, routed to their partitions
+
+        Upserts by id, so writing the same chunks again replaces them.
+
+        Args:
+            chunks: Chunks with a "file_id" in their metadata
+            embeddings: One embedding per chunk
+            ids: One vector store id per chunk
+        """
+        if not self.is_initialized:
+            self.initialize()
+
+        if self.vector_store is None or self.client is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+
+        routed: Dict[str, List[int]] = defaultdict(list)
+        for i, chunk in enumerate(chunks):
+            name = self.partition_name(chunk.metadata["file_id"]) if self.partitioned else self.vector_store._collection.name
+            routed[name].append(i)
+
+        max_batch_size = self.client.get_max_batch_size()
+        for name, rows in routed.items():
+            collection = self.collection(name)
+            for start in range(0, len(rows), max_batch_size):
+                batch = rows[start:start + max_batch_size]
+                collection.upsert(
+                    ids=[ids[i] for i in batch],
+                    embeddings=[embeddings[i] for i in batch],
+                    metadatas=[chunks[i].metadata for i in batch],
+                    documents=[chunks[i].page_content for i in batch]
+                )
+
+    def _file_store(self, file_id: str) -> Optional[Chroma]:
+        """Vector store holding the chunks of file_id (None if its partition does not exist)"""
+        if not self.partitioned:
+            return self.vector_store
+        return self.partition(self.partition_name(file_id))
+
+    def has_file(self, file_id: str) -> bool:
+        """Whether the vector store holds any chunk of file_id"""
+        if not self.is_initialized:
+            self.initialize()
+        store = self._file_store(file_id)
+        if store is None:
+            return False
+        return bool(store.get(where={"file_id": file_id}, limit=1, include=[])["ids"])
+
+    def delete_file(self, file_id: str, keep_ids: Optional[Set[str]] = None) -> int:
+        """
+        Delete the chunks of file_id
+
+        Args:
+            file_id: File whose chunks to delete
+            keep_ids: Chunk ids to keep, e.g. those of a version just written
+
+        Returns:
+            int: Number of chunks deleted
+        """
+        if not self.is_initialized:
+            self.initialize()
+        store = self._file_store(file_id)
+        if store is None:
+            return 0
+        ids = [
+            chunk_id for chunk_id in store.get(where={"file_id": file_id}, include=[])["ids"]
+            if not keep_ids or chunk_id not in keep_ids
+        ]
+        for start in range(0, len(ids), settings.VECTOR_GC_BATCH_SIZE):
+            store.delete(ids=ids[start:start + settings.VECTOR_GC_BATCH_SIZE])
+        return len(ids)
+
+    def replace_file(self, file_id: str, chunks: List[Document]) -> Dict[str, int]:
+        """
+        Re-index file_id with a new version of its chunks
+
+        Chunks are matched on their content hash: unchanged chunks keep
+        their id and stored embedding (only their metadata is updated),
+        new or changed chunks are embedded in one batch, and chunks that
+        are no longer part of the document are deleted afterwards, so a
+        concurrent search always finds a complete version.
+
+        Args:
+            file_id: File being replaced; set as "file_id" on the new chunks
+            chunks: Chunks of the new version, with "chunk_hash" metadata
+
+        Returns:
+            Dict[str, int]: Chunks "reused", "embedded" and "deleted"
+        """
+        if not self.is_initialized:
+            self.initialize()
+
+        if self.vector_store is None or self.embedding_model is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+
+        store = self._file_store(file_id)
+        existing: Dict[str, List[Tuple[str, List[float]]]] = defaultdict(list)
+        if store is not None:
+            offset = 0
+            while True:
+                batch = store.get(
+                    where={"file_id": file_id},
+                    include=["embeddings", "metadatas", "documents"],
+                    limit=settings.VECTOR_GC_BATCH_SIZE,
+                    offset=offset
+                )
+                ids = batch.get("ids") or []
+                if not ids:
+                    break
+                for chunk_id, embedding, metadata, text in zip(
+                    ids, batch["embeddings"], batch["metadatas"], batch["documents"]
+                ):
+                    # Chunks indexed before hashes were stored are hashed now
+                    digest = (metadata or {}).get("chunk_hash") or chunk_hash(text or "")
+                    existing[digest].append((chunk_id, embedding))
+                offset += len(ids)
+
+        ids: List[str] = []
+        embeddings: List[Optional[List[float]]] = []
+        to_embed: List[int] = []
+        for i, chunk in enumerate(chunks):
+            chunk.metadata["file_id"] = file_id
+            matches = existing.get(chunk.metadata["chunk_hash"])
+            if matches:
+                chunk_id, embedding = matches.pop()
+                ids.append(chunk_id)
+                embeddings.append(embedding.tolist() if hasattr(embedding, "tolist") else embedding)
+            else:
+                ids.append(str(uuid.uuid4()))
+                embeddings.append(None)
+                to_embed.append(i)
+
+        if to_embed:
+            vectors = self.embedding_model.embed_documents([chunks[i].page_content for i in to_embed])
+            for i, vector in zip(to_embed, vectors):
+                embeddings[i] = vector
+        if chunks:
+            self.add_embedded_documents(chunks, embeddings, ids)
+
+        stale_ids = [chunk_id for matches in existing.values() for chunk_id, _ in matches]
+        for start in range(0, len(stale_ids), settings.VECTOR_GC_BATCH_SIZE):
+            store.delete(ids=stale_ids[start:start + settings.VECTOR_GC_BATCH_SIZE])
+
+        return {
+            "reused": len(chunks) - len(to_embed),
+            "embedded": len(to_embed),
+            "deleted": len(stale_ids),
+        }
+
+    @staticmethod
+    def _query(
+        store: Chroma,
+        embeddings: List[List[float]],
+        k: int,
+        filter_metadata: Optional[Dict]
+    ) -> List[List[Tuple[Document, float]]]:
+        """One Chroma query for all embeddings; hits per embedding, closest first"""
+        results = store._collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            where=filter_metadata,
+            include=["documents", "metadatas", "distances"]
         )
+        return [
+            [
+                (Document(page_content=text or "", metadata=metadata or {}, id=chunk_id), distance)
+                for chunk_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+            ]
+            for ids, texts, metadatas, distances in zip(
+                results["ids"], results["documents"], results["metadatas"], results["distances"]
+            )
+        ]
+
+    def _search_partition(
+        self,
+        name: str,
+        embeddings: List[List[float]],
+        k: int,
+        filter_metadata: Optional[Dict]
+    ) -> List[List[Tuple[Document, float]]]:
+        store = self.partition(name)
+        if store is None:
+            return [[] for _ in embeddings]
+        try:
+            return self._query(store, embeddings, k, filter_metadata)
+        except (InvalidCollectionException, ValueError) as e:
+            # Dropped by another process since it was cached
+            logger.warning("Partition %s is gone: %s", name, e)
+            with self._partitions_lock:
+                self._partitions.pop(name, None)
+            return [[] for _ in embeddings]
+
+    def search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        file_ids: Optional[List[str]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Search the vector store with already computed query embeddings
+
+        All embeddings go to Chroma in one query per collection. With
+        partitioning, only the partitions of file_ids (all partitions
+        without file_ids) are searched, in parallel, and the closest k
+        chunks over all of them are kept for every embedding.
+
+        Args:
+            embeddings: Query embeddings
+            k: Number of results per query
+            file_ids: Optional file ids to restrict the search to
+
+        Returns:
+            List[List[Tuple[Document, float]]]: Per embedding, documents with their distance, closest first
+        """
+        if not self.is_initialized:
+            self.initialize()
+
+        if self.vector_store is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+
+        if not embeddings:
+            return []
+
+        if not self.partitioned:
+            filter_metadata = {"file_id": {"$in": file_ids}} if file_ids else None
+            return self._query(self.vector_store, embeddings, k, filter_metadata)
+
+        if file_ids:
+            scopes: Dict[str, List[str]] = defaultdict(list)
+            for file_id in file_ids:
+                scopes[self.partition_name(file_id)].append(file_id)
+        else:
+            scopes = {name: [] for name in self.partition_names()}
+
+        def search(name: str) -> List[List[Tuple[Document, float]]]:
+            # A per-file partition holds exactly one file, groups need a filter
+            scope = scopes[name]
+            filter_metadata = {"file_id": {"$in": scope}} if scope and settings.VECTOR_STORE_PARTITIONING == "group" else None
+            return self._search_partition(name, embeddings, k, filter_metadata)
+
+        # Chroma's LRU segment cache is not thread-safe, so with a cache
+        # limit an embedded store searches its partitions one by one
+        if len(scopes) <= 1 or (settings.VECTOR_STORE_MODE == "embedded" and chroma_cache_limit_bytes()):
+            partition_hits = [search(name) for name in scopes]
+        else:
+            partition_hits = list(self._get_search_pool().map(search, scopes))
+        return self._merge_hits(partition_hits, len(embeddings), k)
+
+    def search_by_vectors_capped(
+        self,
+        embeddings: List[List[float]],
+        k: int,
+        file_ids: List[str],
+        per_file_k: int,
+        overfetch: int
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Search with a cap on how many of the k results a single file may take
+
+        One filtered search over many files returns the chunks of the one or
+        two closest files only. This runs the same single search for
+        k * overfetch candidates and keeps them in distance order, at most
+        per_file_k per file. When the candidates come from too few files to
+        fill k, the query is searched again over the files still below the
+        cap, so the files crowded out of the candidates get fetched too.
+        That is one search in the common case and at most k more when a few
+        files dominate. Only if the files run out of chunks are the closest
+        leftovers added back.
+
+        Args:
+            embeddings: Query embeddings
+            k: Number of results per query
+            file_ids: Files to search
+            per_file_k: Results one file may contribute
+            overfetch: Candidates fetched per result
+
+        Returns:
+            List[List[Tuple[Document, float]]]: Per embedding, documents with their distance, closest first
+        """
+        fetch = k * max(overfetch, 1)
+        candidates = self.search_by_vectors(embeddings, fetch, file_ids)
+        results = []
+        for embedding, hits in zip(embeddings, candidates):
+            taken: Dict[str, int] = defaultdict(int)
+            seen: Set[str] = set()
+            capped, leftovers = [], []
+
+            def take(new_hits: List[Tuple[Document, float]]):
+                for hit in new_hits:
+                    if hit[0].id in seen:
+                        continue
+                    seen.add(hit[0].id)
+                    file_id = hit[0].metadata.get("file_id")
+                    if len(capped) < k and taken[file_id] < per_file_k:
+                        taken[file_id] += 1
+                        capped.append(hit)
+                    else:
+                        leftovers.append(hit)
+
+            take(hits)
+            exhausted = len(hits) < fetch
+            while len(capped) < k and not exhausted:
+                below_cap = [file_id for file_id in file_ids if taken[file_id] < per_file_k]
+                if not below_cap:
+                    break
+                more = self.search_by_vectors([embedding], fetch, below_cap)[0]
+                found = len(capped)
+                take(more)
+                exhausted = len(more) < fetch or len(capped) == found
+
+            if len(capped) < k:
+                capped += sorted(leftovers, key=lambda hit: hit[1])[:k - len(capped)]
+            results.append(sorted(capped, key=lambda hit: hit[1]))
+        return results
+
+    def _get_search_pool(self) -> ThreadPoolExecutor:
+        """Threads running partition searches, shared by all requests"""
+        if self._search_pool is None:
+            with self._partitions_lock:
+                if self._search_pool is None:
+                    self._search_pool = ThreadPoolExecutor(
+                        max_workers=settings.VECTOR_SEARCH_WORKERS,
+                        thread_name_prefix="vector-search"
+                    )
+        return self._search_pool
+
+    @staticmethod
+    def _merge_hits(
+        scoped_hits: List[List[List[Tuple[Document, float]]]],
+        queries: int,
+        k: int
+    ) -> List[List[Tuple[Document, float]]]:
+        """Closest k hits per query over the results of several searches"""
+        return [
+            heapq.nsmallest(k, (hit for hits in scoped_hits for hit in hits[i]), key=lambda hit: hit[1])
+            for i in range(queries)
+        ]
+
+    def search_by_vector_with_scores(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        file_ids: Optional[List[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Search the vector store with one already computed query embedding
+
+        Args:
+            embedding: Query embedding
+            k: Number of results to return
+            file_ids: Optional file ids to restrict the search to
+
+        Returns:
+            List[Tuple[Document, float]]: Documents with their distance, closest first
+        """
+        return self.search_by_vectors([embedding], k, file_ids)[0]
+
+    def search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        file_ids: Optional[List[str]] = None
+    ) -> List[Document]:
+        """
+        Search the vector store with an already computed query embedding
+
+        Args:
+            embedding: Query embedding
+            k: Number of results to return
+            file_ids: Optional file ids to restrict the search to
+
+        Returns:
+            List[Document]: List of similar documents
+        """
+        return [document for document, _ in self.search_by_vector_with_scores(embedding, k, file_ids)]
+
+    async def search_queries(
+        self,
+        queries: List[str],
+        k: int = 4,
+        file_ids: Optional[List[str]] = None,
+        score_threshold: Optional[float] = None
+    ) -> List[List[Tuple[Document, float, float]]]:
+        """
+        Retrieval without generation: embed all queries in one call and search them together
+
+        Scores are LangChain relevance scores for the collection's distance
+        (higher is more similar), the same as similarity_search_with_relevance_scores.
+
+        Args:
+            queries: Search queries
+            k: Number of results per query
+            file_ids: Optional file ids to restrict the search to
+            score_threshold: Drop results scoring below this
+
+        Returns:
+            List[List[Tuple[Document, float, float]]]: Per query, documents with
+            their score and distance, best first
+        """
+        if not self.is_initialized:
+            await asyncio.to_thread(self.initialize)
+        if self.embedding_model is None or self.vector_store is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+
+        embeddings = await self.embedding_model.aembed_documents(queries)
+        hits = await asyncio.to_thread(self.search_by_vectors, embeddings, k, file_ids)
+        relevance = self.vector_store._select_relevance_score_fn()
+        results = []
+        for query_hits in hits:
+            scored = [(document, relevance(distance), distance) for document, distance in query_hits]
+            if score_threshold is not None:
+                scored = [hit for hit in scored if hit[1] >= score_threshold]
+            results.append(scored)
+        return results
+
+    def split_into_partitions(self, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Move chunks from the default collection into their partitions
+
+        Stored embeddings are copied as they are, nothing is re-embedded.
+        Every batch is deleted from the default collection once it is in
+        its partitions, so an interrupted run can simply be started again.
+
+        Args:
+            batch_size: Chunks read per batch
+            dry_run: Only count the chunks per partition
+
+        Returns:
+            Dict[str, int]: Chunks moved (or to move) per partition
+        """
+        if not self.partitioned:
+            raise ValueError("Set VECTOR_STORE_PARTITIONING to 'file' or 'group' first")
+        if not self.is_initialized:
+            self.initialize()
+        if self.vector_store is None or self.client is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+
+        moved: Dict[str, int] = defaultdict(int)
+        offset = 0  # Chunks left in place: without file_id, or everything in a dry run
+        while True:
+            batch = self.vector_store.get(
+                include=["metadatas"] if dry_run else ["embeddings", "metadatas", "documents"],
+                limit=batch_size,
+                offset=offset
+            )
+            ids = batch.get("ids") or []
+            if not ids:
+                break
+
+            routed: Dict[str, List[int]] = defaultdict(list)
+            for i, metadata in enumerate(batch["metadatas"]):
+                file_id = (metadata or {}).get("file_id")
+                if file_id:
+                    routed[self.partition_name(file_id)].append(i)
+            if dry_run:
+                offset += len(ids)
+            else:
+                offset += len(ids) - sum(len(rows) for rows in routed.values())
+
+            for name, rows in routed.items():
+                moved[name] += len(rows)
+                if dry_run:
+                    continue
+                collection = self.collection(name)
+                collection.upsert(
+                    ids=[ids[i] for i in rows],
+                    embeddings=[batch["embeddings"][i] for i in rows],
+                    metadatas=[batch["metadatas"][i] for i in rows],
+                    documents=[batch["documents"][i] for i in rows]
+                )
+            if not dry_run:
+                moved_ids = [ids[i] for rows in routed.values() for i in rows]
+                if moved_ids:
+                    self.vector_store.delete(ids=moved_ids)
+                logger.info("Moved %d chunks into %d partitions", len(moved_ids), len(routed))
+        return dict(moved)
 
     @log_time
     async def similarity_search(
@@ -117,5 +834,5 @@ class Indexer:
             return similar_docs
 
         except Exception as e:
-            logger.error(f"Error while searching documents in vector store: {str(e)}")
+            logger.error("Error while searching documents in vector store: %s", e)
             raise
@@ -0,0 +1,236 @@
+import asyncio
+import ctypes
+import ctypes.util
+import gc
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, TYPE_CHECKING
+from src.config import settings
+from src.services.session import session_context_cache
+from src.utils.logger import logger
+
+if TYPE_CHECKING:
+    from src.services.indexer import Indexer
+
+_MB = 1024 * 1024
+
+
+def read_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def chroma_cache_limit_bytes() -> int:
+    """Limit of Chroma's LRU vector segment cache, 0 for an unlimited cache"""
+    if settings.CHROMA_CACHE_LIMIT_MB > 0:
+        return settings.CHROMA_CACHE_LIMIT_MB * _MB
+    return settings.MEMORY_BUDGET_MB * _MB // 2
+
+
+def _app_indexer() -> Optional["Indexer"]:
+    """The API's Indexer if it has been created; imported lazily to keep ingest workers light"""
+    from src.utils.dependency import Dependency
+    return Dependency.loaded("indexer")
+
+
+def _malloc_trim():
+    """Hand memory freed by Python and hnswlib back to the OS (glibc only)"""
+    try:
+        ctypes.CDLL(ctypes.util.find_library("c")).malloc_trim(0)
+    except (OSError, AttributeError, TypeError):
+        pass
+
+
+class MemoryGovernor:
+    """
+    Keeps resident memory of the process under MEMORY_BUDGET_MB
+
+    Chroma unloads the least recently used vector segments on its own
+    once they exceed chroma_cache_limit_bytes(). On top of that, the
+    governor samples RSS every MEMORY_CHECK_INTERVAL_SECONDS. Above the
+    high watermark it releases memory:
+        1. drops the session context cache
+        2. drops the indexer's cached partition stores (vector segments
+           are left to Chroma's LRU cache, see chroma_cache_limit_bytes)
+        3. collects garbage and trims the malloc heap
+
+    Ingestion calls throttle() / athrottle() before embedding a batch,
+    which waits (releasing memory meanwhile) until RSS is back under the
+    watermark or MEMORY_THROTTLE_MAX_WAIT_SECONDS have passed.
+
+    RSS and the budget are per process, so with several API workers each
+    one checks and releases its own memory.
+
+    Without a budget the governor only reports memory usage.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self.peak_rss = 0
+        self.releases = 0
+        self.last_release: Optional[Dict] = None
+        self.throttled = 0
+        self.throttle_seconds = 0.0
+
+    @property
+    def budget_bytes(self) -> int:
+        return settings.MEMORY_BUDGET_MB * _MB
+
+    @property
+    def high_watermark_bytes(self) -> int:
+        return int(self.budget_bytes * settings.MEMORY_HIGH_WATERMARK)
+
+    def sample(self) -> Optional[int]:
+        """Current RSS in bytes, also tracked as peak"""
+        rss = read_rss()
+        if rss is not None and rss > self.peak_rss:
+            self.peak_rss = rss
+        return rss
+
+    def is_high(self, rss: Optional[int] = None) -> bool:
+        """RSS is above the high watermark (never without a budget)"""
+        if not self.budget_bytes:
+            return False
+        rss = self.sample() if rss is None else rss
+        return rss is not None and rss > self.high_watermark_bytes
+
+    def release(self, indexer: Optional["Indexer"] = None) -> Dict:
+        """
+        Evict caches and return freed memory to the OS
+
+        Args:
+            indexer: Indexer whose caches to evict (default: the app's, if created)
+
+        Returns:
+            Dict: RSS before and after, and what was evicted
+        """
+        indexer = indexer or _app_indexer()
+        # One release at a time; a caller arriving meanwhile profits from the running one
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True}
+        try:
+            start = time.perf_counter()
+            rss_before = self.sample()
+            sessions = len(session_context_cache)
+            session_context_cache.clear()
+            evicted = indexer.release_memory() if indexer is not None else {}
+            gc.collect()
+            _malloc_trim()
+            rss_after = self.sample()
+
+            report = {
+                "rss_before": rss_before,
+                "rss_after": rss_after,
+                "session_contexts": sessions,
+                **evicted,
+                "duration": round(time.perf_counter() - start, 3),
+                "released_at": datetime.utcnow().isoformat(),
+            }
+            self.releases += 1
+            self.last_release = report
+            logger.info("Released memory: %s", report,
+                        extra={"event": "memory.release"})
+            return report
+        finally:
+            self._lock.release()
+
+    def check(self, indexer: Optional["Indexer"] = None) -> bool:
+        """
+        Release memory if RSS is above the high watermark
+
+        Returns:
+            bool: RSS is still above the high watermark
+        """
+        if not self.is_high():
+            return False
+        self.release(indexer)
+        return self.is_high()
+
+    def throttle(self, indexer: Optional["Indexer"] = None) -> float:
+        """
+        Block an ingest batch while memory is high
+
+        Returns:
+            float: Seconds waited
+        """
+        start = time.monotonic()
+        while self.check(indexer):
+            waited = time.monotonic() - start
+            if waited >= settings.MEMORY_THROTTLE_MAX_WAIT_SECONDS:
+                logger.warning("Memory still high after %.1fs, ingesting anyway", waited)
+                break
+            time.sleep(0.5)
+        return self._record_throttle(time.monotonic() - start)
+
+    async def athrottle(self, indexer: Optional["Indexer"] = None) -> float:
+        """Async version of throttle, waits without blocking the event loop"""
+        start = time.monotonic()
+        while await asyncio.to_thread(self.check, indexer):
+            waited = time.monotonic() - start
+            if waited >= settings.MEMORY_THROTTLE_MAX_WAIT_SECONDS:
+                logger.warning("Memory still high after %.1fs, ingesting anyway", waited)
+                break
+            await asyncio.sleep(0.5)
+        return self._record_throttle(time.monotonic() - start)
+
+    def _record_throttle(self, waited: float) -> float:
+        if waited >= 0.5:
+            self.throttled += 1
+            self.throttle_seconds += waited
+            logger.info("Ingestion throttled for %.1fs on memory", waited, extra={"event": "memory.throttle"})
+        return waited
+
+    def status(self) -> Dict:
+        """Memory usage, limits, cache sizes and governor counters"""
+        rss = self.sample()
+        indexer = _app_indexer()
+        return {
+            "rss_bytes": rss,
+            "peak_rss_bytes": self.peak_rss,
+            "budget_bytes": self.budget_bytes or None,
+            "high_watermark_bytes": self.high_watermark_bytes or None,
+            "pressure": "high" if self.is_high(rss) else "ok",
+            "chroma_cache_limit_bytes": chroma_cache_limit_bytes() or None,
+            "caches": {
+                "session_contexts": len(session_context_cache),
+                "indexer": indexer.cache_stats() if indexer is not None and indexer.is_initialized else None,
+            },
+            "releases": self.releases,
+            "last_release": self.last_release,
+            "throttled": self.throttled,
+            "throttle_seconds": round(self.throttle_seconds, 3),
+        }
+
+    async def start(self):
+        """Start checking memory every MEMORY_CHECK_INTERVAL_SECONDS"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._schedule())
+
+    async def stop(self):
+        """Stop the memory checks"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _schedule(self):
+        """Background loop sampling RSS and releasing memory when it is high"""
+        while True:
+            await asyncio.sleep(settings.MEMORY_CHECK_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(self.check)
+            except Exception as e:
+                logger.error("Error while checking memory: %s", e)
+
+
+memory_governor = MemoryGovernor()
@@ -0,0 +1,259 @@
+import asyncio
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from src.config import settings
+from src.services.database import DatabaseService
+from src.utils.logger import logger
+
+
+def _is_transient(error: sqlite3.OperationalError) -> bool:
+    """Lock contention, which goes away on a later flush"""
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class MessageLog:
+    """
+    Write-behind buffer for chat messages.
+
+    Messages are kept in memory and written in batched transactions, either
+    when MESSAGE_FLUSH_BATCH_SIZE messages are waiting or after
+    MESSAGE_FLUSH_INTERVAL seconds. Each flush inserts all buffered messages
+    and updates `sessions.last_updated` once per session, under one commit.
+
+    Until `start()` is called (e.g. in scripts) every append is written
+    through immediately: inline without an event loop, otherwise on the
+    database thread so the loop is not blocked on SQLite.
+
+    A batch that fails because the database is locked or busy is retried
+    on the next flushes, up to MESSAGE_FLUSH_MAX_ATTEMPTS times. Any other
+    error is retried message by message once, so a single bad row does not
+    hold back the rest. Messages that still fail are dropped and their ids
+    logged.
+    """
+
+    def __init__(self):
+        self.db = DatabaseService()
+        self._lock = threading.Lock()  # Guards _pending and _in_flight
+        self._flush_lock = threading.Lock()  # Serializes flushes
+        self._pending: List[Dict] = []
+        self._in_flight: List[Dict] = []
+        self._attempts: Dict[str, int] = {}  # Failed flushes per message_id, only for retried messages
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._write_through: Set[asyncio.Task] = set()
+
+    def append(self, session_id: str, role: str, content: str, metadata: str = None) -> str:
+        """
+        Buffer a message for persistence
+
+        Args:
+            session_id: Session the message belongs to
+            role: Message author role (user/assistant)
+            content: Message text
+            metadata: Optional serialized metadata
+
+        Returns:
+            str: The id assigned to the message
+        """
+        message = {
+            "message_id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "timestamp": datetime.utcnow(),
+            "metadata": metadata,
+        }
+        with self._lock:
+            self._pending.append(message)
+            buffered = len(self._pending)
+
+        if self._task is None:
+            self._flush_through()
+        elif buffered >= settings.MESSAGE_FLUSH_BATCH_SIZE:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return message["message_id"]
+
+    def pending(self, session_id: str) -> List[Dict]:
+        """Messages for a session that are not yet committed, oldest first"""
+        with self._lock:
+            return [
+                message for message in self._in_flight + self._pending
+                if message["session_id"] == session_id
+            ]
+
+    def has_pending(self, session_id: str) -> bool:
+        """Check whether a session has messages that are not yet committed"""
+        return bool(self.pending(session_id))
+
+    def flush_sync(self) -> int:
+        """
+        Write all buffered messages in a single transaction
+
+        Returns:
+            int: Number of messages written
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._in_flight, self._pending = self._pending, []
+                batch = self._in_flight
+
+            try:
+                self._write(batch)
+            except sqlite3.OperationalError as e:
+                if not _is_transient(e):
+                    return self._write_individually(batch)
+                retry, dropped = [], []
+                for message in batch:
+                    attempts = self._attempts.get(message["message_id"], 0) + 1
+                    if attempts < settings.MESSAGE_FLUSH_MAX_ATTEMPTS:
+                        self._attempts[message["message_id"]] = attempts
+                        retry.append(message)
+                    else:
+                        self._attempts.pop(message["message_id"], None)
+                        dropped.append(message["message_id"])
+                if dropped:
+                    logger.error("Dropping %d chat messages after %d failed flushes: %s",
+                                 len(dropped), settings.MESSAGE_FLUSH_MAX_ATTEMPTS, dropped)
+                # Put the rest back so it is retried on the next flush
+                with self._lock:
+                    self._pending = retry + self._pending
+                    self._in_flight = []
+                raise
+            except Exception:
+                return self._write_individually(batch)
+
+            with self._lock:
+                self._in_flight = []
+            for message in batch:
+                self._attempts.pop(message["message_id"], None)
+            return len(batch)
+
+    def _write(self, batch: List[Dict]):
+        """Insert a batch of messages and touch their sessions in one transaction"""
+        # Coalesce last_updated to one UPDATE per session
+        last_updated: Dict[str, datetime] = {}
+        for message in batch:
+            last_updated[message["session_id"]] = message["timestamp"]
+
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO messages (message_id, session_id, role, content, timestamp, metadata)
+                VALUES (:message_id, :session_id, :role, :content, :timestamp, :metadata)
+                """,
+                batch
+            )
+            cursor.executemany(
+                """
+                UPDATE sessions SET last_updated = ? WHERE session_id = ?
+                """,
+                [(timestamp, session_id) for session_id, timestamp in last_updated.items()]
+            )
+            conn.commit()
+
+    def _write_individually(self, batch: List[Dict]) -> int:
+        """Write a failed batch one message per transaction, dropping the messages that fail"""
+        written = 0
+        failed = []
+        for message in batch:
+            try:
+                self._write([message])
+                written += 1
+            except Exception as e:
+                logger.error("Dropping chat message %s of session %s: %s",
+                             message["message_id"], message["session_id"], e)
+                failed.append(message["message_id"])
+            self._attempts.pop(message["message_id"], None)
+        with self._lock:
+            self._in_flight = []
+        if failed:
+            logger.error("Dropped %d of %d chat messages that could not be written: %s",
+                         len(failed), len(batch), failed)
+        return written
+
+    def _flush_through(self):
+        """Write through an append made while the flusher is not running"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop in this thread (scripts, database thread): nothing to block
+            self.flush_sync()
+            return
+        task = loop.create_task(self._flush_logged())
+        self._write_through.add(task)
+        task.add_done_callback(self._write_through.discard)
+
+    async def _flush_logged(self) -> int:
+        """Flush, logging instead of raising; failed messages stay buffered"""
+        try:
+            return await self.flush()
+        except Exception as e:
+            logger.error("Error flushing chat messages: %s", e)
+            return 0
+
+    async def flush(self) -> int:
+        """Flush buffered messages on the database thread"""
+        return await self.db.run(self.flush_sync)
+
+    async def start(self):
+        """Start the background flusher on the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flusher and write out anything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._write_through:
+            await asyncio.gather(*self._write_through)
+
+        # A locked database keeps the batch buffered; retry until it is written
+        # or flush_sync drops it after MESSAGE_FLUSH_MAX_ATTEMPTS
+        written = 0
+        while True:
+            try:
+                written += await self.flush()
+            except sqlite3.OperationalError as e:
+                logger.warning("Retrying final flush of chat messages: %s", e)
+                await asyncio.sleep(settings.MESSAGE_FLUSH_INTERVAL)
+                continue
+            with self._lock:
+                if not self._pending:
+                    break
+        logger.info("Message log stopped, flushed %d buffered messages", written)
+
+    async def _run(self):
+        """Flush on size trigger or after the flush interval"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.MESSAGE_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                written = await self.flush()
+                if written:
+                    logger.debug("Flushed %d chat messages", written, extra={"event": "message_log.flush"})
+            except Exception as e:
+                logger.error("Error flushing chat messages: %s", e)
+
+
+# Shared buffer so every ChatService in the process writes through one log
+message_log = MessageLog()
@@ -1,13 +1,17 @@
-from typing import Dict, List
+import asyncio
+from contextlib import aclosing
+import time
+from typing import Dict, List, Tuple
 from typing_extensions import Optional
 from src.utils.dependency import get_indexer
 from src.config import settings
 from src.utils.logger import logger
 from langchain_ollama import ChatOllama
-from langchain.chains import history_aware_retriever, create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from src.utils.logger import log_time
+from src.utils.metrics import span, RAG_TIME_TO_FIRST_TOKEN_SECONDS, RAG_TOKENS_PER_SECOND
 from datetime import datetime
 
 
@@ -66,56 +70,42 @@ class RAGService():
             chat_history: Previous chat interactions
         """
         start_time = datetime.now()
+        pipeline_start = time.perf_counter()
+        chunks_count = 0
         try:
-            logger.debug(f"Starting RAG pipeline for question: {question}")
-            logger.debug(f"File ID: {file_ids}")
-            logger.debug(f"Chat history length: {len(chat_history)}")
-
-            if not self.indexer.is_initialized:
-                self.indexer.initialize()
-
-            if not hasattr(self.indexer, 'vector_store') or self.indexer.vector_store is None:
-                raise ValueError("Vector store not properly initialized")
-
-            retriver = await self._create_retiver(file_ids)
-
-            st = datetime.now()
-            retriever_chain = history_aware_retriever.create_history_aware_retriever(
-                self.llm,
-                retriver,
-                self.context_prompt
-            )
-            logger.debug(f"History aware chain creation time: {(datetime.now() - st).total_seconds()}s")
-
-            st = datetime.now()
-            qa_chain = create_stuff_documents_chain(
-                self.llm,
-                self.qa_prompt,
+            # Questions are user content: log their size, not the text
+            logger.debug(
+                "Starting RAG pipeline: question_chars=%d files=%d history=%d",
+                len(question), len(file_ids or []), len(chat_history),
+                extra={"event": "rag.request"}
             )
-            rag_chain = create_retrieval_chain(retriever_chain, qa_chain)
-            logger.debug(f"Retrival chain creation time: {(datetime.now() - st).total_seconds()}s")
 
+            messages = await self._prepare_messages(question, chat_history, file_ids)
             processing_time = (datetime.now() - start_time).total_seconds()
 
             # Stream the response
-            logger.debug("Stated streaming")
-            st = datetime.now()
-            chunks_count = 0
-            async for chunk in rag_chain.astream({
-                "input": question,
-                "chat_history": chat_history,
-            }):
-                # logger.debug("Starting streaming.")
-                chunks_count += 1
-                if "answer" in chunk:
-                    # logger.debug(f"Streaming chunk {chunks_count}, Length: {len(chunk['answer'])}")
-                    yield {
-                        "answer": chunk["answer"],
-                        "processing_time": processing_time,
-                        "is_complete": False
-                    }
-
-            logger.debug(f"Stream time: {(datetime.now() - st).total_seconds()}s")
+            generation_start = time.perf_counter()
+            with span("generation"):
+                # aclosing() makes sure the upstream LLM request is aborted when
+                # the consumer stops early (e.g. the client disconnected)
+                async with aclosing(self.llm.astream(messages)) as answer_stream:
+                    async for chunk in answer_stream:
+                        if not chunk.content:
+                            continue
+                        if chunks_count == 0:
+                            RAG_TIME_TO_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - pipeline_start)
+                        chunks_count += 1
+                        yield {
+                            "answer": chunk.content,
+                            "processing_time": processing_time,
+                            "is_complete": False
+                        }
+
+            generation_time = time.perf_counter() - generation_start
+            if chunks_count and generation_time > 0:
+                RAG_TOKENS_PER_SECOND.observe(chunks_count / generation_time)
+            logger.debug("Stream time: %.3fs chunks=%d", generation_time, chunks_count,
+                         extra={"event": "rag.stream_done"})
 
             # Send final chunk indicating completion
             yield {
@@ -124,12 +114,16 @@ class RAGService():
                 "is_complete": True
             }
 
+        except asyncio.CancelledError:
+            logger.info("Streaming cancelled after %d chunks", chunks_count, extra={"event": "rag.cancelled"})
+            raise
         except Exception as e:
-            logger.error(f"Error generating streaming response: {str(e)}")
+            logger.error("Error generating streaming response: %s", e)
             yield {
                 "answer": "Error while processing your question.",
                 "processing_time": (datetime.now() - start_time).total_seconds(),
-                "is_complete": True
+                "is_complete": True,
+                "error": str(e)
             }
 
     @log_time
@@ -151,59 +145,180 @@ class RAGService():
         try:
             chat_history = chat_history or []
 
-            if not self.indexer.is_initialized:
-                self.indexer.initialize()
-
-            # Verify vector store is initialized
-            if not hasattr(self.indexer, 'vector_store') or self.indexer.vector_store is None:
-                raise ValueError("Vector store not properly initialized")
-
-            retriver = await self._create_retiver(file_ids)
-
-            # Create Retrieval chain
-            retriever_chain = history_aware_retriever.create_history_aware_retriever(
-                self.llm,
-                retriver,
-                self.context_prompt
-            )
-
-            qa_chain = create_stuff_documents_chain(
-                self.llm,
-                self.qa_prompt,
-            )
-            rag_chain = create_retrieval_chain(retriever_chain, qa_chain)
+            messages = await self._prepare_messages(question, chat_history, file_ids)
 
             # Generate final response
-            response = rag_chain.invoke({
-                "input": question,
-                "chat_history": chat_history,
-            })
+            with span("generation"):
+                response = await self.llm.ainvoke(messages)
 
             processing_time = (datetime.now() - start_time).total_seconds()
 
             return {
-                "answer": response.get("answer", "Failed to generate an answer."),
+                "answer": response.content or "Failed to generate an answer.",
                 "processing_time": processing_time,
             }
 
         except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
+            logger.error("Error generating response: %s", e)
             return {
                 "answer": "Error while processing your question.",
                 "sources": [],
                 "processing_time": (datetime.now() - start_time).total_seconds()
             }
 
-    @log_time
-    async def _create_retiver(self, file_ids: Optional[List[str]] = None):
-        search_kwargs = {
-            "k": 3
+    async def generate_batch(
+        self,
+        questions: List[str],
+        file_ids: Optional[List[str]] = None,
+        k: int = 3,
+        concurrency: int = 4
+    ) -> Dict:
+        """
+        Answer independent questions over the same files, without chat history
+
+        All questions are embedded in one call and searched in one vector
+        store query; generations then run through a pool of `concurrency`
+        LLM calls. A failing question is reported in its item and does not
+        fail the batch.
+
+        Args:
+            questions: Questions to answer
+            file_ids: Optional file ids to restrict retrieval to
+            k: Chunks retrieved per question
+            concurrency: LLM generations in flight
+
+        Returns:
+            Dict: "items" in question order with per-item timings, plus
+            batch-wide embedding, search and processing times
+        """
+        batch_start = time.perf_counter()
+        if not self.indexer.is_initialized:
+            await asyncio.to_thread(self.indexer.initialize)
+        if self.indexer.embedding_model is None:
+            raise RuntimeError("Embedding model is not initialized properly.")
+
+        with span("embedding"):
+            embeddings = await self.indexer.embedding_model.aembed_documents(questions)
+        embedding_time = time.perf_counter() - batch_start
+
+        search_start = time.perf_counter()
+        with span("vector_search"):
+            hits = await asyncio.to_thread(self._search, embeddings, k, file_ids)
+        search_time = time.perf_counter() - search_start
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def answer(index: int) -> Dict:
+            queued = time.perf_counter()
+            documents = [document for document, _ in hits[index]]
+            item = {"index": index, "question": questions[index], "chunks": len(documents)}
+            async with semaphore:
+                generation_start = time.perf_counter()
+                try:
+                    messages = self.qa_prompt.format_messages(
+                        context="\n\n".join(doc.page_content for doc in documents),
+                        chat_history=[],
+                        input=questions[index]
+                    )
+                    with span("generation"):
+                        response = await self.llm.ainvoke(messages)
+                    item["answer"] = response.content or "Failed to generate an answer."
+                except Exception as e:
+                    logger.error("Error answering batch question %d: %s", index, e)
+                    item["error"] = str(e)
+                finished = time.perf_counter()
+            item.update(
+                queue_time=round(generation_start - queued, 6),
+                generation_time=round(finished - generation_start, 6),
+                total_time=round(finished - batch_start, 6)
+            )
+            return item
+
+        items = await asyncio.gather(*(answer(i) for i in range(len(questions))))
+        return {
+            "items": items,
+            "failed": sum(1 for item in items if "error" in item),
+            "embedding_time": round(embedding_time, 6),
+            "search_time": round(search_time, 6),
+            "processing_time": round(time.perf_counter() - batch_start, 6),
         }
-        if file_ids:
-            search_kwargs["filter"] = {"file_id": {"$in": file_ids}}
 
-        retriever = self.indexer.vector_store.as_retriever(
-            search_type="similarity",
-            search_kwargs=search_kwargs
-        )
-        return retriever
+    async def _prepare_messages(
+        self,
+        question: str,
+        chat_history: List[Dict],
+        file_ids: Optional[List[str]] = None
+    ) -> List[BaseMessage]:
+        """
+        Run the retrieval half of the pipeline and build the answer prompt
+
+        Stages (each timed in rag_stage_seconds):
+            rewrite: condense question + history into a standalone query
+            embedding: embed the standalone query
+            vector_search: fetch the closest chunks for the session's files
+            prompt_assembly: stuff the chunks into the QA prompt
+        """
+        if not self.indexer.is_initialized:
+            self.indexer.initialize()
+
+        if not hasattr(self.indexer, 'vector_store') or self.indexer.vector_store is None:
+            raise ValueError("Vector store not properly initialized")
+
+        query = await self._rewrite_question(question, chat_history)
+        documents = await self._retrieve(query, file_ids)
+
+        with span("prompt_assembly"):
+            context = "\n\n".join(doc.page_content for doc in documents)
+            messages = self.qa_prompt.format_messages(
+                context=context,
+                chat_history=chat_history,
+                input=question
+            )
+        return messages
+
+    async def _rewrite_question(self, question: str, chat_history: List[Dict]) -> str:
+        """Create a standalone question from the chat history (skipped without history)"""
+        if not chat_history:
+            return question
+
+        with span("rewrite"):
+            response = await self.llm.ainvoke(
+                self.context_prompt.format_messages(chat_history=chat_history, input=question)
+            )
+        return response.content or question
+
+    async def _retrieve(self, query: str, file_ids: Optional[List[str]] = None, k: int = 3) -> List[Document]:
+        """Embed the query and search the vector store, optionally limited to file_ids"""
+        if not self.indexer.is_initialized:
+            # First request before the startup warm-up finished
+            await asyncio.to_thread(self.indexer.initialize)
+        if self.indexer.embedding_model is None:
+            raise RuntimeError("Embedding model is not initialized properly.")
+
+        with span("embedding"):
+            embedding = await self.indexer.embedding_model.aembed_query(query)
+
+        with span("vector_search"):
+            hits = await asyncio.to_thread(self._search, [embedding], k, file_ids)
+        return [document for document, _ in hits[0]]
+
+    def _search(
+        self,
+        embeddings: List[List[float]],
+        k: int,
+        file_ids: Optional[List[str]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Vector search for the chat pipeline
+
+        With at least RETRIEVAL_FANOUT_MIN_FILES files, a single file may
+        contribute at most RETRIEVAL_FANOUT_PER_FILE_K of the k results, so
+        a few files cannot take them all. Files crowded out of the first
+        candidates are searched again; see Indexer.search_by_vectors_capped.
+        """
+        fanout = settings.RETRIEVAL_FANOUT_MIN_FILES
+        if file_ids and fanout and len(file_ids) >= fanout:
+            return self.indexer.search_by_vectors_capped(
+                embeddings, k, file_ids, settings.RETRIEVAL_FANOUT_PER_FILE_K, settings.RETRIEVAL_FANOUT_OVERFETCH
+            )
+        return self.indexer.search_by_vectors(embeddings, k, file_ids)
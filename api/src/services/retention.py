@@ -0,0 +1,323 @@
+import asyncio
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set, TYPE_CHECKING
+from src.config import settings
+from src.services.database import DatabaseService
+from src.services.message_log import message_log
+from src.services.session import session_context_cache
+from src.utils.dependency import get_indexer
+from src.utils.logger import logger
+
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
+
+def _directory_size(path: Path) -> int:
+    """Total size in bytes of all files below path"""
+    if not path.exists():
+        return 0
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+class RetentionService:
+    """
+    Expires idle sessions, garbage-collects orphaned vectors and compacts
+    the session database.
+
+    A run:
+        1. archives (optionally) and deletes sessions idle for longer than
+           SESSION_TTL_DAYS, together with their files and messages
+        2. deletes chunks from the vector store whose file_id no longer
+           belongs to any live session, is not recorded by a bulk ingest
+           run and is not pinned (e.g. imported from a snapshot)
+        3. runs an incremental VACUUM to return freed pages to the OS
+    """
+
+    def __init__(self):
+        self.db = DatabaseService()
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> Dict:
+        """
+        Run one retention pass
+
+        Returns:
+            Dict: Report with counts and bytes reclaimed per store
+        """
+        start = time.perf_counter()
+
+        # Expire from committed state only
+        await message_log.flush()
+
+        db_size_before = await self.db.run(self._database_size)
+        expired = await self.db.run(self._expire_sessions)
+        for session_id in expired["session_ids"]:
+            session_context_cache.invalidate(session_id)
+
+        # Vector GC talks to Chroma, keep it off the database thread
+        vector_size_before = _directory_size(Path(settings.PERSIST_DIR))
+        live_file_ids = await self.db.run(self._live_file_ids)
+        vectors_deleted = await asyncio.to_thread(self._collect_vectors, live_file_ids)
+        vector_size_after = _directory_size(Path(settings.PERSIST_DIR))
+
+        await self.db.run(self._vacuum)
+        db_size_after = await self.db.run(self._database_size)
+
+        report = {
+            "sessions_expired": len(expired["session_ids"]),
+            "sessions_archived": len(expired["session_ids"]) if settings.RETENTION_ARCHIVE else 0,
+            "messages_deleted": expired["messages_deleted"],
+            "vectors_deleted": vectors_deleted,
+            "database_bytes_reclaimed": max(db_size_before - db_size_after, 0),
+            "vector_store_bytes_reclaimed": max(vector_size_before - vector_size_after, 0),
+            "duration": round(time.perf_counter() - start, 3),
+        }
+        logger.info("Retention run finished: %s", report, extra={"event": "retention.report", **report})
+        return report
+
+    def _database_size(self) -> int:
+        """Size of the session database in bytes"""
+        with self.db.get_connection() as conn:
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def _expire_sessions(self) -> Dict:
+        """Archive and delete sessions idle for longer than SESSION_TTL_DAYS"""
+        cutoff = datetime.utcnow() - timedelta(days=settings.SESSION_TTL_DAYS)
+
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            if settings.RETENTION_ARCHIVE:
+                # ATTACH is not allowed inside a transaction, so do it first
+                cursor.execute("ATTACH DATABASE ? AS archive", (settings.ARCHIVE_DB_NAME,))
+            try:
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS expired_sessions (session_id TEXT PRIMARY KEY)")
+                cursor.execute("DELETE FROM expired_sessions")
+                cursor.execute(
+                    "INSERT INTO expired_sessions SELECT session_id FROM sessions WHERE last_updated < ?",
+                    (cutoff,)
+                )
+                session_ids = [row[0] for row in cursor.execute("SELECT session_id FROM expired_sessions")]
+                messages_deleted = 0
+
+                if session_ids:
+                    if settings.RETENTION_ARCHIVE:
+                        self._archive(cursor)
+
+                    cursor.execute("DELETE FROM messages WHERE session_id IN (SELECT session_id FROM expired_sessions)")
+                    messages_deleted = cursor.rowcount
+                    cursor.execute("DELETE FROM session_files WHERE session_id IN (SELECT session_id FROM expired_sessions)")
+                    cursor.execute("DELETE FROM sessions WHERE session_id IN (SELECT session_id FROM expired_sessions)")
+
+                # Archive copy and deletes commit together
+                conn.commit()
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                if settings.RETENTION_ARCHIVE:
+                    cursor.execute("DETACH DATABASE archive")
+
+        return {"session_ids": session_ids, "messages_deleted": messages_deleted}
+
+    def _archive(self, cursor: sqlite3.Cursor):
+        """Copy the sessions listed in expired_sessions into the attached archive database"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archive.sessions (
+                session_id TEXT PRIMARY KEY,
+                created_at TIMESTAMP,
+                last_updated TIMESTAMP,
+                archived_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archive.session_files (
+                session_id TEXT,
+                file_id TEXT,
+                added_at TIMESTAMP,
+                PRIMARY KEY (session_id, file_id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archive.messages (
+                message_id TEXT PRIMARY KEY,
+                session_id TEXT,
+                role TEXT,
+                content TEXT,
+                timestamp TIMESTAMP,
+                metadata TEXT
+            )
+        ''')
+
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO archive.sessions (session_id, created_at, last_updated, archived_at)
+            SELECT session_id, created_at, last_updated, ?
+            FROM main.sessions WHERE session_id IN (SELECT session_id FROM expired_sessions)
+            """,
+            (datetime.utcnow(),)
+        )
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO archive.session_files (session_id, file_id, added_at)
+            SELECT session_id, file_id, added_at
+            FROM main.session_files WHERE session_id IN (SELECT session_id FROM expired_sessions)
+            """
+        )
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO archive.messages (message_id, session_id, role, content, timestamp, metadata)
+            SELECT message_id, session_id, role, content, timestamp, metadata
+            FROM main.messages WHERE session_id IN (SELECT session_id FROM expired_sessions)
+            """
+        )
+
+    def pin_files(self, file_ids: List[str], source: str) -> int:
+        """
+        Keep the chunks of these files through vector GC, whether or not a session references them
+
+        Args:
+            file_ids: Files to pin
+            source: What the chunks came from, e.g. "snapshot"
+
+        Returns:
+            int: Number of files pinned
+        """
+        with self.db.get_connection() as conn:
+            current_time = datetime.utcnow()
+            conn.executemany(
+                "INSERT OR REPLACE INTO pinned_files (file_id, source, pinned_at) VALUES (?, ?, ?)",
+                [(file_id, source, current_time) for file_id in file_ids]
+            )
+            conn.commit()
+        return len(file_ids)
+
+    def unpin_files(self, file_ids: List[str]) -> int:
+        """
+        Let vector GC collect these files again once no session references them
+
+        Returns:
+            int: Number of files unpinned
+        """
+        with self.db.get_connection() as conn:
+            cursor = conn.executemany("DELETE FROM pinned_files WHERE file_id = ?", [(f,) for f in file_ids])
+            conn.commit()
+            return cursor.rowcount
+
+    def _live_file_ids(self) -> Set[str]:
+        """File ids referenced by a session, a bulk ingest checkpoint or a pin"""
+        with self.db.get_connection() as conn:
+            return {
+                row[0] for row in conn.execute(
+                    """
+                    SELECT file_id FROM session_files
+                    UNION SELECT file_id FROM ingest_files WHERE status = 'done' AND file_id IS NOT NULL
+                    UNION SELECT file_id FROM pinned_files
+                    """
+                )
+            }
+
+    def _collect_vectors(self, live_file_ids: Set[str]) -> int:
+        """
+        Delete chunks whose file_id is not referenced by any session, bulk
+        ingest checkpoint or pin. Chunks without a file_id are never deleted.
+
+        Chunks uploaded within VECTOR_GC_GRACE_SECONDS are kept, since the
+        upload route indexes a file before it links it to a session. Every
+        partition is collected by chunk id. Partitions are never dropped:
+        another worker may write to one between the scan and the drop, and
+        with group partitioning that would delete a fresh upload.
+
+        Returns:
+            int: Number of chunks deleted
+        """
+        indexer = get_indexer()
+        if indexer.vector_store is None:
+            return 0
+
+        deleted = 0
+        for store in indexer.vector_stores():
+            deleted += self._collect_store(store, live_file_ids)
+        return deleted
+
+    def _collect_store(self, store: "Chroma", live_file_ids: Set[str]) -> int:
+        grace_cutoff = time.time() - settings.VECTOR_GC_GRACE_SECONDS
+        orphan_ids: List[str] = []
+        offset = 0
+        while True:
+            batch = store.get(
+                include=["metadatas"],
+                limit=settings.VECTOR_GC_BATCH_SIZE,
+                offset=offset
+            )
+            ids = batch.get("ids") or []
+            if not ids:
+                break
+            for chunk_id, metadata in zip(ids, batch.get("metadatas") or []):
+                metadata = metadata or {}
+                if not metadata.get("file_id") or metadata["file_id"] in live_file_ids:
+                    continue
+                if metadata.get("upload_timestamp", 0) > grace_cutoff:
+                    continue
+                orphan_ids.append(chunk_id)
+            offset += len(ids)
+
+        for i in range(0, len(orphan_ids), settings.VECTOR_GC_BATCH_SIZE):
+            store.delete(ids=orphan_ids[i:i + settings.VECTOR_GC_BATCH_SIZE])
+        return len(orphan_ids)
+
+    def _vacuum(self):
+        """Return free pages to the OS with an incremental VACUUM"""
+        conn = sqlite3.connect(self.db.db_path, isolation_level=None, timeout=settings.SQLITE_BUSY_TIMEOUT)
+        try:
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if auto_vacuum != 2:
+                # Switching to incremental mode needs one full VACUUM to take effect
+                logger.info("Enabling incremental auto_vacuum on the session database")
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+            else:
+                conn.execute("PRAGMA incremental_vacuum").fetchall()
+        finally:
+            conn.close()
+
+    async def start(self):
+        """Start running retention every RETENTION_INTERVAL_HOURS"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._schedule())
+
+    async def stop(self):
+        """Stop the retention schedule"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.db.run(self.db.release_lease, "retention")
+
+    async def _schedule(self):
+        """
+        Background loop for scheduled retention runs
+
+        Every API process runs the loop, but only the holder of the
+        "retention" lease runs retention, so `serve --workers N` expires
+        sessions and collects vectors once.
+        """
+        interval = settings.RETENTION_INTERVAL_HOURS * 3600
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self.db.run(self.db.acquire_lease, "retention", interval * 2):
+                    logger.debug("Retention runs in another process")
+                    continue
+                await self.run()
+            except Exception as e:
+                logger.error("Error while running retention: %s", e)
+
+
+retention_service = RetentionService()
@@ -1,8 +1,30 @@
+import json
 import uuid
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional
+from src.config import settings
+from src.utils.cache import TTLCache
 from src.utils.logger import logger
 from src.services.database import DatabaseService
+from src.services.message_log import message_log
+
+
+@dataclass
+class SessionContext:
+    """Everything a chat request needs to know about its session"""
+    session_id: str
+    created_at: str
+    last_updated: str
+    file_ids: List[str] = field(default_factory=list)
+    chat_history: List[Dict] = field(default_factory=list)
+
+
+# Hot session contexts, invalidated on uploads and message saves
+session_context_cache = TTLCache(
+    maxsize=settings.SESSION_CACHE_SIZE,
+    ttl=settings.SESSION_CACHE_TTL
+)
 
 
 class SessionService:
@@ -18,12 +40,28 @@ class SessionService:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                INSERT INTO sessions (session_id, created_at, last_updated, file_id)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO sessions (session_id, created_at, last_updated)
+                VALUES (?, ?, ?)
                 """,
-                (session_id, current_time, current_time, file_id)
+                (session_id, current_time, current_time)
             )
+            if file_id:
+                cursor.execute(
+                    """
+                    INSERT INTO session_files (session_id, file_id, added_at)
+                    VALUES (?, ?, ?)
+                    """,
+                    (session_id, file_id, current_time)
+                )
             conn.commit()
+
+        # A brand-new session is about to be used, so prime the cache
+        session_context_cache.set(session_id, SessionContext(
+            session_id=session_id,
+            created_at=str(current_time),
+            last_updated=str(current_time),
+            file_ids=[file_id] if file_id else []
+        ))
         return session_id
 
     def insert_file_id(self, session_id: str, file_id: str):
@@ -33,19 +71,26 @@ class SessionService:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                INSERT INTO sessions (session_id, created_at, last_updated, file_id)
-                VALUES (?, ?, ?, ?)
+                INSERT OR IGNORE INTO session_files (session_id, file_id, added_at)
+                VALUES (?, ?, ?)
+                """,
+                (session_id, file_id, current_time)
+            )
+            cursor.execute(
+                """
+                UPDATE sessions SET last_updated = ? WHERE session_id = ?
                 """,
-                (session_id, current_time, current_time, file_id)
+                (current_time, session_id)
             )
             conn.commit()
+        session_context_cache.invalidate(session_id)
 
     def get_session(self, session_id: str) -> dict:
         """Get session details"""
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "SELECT * FROM sessions WHERE session_id = ?",
+                "SELECT session_id, created_at, last_updated FROM sessions WHERE session_id = ?",
                 (session_id,)
             )
             session = cursor.fetchone()
@@ -58,10 +103,108 @@ class SessionService:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    "SELECT file_id FROM sessions WHERE session_id = ?",
+                    "SELECT file_id FROM session_files WHERE session_id = ? ORDER BY added_at",
                     (session_id,)
                 )
                 file_ids = [row[0] for row in cursor.fetchall()]
             return file_ids
         except Exception as e:
-            logger.debug(f"Error getting file id: {str(e)}")
+            logger.debug("Error getting file id: %s", e)
+
+    def load_context(self, session_id: str) -> Optional[SessionContext]:
+        """
+        Load the session row, its file ids and the recent history window
+        over a single connection
+
+        Args:
+            session_id: Session to load
+
+        Returns:
+            Optional[SessionContext]: None if the session does not exist
+        """
+        # Snapshot unflushed messages before querying, see ChatService.get_chat_history
+        pending = message_log.pending(session_id)
+
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT s.session_id, s.created_at, s.last_updated,
+                       (SELECT json_group_array(f.file_id) FROM session_files f
+                        WHERE f.session_id = s.session_id)
+                FROM sessions s
+                WHERE s.session_id = ?
+                """,
+                (session_id,)
+            )
+            session = cursor.fetchone()
+            if session is None:
+                return None
+
+            cursor.execute(
+                """
+                SELECT message_id, role, content FROM (
+                    SELECT message_id, role, content, timestamp FROM messages
+                    WHERE session_id = ?
+                    ORDER BY timestamp DESC
+                    LIMIT ?
+                )
+                ORDER BY timestamp ASC
+                """,
+                (session_id, settings.CHAT_HISTORY_WINDOW)
+            )
+            messages = cursor.fetchall()
+
+        stored_ids = {msg[0] for msg in messages}
+        chat_history = [{"role": msg[1], "content": msg[2]} for msg in messages]
+        chat_history.extend(
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in pending if msg["message_id"] not in stored_ids
+        )
+
+        return SessionContext(
+            session_id=session[0],
+            created_at=session[1],
+            last_updated=session[2],
+            file_ids=json.loads(session[3]) if session[3] else [],
+            chat_history=chat_history[-settings.CHAT_HISTORY_WINDOW:]
+        )
+
+    async def acreate_session(self, file_id: str = None) -> str:
+        """Async version of create_session"""
+        return await self.db.run(self.create_session, file_id)
+
+    async def ainsert_file_id(self, session_id: str, file_id: str):
+        """Async version of insert_file_id"""
+        return await self.db.run(self.insert_file_id, session_id, file_id)
+
+    async def aget_session(self, session_id: str) -> dict:
+        """Async version of get_session"""
+        return await self.db.run(self.get_session, session_id)
+
+    async def aget_file_id(self, session_id: str) -> List[str]:
+        """Async version of get_file_id"""
+        return await self.db.run(self.get_file_id, session_id)
+
+    async def aload_context(self, session_id: str) -> Optional[SessionContext]:
+        """
+        Get the session context, served from the session cache when hot
+
+        A context loaded while the session was invalidated (e.g. a message
+        saved or a file linked meanwhile) is returned but not cached.
+
+        Args:
+            session_id: Session to load
+
+        Returns:
+            Optional[SessionContext]: None if the session does not exist
+        """
+        context = session_context_cache.get(session_id)
+        if context is not None:
+            return context
+
+        generation = session_context_cache.generation()
+        context = await self.db.run(self.load_context, session_id)
+        if context is not None:
+            session_context_cache.set(session_id, context, generation=generation)
+        return context
@@ -0,0 +1,217 @@
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.config import settings
+from src.services.embeddings import embedding_model_name
+from src.services.indexer import Indexer
+from src.utils.logger import logger
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.parquet"
+
+_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("collection", pa.string()),
+    ("file_id", pa.string()),
+    ("document", pa.string()),
+    ("metadata", pa.string()),  # JSON, chunk metadata keys differ between sources
+])
+
+
+class SnapshotService:
+    """
+    Exports the vector store to a portable snapshot and loads it back
+
+    A snapshot is a directory with:
+        embeddings.npy: float32 matrix, one row per chunk
+        chunks.parquet: id, collection, file_id, text and metadata per
+            chunk, row-aligned with embeddings.npy (zstd compressed)
+        manifest.json: format, embedding model and dimension, counts
+
+    Loading writes the stored embeddings straight into Chroma, so the
+    embedding model is never called. Sessions are not part of a snapshot:
+    the loaded file ids are pinned so vector GC keeps them, and chat reaches
+    them once they are linked to a session (load(session_id=...), or the
+    session database copied along). /search reaches them by file_ids.
+    """
+
+    def __init__(self, indexer: Optional[Indexer] = None):
+        self.indexer = indexer or Indexer()
+
+    def _ready_indexer(self) -> Indexer:
+        if not self.indexer.is_initialized:
+            self.indexer.initialize()
+        if not self.indexer.is_initialized or self.indexer.client is None:
+            raise RuntimeError("Vector Store is not initialized properly.")
+        return self.indexer
+
+    def export(self, directory: Path, batch_size: int = 1000) -> Dict:
+        """
+        Write every collection of the vector store to a snapshot
+
+        Args:
+            directory: Snapshot directory, created if missing; must not hold a snapshot
+            batch_size: Chunks read from Chroma at a time
+
+        Returns:
+            Dict: The manifest
+        """
+        indexer = self._ready_indexer()
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        if (directory / MANIFEST_FILE).exists():
+            raise ValueError(f"{directory} already contains a snapshot")
+
+        start = time.perf_counter()
+        collections = [indexer.client.get_collection(store._collection.name) for store in indexer.vector_stores()]
+        total = sum(collection.count() for collection in collections)
+
+        embeddings: Optional[np.ndarray] = None
+        row = 0
+        with pq.ParquetWriter(directory / CHUNKS_FILE, _SCHEMA, compression="zstd") as writer:
+            for collection in collections:
+                offset = 0
+                while True:
+                    batch = collection.get(
+                        include=["embeddings", "metadatas", "documents"],
+                        limit=batch_size,
+                        offset=offset
+                    )
+                    ids = batch.get("ids") or []
+                    if not ids:
+                        break
+                    vectors = np.asarray(batch["embeddings"], dtype=np.float32)
+                    if embeddings is None:
+                        # Sized up front and filled in place, the matrix is never held in memory
+                        embeddings = np.lib.format.open_memmap(
+                            directory / EMBEDDINGS_FILE, mode="w+", dtype=np.float32,
+                            shape=(total, vectors.shape[1])
+                        )
+                    embeddings[row:row + len(ids)] = vectors
+                    row += len(ids)
+
+                    metadatas = [metadata or {} for metadata in batch["metadatas"]]
+                    writer.write_table(pa.Table.from_pydict({
+                        "id": ids,
+                        "collection": [collection.name] * len(ids),
+                        "file_id": [metadata.get("file_id") for metadata in metadatas],
+                        "document": batch["documents"],
+                        "metadata": [json.dumps(metadata) for metadata in metadatas],
+                    }, schema=_SCHEMA))
+                    offset += len(ids)
+
+        if embeddings is None:
+            np.save(directory / EMBEDDINGS_FILE, np.zeros((0, 0), dtype=np.float32))
+            dimension = 0
+        else:
+            embeddings.flush()
+            dimension = embeddings.shape[1]
+            del embeddings
+        if row != total:
+            raise RuntimeError(f"Vector store changed during export ({row} chunks read, {total} expected)")
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "embedding_model": embedding_model_name(),
+            "dimension": dimension,
+            "chunks": total,
+            "collections": {collection.name: collection.count() for collection in collections},
+            "partitioning": settings.VECTOR_STORE_PARTITIONING,
+        }
+        (directory / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+        logger.info("Exported %d chunks to %s in %.2fs", total, directory, time.perf_counter() - start)
+        return manifest
+
+    def load(
+        self,
+        directory: Path,
+        batch_size: int = 1000,
+        force: bool = False,
+        session_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Bulk-load a snapshot into the vector store
+
+        Chunks are routed with the current VECTOR_STORE_PARTITIONING, not
+        the collections they were exported from, and upserted by id, so
+        loading the same snapshot twice is harmless. Their file ids are
+        pinned against vector GC.
+
+        Args:
+            directory: Snapshot directory
+            batch_size: Chunks written to Chroma at a time
+            force: Load even if the snapshot was made with another embedding model
+            session_id: Session to link the loaded files to, so chat can use them
+
+        Returns:
+            Dict: Chunks and files loaded, collections written, linked session and duration
+        """
+        from src.services.retention import RetentionService
+        from src.services.session import SessionService
+
+        directory = Path(directory)
+        manifest = json.loads((directory / MANIFEST_FILE).read_text())
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format: {manifest.get('format')}")
+        if manifest["embedding_model"] != embedding_model_name() and not force:
+            raise ValueError(
+                f"Snapshot embeddings come from {manifest['embedding_model']}, "
+                f"this node uses {embedding_model_name()}"
+            )
+
+        indexer = self._ready_indexer()
+        embeddings = np.load(directory / EMBEDDINGS_FILE, mmap_mode="r")
+        if embeddings.shape[0] != manifest["chunks"]:
+            raise ValueError("embeddings.npy does not match the manifest")
+
+        start = time.perf_counter()
+        batch_size = min(batch_size, indexer.client.get_max_batch_size())
+        default_name = indexer.vector_store._collection.name
+        collections: Dict[str, int] = {}
+        file_ids: Set[str] = set()
+        row = 0
+        for batch in pq.ParquetFile(directory / CHUNKS_FILE).iter_batches(batch_size=batch_size):
+            columns = batch.to_pydict()
+            vectors = embeddings[row:row + batch.num_rows]
+
+            routed: Dict[str, List[int]] = {}
+            file_ids.update(file_id for file_id in columns["file_id"] if file_id)
+            for i, file_id in enumerate(columns["file_id"]):
+                name = indexer.partition_name(file_id) if indexer.partitioned and file_id else default_name
+                routed.setdefault(name, []).append(i)
+            for name, rows in routed.items():
+                collection = indexer.collection(name)
+                collection.upsert(
+                    ids=[columns["id"][i] for i in rows],
+                    embeddings=np.ascontiguousarray(vectors[rows]),
+                    # Chroma rejects empty metadata dicts
+                    metadatas=[json.loads(columns["metadata"][i]) or None for i in rows],
+                    documents=[columns["document"][i] for i in rows]
+                )
+                collections[name] = collections.get(name, 0) + len(rows)
+            row += batch.num_rows
+
+        RetentionService().pin_files(sorted(file_ids), "snapshot")
+        if session_id is not None:
+            session_service = SessionService()
+            for file_id in sorted(file_ids):
+                session_service.insert_file_id(session_id, file_id)
+
+        duration = time.perf_counter() - start
+        logger.info("Loaded %d chunks of %d files from %s in %.2fs", row, len(file_ids), directory, duration)
+        return {
+            "chunks": row,
+            "files": len(file_ids),
+            "session_id": session_id,
+            "collections": collections,
+            "duration": round(duration, 3),
+            "chunks_per_second": round(row / duration, 1) if duration else 0.0,
+        }
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries also expire after a TTL.
+
+    Invalidations are versioned: a caller that loads a value outside the
+    cache takes generation() first and passes it to set(), which then
+    skips values whose key was invalidated while they were loading.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Args:
+            maxsize: Maximum number of entries kept; least recently used are evicted first
+            ttl: Seconds an entry stays valid after it was set
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Generation each recently invalidated key was invalidated at; keys
+        # pruned from it count as invalidated at _floor
+        self._clock = 0
+        self._floor = 0
+        self._invalidated: "OrderedDict[Hashable, int]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def generation(self) -> int:
+        """Current invalidation generation, to pass to set() after a load"""
+        with self._lock:
+            return self._clock
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> bool:
+        """
+        Insert or replace a value, evicting the least recently used entry if full
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            generation: generation() taken before the value was loaded; the
+                value is not cached if the key was invalidated since
+
+        Returns:
+            bool: The value was cached
+        """
+        if self.maxsize <= 0:
+            return False
+        with self._lock:
+            if generation is not None and self._invalidated.get(key, self._floor) > generation:
+                return False
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry and discard loads of it that are in progress"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._clock += 1
+            self._invalidated[key] = self._clock
+            self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.maxsize:
+                _, invalidated_at = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, invalidated_at)
+
+    def clear(self):
+        """Drop every entry and discard loads that are in progress"""
+        with self._lock:
+            self._data.clear()
+            self._clock += 1
+            self._floor = self._clock
+            self._invalidated.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -1,37 +1,137 @@
-from src.services.indexer import Indexer
-from typing import Optional
+import asyncio
+import hmac
+import threading
+from fastapi import Header, HTTPException
+from src.config import settings
+from src.utils.logger import logger
+from typing import Any, Callable, Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Imported lazily at runtime: these pull in LangChain and Chroma
+    from src.services.chat import ChatService
+    from src.services.document_version import DocumentVersionService
+    from src.services.indexer import Indexer
+    from src.services.rag import RAGService
+    from src.services.session import SessionService
+
+
+def _create_indexer() -> "Indexer":
+    from src.services.indexer import Indexer
+    return Indexer()
+
+
+def _create_rag_service() -> "RAGService":
+    from src.services.rag import RAGService
+    return RAGService()
+
+
+def _create_session_service() -> "SessionService":
+    from src.services.session import SessionService
+    return SessionService()
+
+
+def _create_chat_service() -> "ChatService":
+    from src.services.chat import ChatService
+    return ChatService()
+
+
+def _create_document_version_service() -> "DocumentVersionService":
+    from src.services.document_version import DocumentVersionService
+    return DocumentVersionService()
 
 
 class Dependency:
     """
-    Provider class that manages the lifecycle of the Indexer instance.
-    Implements the Singleton pattern to ensure only one Indexer instance exists.
+    Service container for the application.
+
+    Every service is a process-wide singleton built on first use, so
+    importing the app stays cheap and a failing service only fails the
+    routes that need it. The app lifespan calls startup() / shutdown().
     """
 
-    # Class variable to store the single instance of Indexer
-    _instance: Optional[Indexer] = None
+    _factories: Dict[str, Callable[[], Any]] = {
+        "indexer": _create_indexer,
+        "rag": _create_rag_service,
+        "session": _create_session_service,
+        "chat": _create_chat_service,
+        "versions": _create_document_version_service,
+    }
+    _services: Dict[str, Any] = {}
+    _lock = threading.RLock()
+    _warmup_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def get(cls, name: str) -> Any:
+        """
+        Get or create the named service
+
+        Args:
+            name: One of "indexer", "rag", "session", "chat", "versions"
+
+        Returns:
+            Any: The singleton instance
+        """
+        service = cls._services.get(name)
+        if service is not None:
+            return service
+        with cls._lock:
+            if name not in cls._services:
+                try:
+                    cls._services[name] = cls._factories[name]()
+                except Exception as e:
+                    raise Exception(f"Error initializing {name} service: {str(e)}")
+            return cls._services[name]
+
+    @classmethod
+    def loaded(cls, name: str) -> Optional[Any]:
+        """The named service if it has been created already, without creating it"""
+        return cls._services.get(name)
 
     @classmethod
-    def get_indexer_instance(cls) -> Indexer:
+    def get_indexer_instance(cls) -> "Indexer":
         """
         Get or create the Indexer instance.
-        This is a class method (note the @classmethod decorator) which means it operates
-        on the class itself rather than an instance.
+        The Indexer builds its embedding model and vector store on first use.
 
         Returns:
             Indexer: The singleton instance of the Indexer
         """
+        return cls.get("indexer")
+
+    @classmethod
+    async def startup(cls):
+        """
+        Prepare services when the server starts: migrate the database and,
+        with WARMUP_ON_STARTUP, build the heavy services in the background
+        so the server accepts requests right away.
+        """
+        from src.services.database import DatabaseService
+
+        database = DatabaseService()
+        await database.run(database.initialize)
+        if settings.WARMUP_ON_STARTUP:
+            cls._warmup_task = asyncio.create_task(asyncio.to_thread(cls._warmup))
+
+    @classmethod
+    def _warmup(cls):
         try:
-            if cls._instance is None:
-                cls._instance = Indexer()
-                if not cls._instance.is_initialized:
-                    cls._instance.initialize()
-            return cls._instance
+            cls.get("rag")
+            cls.get_indexer_instance().initialize()
+            logger.info("Services warmed up")
         except Exception as e:
-            raise Exception(f"Error initializing Indexer: {str(e)}")
+            logger.error("Error warming up services: %s", e)
+
+    @classmethod
+    async def shutdown(cls):
+        """Wait for a running warm-up and drop all service instances"""
+        if cls._warmup_task is not None:
+            await cls._warmup_task
+            cls._warmup_task = None
+        with cls._lock:
+            cls._services.clear()
 
 
-def get_indexer():
+def get_indexer() -> "Indexer":
     """
     Dependency provider function for FastAPI.
     This function is used with FastAPI's dependency injection system.
@@ -40,3 +140,41 @@ def get_indexer():
         Indexer: The singleton Indexer instance
     """
     return Dependency.get_indexer_instance()
+
+
+def get_rag_service() -> "RAGService":
+    """Dependency provider for the RAGService singleton"""
+    return Dependency.get("rag")
+
+
+def get_session_service() -> "SessionService":
+    """Dependency provider for the SessionService singleton"""
+    return Dependency.get("session")
+
+
+def get_chat_service() -> "ChatService":
+    """Dependency provider for the ChatService singleton"""
+    return Dependency.get("chat")
+
+
+def get_document_version_service() -> "DocumentVersionService":
+    """Dependency provider for the DocumentVersionService singleton"""
+    return Dependency.get("versions")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency guarding admin routes.
+    Admin routes are disabled unless settings.ADMIN_TOKEN is configured, and
+    callers must send it in the X-Admin-Token header.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin API is disabled."
+        )
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin token."
+        )
@@ -1,14 +1,27 @@
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
+import threading
 import time
 import asyncio
-from typing import Callable, Any
+from contextvars import ContextVar
+from typing import Callable, Any, Dict, Tuple
 import functools
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import datetime
 from src.config import settings
 
+# Request id of the request being handled, set by RequestContextMiddleware
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
 class CustomFormatter(logging.Formatter):
     """Custom formatter with colors for different log levels"""
 
@@ -25,6 +38,8 @@ class CustomFormatter(logging.Formatter):
     def format(self, record):
         # Add color to log level if it's a terminal output
         if hasattr(sys.stdout, 'isatty') and sys.stdout.isatty():
+            # Records are shared between handlers, so color a copy
+            record = logging.makeLogRecord(record.__dict__)
             record.levelname = (
                 f'{self.COLORS.get(record.levelname)}'
                 f'{record.levelname}'
@@ -32,13 +47,91 @@ class CustomFormatter(logging.Formatter):
             )
         return super().format(record)
 
+
+class JsonFormatter(logging.Formatter):
+    """Formatter emitting one JSON object per record, including `extra` fields"""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.module}:{record.lineno}",
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request id to every record"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Drop part of the DEBUG/INFO records on hot paths.
+
+    Records are grouped by their `event` extra, or by the unformatted
+    message template when none is given, so `logger.debug("x %s", a)` calls
+    from one line count as one message type. Per type:
+        - LOG_SAMPLE_RATES[event] keeps that fraction of records
+        - LOG_RATE_LIMIT_PER_SECOND caps how many records pass per second
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, sample_rates: Dict[str, float], rate_limit: float):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_limit = rate_limit
+        self._windows: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        event = getattr(record, "event", None)
+        key = event or str(record.msg)
+
+        rate = self.sample_rates.get(key) if event else None
+        if rate is not None and random.random() >= rate:
+            return False
+
+        if self.rate_limit > 0:
+            second = int(time.monotonic())
+            with self._lock:
+                window, count = self._windows.get(key, (second, 0))
+                if window != second:
+                    window, count = second, 0
+                if count >= self.rate_limit:
+                    return False
+                self._windows[key] = (window, count + 1)
+        return True
+
+
 def setup_logger(
     name: str = __name__,
     log_level: str = settings.LOG_LEVEL,
     log_dir: str = "logs"
 ) -> logging.Logger:
     """
-    Setup logger with both file and console handlers
+    Setup logger whose handlers run on a background thread
+
+    Records are put on a queue by a QueueHandler and written by a
+    QueueListener thread, so file and console I/O never runs on the
+    event loop. The file gets structured JSON lines; the console gets
+    colored text, or JSON when LOG_FORMAT is "json".
 
     Args:
         name (str): Logger name (typically __name__)
@@ -49,6 +142,10 @@ def setup_logger(
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, log_level))
 
+    # Add handlers to logger if they haven't been added
+    if logger.handlers:
+        return logger
+
     # Create logs directory if it doesn't exist
     log_path = Path(log_dir)
     log_path.mkdir(exist_ok=True)
@@ -57,17 +154,6 @@ def setup_logger(
     timestamp = datetime.datetime.now().strftime("%Y%m%d")
     log_file = log_path / f"app_{timestamp}.log"
 
-    # Create formatters
-    file_formatter = logging.Formatter(
-        fmt="%(asctime)s | %(levelname)-8s | %(name)s:%(lineno)d | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-
-    console_formatter = CustomFormatter(
-        fmt="%(asctime)s | %(levelname)-8s | %(name)s:%(lineno)d | %(message)s",
-        datefmt="%H:%M:%S"
-    )
-
     # File handler (Rotating file handler to manage log size)
     file_handler = RotatingFileHandler(
         log_file,
@@ -75,16 +161,29 @@ def setup_logger(
         backupCount=5,      # Keep 5 backup files
         encoding='utf-8'
     )
-    file_handler.setFormatter(file_formatter)
+    file_handler.setFormatter(JsonFormatter())
 
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(console_formatter)
-
-    # Add handlers to logger if they haven't been added
-    if not logger.handlers:
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+    if settings.LOG_FORMAT == "json":
+        console_handler.setFormatter(JsonFormatter())
+    else:
+        console_handler.setFormatter(CustomFormatter(
+            fmt="%(asctime)s | %(levelname)-8s | %(request_id)s | %(name)s:%(lineno)d | %(message)s",
+            datefmt="%H:%M:%S"
+        ))
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES, settings.LOG_RATE_LIMIT_PER_SECOND))
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    # Drain queued records on interpreter exit
+    atexit.register(listener.stop)
 
     return logger
 
@@ -92,6 +191,7 @@ def setup_logger(
 # Create default logger instance
 logger = setup_logger()
 
+
 def log_time(func: Callable) -> Callable:
     """Decorator to log function execution time"""
     @functools.wraps(func)
@@ -99,10 +199,11 @@ def log_time(func: Callable) -> Callable:
         start = time.perf_counter()
         try:
             result = await func(*args, **kwargs)
-            logger.info(f"{func.__name__} completed in {time.perf_counter() - start:.2f}s")
+            logger.info("%s completed in %.2fs", func.__name__, time.perf_counter() - start,
+                        extra={"event": "timing"})
             return result
         except Exception as e:
-            logger.error(f"{func.__name__} failed: {str(e)}")
+            logger.error("%s failed: %s", func.__name__, e)
             raise
 
     @functools.wraps(func)
@@ -110,10 +211,11 @@ def log_time(func: Callable) -> Callable:
         start = time.perf_counter()
         try:
             result = func(*args, **kwargs)
-            logger.info(f"{func.__name__} completed in {time.perf_counter() - start:.2f}s")
+            logger.info("%s completed in %.2fs", func.__name__, time.perf_counter() - start,
+                        extra={"event": "timing"})
             return result
         except Exception as e:
-            logger.error(f"{func.__name__} failed: {str(e)}")
+            logger.error("%s failed: %s", func.__name__, e)
             raise
 
     # Return appropriate wrapper based on whether the function is async or not
@@ -0,0 +1,227 @@
+import bisect
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from src.config import settings
+from src.utils.logger import logger, request_id_var
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # OpenTelemetry is optional, spans are still timed and logged without it
+    otel_trace = None
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Metric:
+    """Base class for labelled metrics rendered in Prometheus text format"""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{self._format_labels(key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram"""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts incl. +Inf, sum, count)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', repr(bound)))} {cumulative}")
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+RAG_STAGE_SECONDS = Histogram(
+    "rag_stage_seconds",
+    "Duration of RAG pipeline stages (rewrite, embedding, vector_search, prompt_assembly, generation)",
+    ["stage"]
+)
+RAG_TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "rag_time_to_first_token_seconds",
+    "Time from the start of the RAG pipeline to the first answer token"
+)
+RAG_TOKENS_PER_SECOND = Histogram(
+    "rag_tokens_per_second",
+    "Answer streaming rate in chunks per second",
+    buckets=(1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500)
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_seconds",
+    "Duration of document ingestion stages (read, parse, split, index)",
+    ["stage"]
+)
+DB_CALL_SECONDS = Histogram(
+    "db_call_seconds",
+    "Duration of database calls, including time queued for the database thread",
+    ["operation"]
+)
+HTTP_REQUESTS_TOTAL = Counter(
+    "http_requests_total",
+    "HTTP requests handled",
+    ["method", "route", "status"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "HTTP request duration until the response is fully sent",
+    ["method", "route"]
+)
+
+
+def render_prometheus() -> str:
+    """Render every registered metric in Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def span(name: str, histogram: Histogram = RAG_STAGE_SECONDS, **labels: str) -> Iterator[None]:
+    """
+    Time a block, record it in a histogram and emit a trace span
+
+    The duration is observed in `histogram` under `stage=name` (plus any
+    extra labels the histogram declares). With TRACING_ENABLED and
+    OpenTelemetry installed, an OTel span carrying the request id is
+    opened around the block as well.
+
+    Args:
+        name: Stage / span name
+        histogram: Histogram to record the duration in
+        **labels: Additional histogram labels and span attributes
+    """
+    request_id = request_id_var.get()
+    otel_span = None
+    if settings.TRACING_ENABLED and otel_trace is not None:
+        otel_span = otel_trace.get_tracer("rag-bot").start_as_current_span(
+            name,
+            attributes={"request.id": request_id, **labels}
+        )
+        otel_span.__enter__()
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        if "stage" in histogram.labelnames:
+            labels.setdefault("stage", name)
+        histogram.observe(duration, **labels)
+        if otel_span is not None:
+            otel_span.__exit__(None, None, None)
+        if settings.TRACING_ENABLED:
+            logger.debug("span=%s duration=%.4fs", name, duration, extra={"event": "span"})
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware that assigns every request an id and records HTTP metrics.
+
+    The id is taken from the X-Request-ID header when present, stored in
+    request_id_var for spans and logs, and echoed in the response headers.
+    Written as plain ASGI (not BaseHTTPMiddleware) so it does not buffer or
+    interfere with streaming responses and disconnect handling.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1") or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
+            if scope["type"] == "http":
+                route = getattr(scope.get("route"), "path", "unmatched")
+                HTTP_REQUESTS_TOTAL.inc(method=scope["method"], route=route, status=str(status["code"]))
+                HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"], route=route)
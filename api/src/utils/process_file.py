@@ -1,9 +1,22 @@
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_core.documents import Document
-from typing import List
+import hashlib
+import importlib
+from functools import lru_cache
+from typing import List, Type, TYPE_CHECKING
+from src.config import settings
 
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-def process_file(file_path: str, file_extension: str) -> List[Document]:
+
+@lru_cache(maxsize=None)
+def _loader_class(file_extension: str) -> Type:
+    """Import the document loader configured for an extension on first use"""
+    module_name, _, class_name = settings.SUPPORTED_FILE_TYPE[file_extension].rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def process_file(file_path: str, file_extension: str) -> List["Document"]:
     """
     Process different files and extract text content
 
@@ -12,15 +25,31 @@ def process_file(file_path: str, file_extension: str) -> List[Document]:
         file_extension (str): Extension of file
 
     Return:
-        str: Extracted text content
+        List[Document]: Extracted documents
     """
-    if file_extension == '.pdf':
-        return _process_pdf(file_path)
-    raise ValueError(f"Unsupported ectension: {file_extension}")
+    if file_extension not in settings.SUPPORTED_FILE_TYPE:
+        raise ValueError(f"Unsupported ectension: {file_extension}")
+    loader = _loader_class(file_extension)(file_path)
+    return loader.load()
+
+
+def create_text_splitter() -> "RecursiveCharacterTextSplitter":
+    """
+    Text splitter used for every indexing path (upload and bulk ingest)
+
+    Returns:
+        RecursiveCharacterTextSplitter: Splitter with CHUNK_SIZE / CHUNK_OVERLAP
+    """
+    from langchain_text_splitters.character import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP,
+        length_function=len,
+        separators=["\n\n", "\n", " ", ""]
+    )
 
 
-def _process_pdf(file_path: str) -> List[Document]:
-    """Extract text from PDF"""
-    loader = PyPDFLoader(file_path)
-    documents = loader.load()
-    return documents
+def chunk_hash(text: str) -> str:
+    """Content hash identifying a chunk across versions of a document"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,227 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import json
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from src.config import settings
+from src.utils.logger import logger, request_id_var
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+_EXTENSIONS = {"cprofile": ".pstats", "sampling": ".collapsed"}
+
+
+class StackSampler:
+    """
+    Sampling profiler over all threads
+
+    A background thread snapshots every thread's stack each `interval`
+    seconds, so work handed to executors (database thread, to_thread,
+    embedding batcher) shows up next to the event loop. Stacks are
+    aggregated in collapsed format ("thread;outer;...;inner count"),
+    which flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, path: Path):
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in self.samples.most_common()))
+
+
+def _profile_path(profile_id: str, suffix: str) -> Path:
+    return Path(settings.PROFILE_DIR) / f"{profile_id}{suffix}"
+
+
+def list_profiles() -> List[Dict]:
+    """Metadata of the stored profiles, newest first"""
+    profiles = []
+    for path in Path(settings.PROFILE_DIR).glob("*.json"):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda p: p.get("created_at", ""), reverse=True)
+
+
+def get_profile(profile_id: str) -> Optional[Dict]:
+    """Metadata of one profile, None if it does not exist"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = _profile_path(profile_id, ".json")
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def profile_file(profile: Dict) -> Path:
+    """Path of the raw profile data (pstats or collapsed stacks)"""
+    return _profile_path(profile["profile_id"], _EXTENSIONS[profile["mode"]])
+
+
+def render_profile(profile: Dict, sort: str = "cumulative", limit: int = 50) -> str:
+    """
+    Human readable summary of a profile
+
+    Args:
+        profile: Profile metadata
+        sort: pstats sort key for cProfile profiles (cumulative, tottime, calls)
+        limit: Number of functions / stacks to show
+
+    Returns:
+        str: pstats table, or the most frequent stacks with their share of samples
+    """
+    path = profile_file(profile)
+    if profile["mode"] == "cprofile":
+        out = io.StringIO()
+        stats = pstats.Stats(str(path), stream=out)
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    lines = path.read_text().splitlines()
+    total = sum(int(line.rsplit(" ", 1)[1]) for line in lines) or 1
+    out = [f"{total} samples"]
+    for line in lines[:limit]:
+        stack, count = line.rsplit(" ", 1)
+        out.append(f"{int(count) / total:7.2%}  {stack}")
+    return "\n".join(out) + "\n"
+
+
+def _prune_profiles():
+    """Delete the oldest profiles beyond PROFILE_MAX_FILES"""
+    for profile in list_profiles()[settings.PROFILE_MAX_FILES:]:
+        for suffix in (".json", *_EXTENSIONS.values()):
+            _profile_path(profile["profile_id"], suffix).unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling single requests on demand
+
+    A request to one of PROFILE_PATHS is profiled when it carries
+    `X-Profile: 1` together with a valid X-Admin-Token, or when it is
+    picked by PROFILE_SAMPLE_RATE. Only one request is profiled at a time;
+    others pass through untouched. The profile covers the whole response,
+    including streamed bodies, is stored in PROFILE_DIR and its id is
+    returned in the X-Profile-Id header.
+
+    cProfile only sees the event loop thread, and with concurrent traffic
+    it also sees other requests running on the loop. The sampling mode
+    covers all threads. The middleware is only installed when
+    PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._busy = asyncio.Lock()
+        Path(settings.PROFILE_DIR).mkdir(parents=True, exist_ok=True)
+
+    def _trigger(self, scope) -> Optional[str]:
+        """Why this request should be profiled, None if it should not"""
+        if scope["type"] != "http" or scope["path"] not in settings.PROFILE_PATHS:
+            return None
+
+        headers = dict(scope.get("headers") or [])
+        if headers.get(b"x-profile", b"").decode("latin-1") in ("1", "true"):
+            token = headers.get(b"x-admin-token", b"").decode("latin-1")
+            if settings.ADMIN_TOKEN and token and hmac.compare_digest(token, settings.ADMIN_TOKEN):
+                return "header"
+        if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope)
+        if trigger is None or self._busy.locked():
+            await self.app(scope, receive, send)
+            return
+
+        async with self._busy:
+            profile_id = uuid.uuid4().hex
+            status = {"code": 500}
+
+            async def send_with_profile_id(message):
+                if message["type"] == "http.response.start":
+                    status["code"] = message["status"]
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+                await send(message)
+
+            mode = settings.PROFILE_MODE
+            if mode == "sampling":
+                profiler = StackSampler(settings.PROFILE_SAMPLING_INTERVAL_MS / 1000)
+                profiler.start()
+            else:
+                mode = "cprofile"
+                profiler = cProfile.Profile()
+                profiler.enable()
+
+            start = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                if mode == "cprofile":
+                    profiler.disable()
+                else:
+                    profiler.stop()
+                profile = {
+                    "profile_id": profile_id,
+                    "mode": mode,
+                    "trigger": trigger,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status["code"],
+                    "request_id": request_id_var.get(),
+                    "duration": round(time.perf_counter() - start, 6),
+                    "created_at": datetime.utcnow().isoformat(),
+                }
+                try:
+                    await asyncio.to_thread(self._save, profiler, profile)
+                except Exception as e:
+                    logger.error("Error saving profile %s: %s", profile_id, e)
+
+    def _save(self, profiler, profile: Dict):
+        path = profile_file(profile)
+        if profile["mode"] == "cprofile":
+            profiler.dump_stats(str(path))
+        else:
+            profiler.dump(path)
+        _profile_path(profile["profile_id"], ".json").write_text(json.dumps(profile))
+        _prune_profiles()
+        logger.info("Stored %s profile %s for %s %s (%.3fs)", profile["mode"], profile["profile_id"],
+                    profile["method"], profile["path"], profile["duration"])
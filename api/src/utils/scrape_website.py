@@ -1,16 +1,20 @@
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_core.documents import Document
 from src.utils.logger import log_time
-from typing import List
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
 
 @log_time
-def load_website(url: str) -> List[Document]:
+def load_website(url: str) -> List["Document"]:
     """
         Parse the website and return list of documents
 
         Args:
             url: URL to be scraped
         """
+    # langchain_community is slow to import, load it with the first request
+    from langchain_community.document_loaders import WebBaseLoader
+
     loader = WebBaseLoader(url)
     return loader.load()
@@ -0,0 +1,155 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Union
+import orjson
+from src.config import settings
+from src.models.chat import StreamOptions
+from src.utils.logger import logger
+
+
+def dumps(obj) -> bytes:
+    """Serialize to JSON bytes"""
+    return orjson.dumps(obj)
+
+
+# Yielded by coalesce() when a stream has been idle for the heartbeat interval
+HEARTBEAT = object()
+
+_END = object()
+
+HEARTBEAT_FRAME = b": keep-alive\n\n"
+
+
+def resolve_stream_options(options: Optional[StreamOptions]) -> StreamOptions:
+    """Fill unset per-request stream options from settings"""
+    options = options or StreamOptions()
+    return StreamOptions(
+        coalesce_ms=settings.SSE_COALESCE_MS if options.coalesce_ms is None else options.coalesce_ms,
+        max_chars=settings.SSE_COALESCE_MAX_CHARS if options.max_chars is None else options.max_chars,
+        heartbeat_seconds=settings.SSE_HEARTBEAT_SECONDS if options.heartbeat_seconds is None else options.heartbeat_seconds,
+    )
+
+
+async def coalesce(
+    stream: AsyncIterator[str],
+    options: StreamOptions,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+) -> AsyncIterator[Union[str, object]]:
+    """
+    Batch text pieces from stream into larger chunks
+
+    A batch is emitted once it holds `max_chars` characters or its first
+    piece has waited `coalesce_ms`, whichever comes first. While no text
+    is buffered, HEARTBEAT is yielded every `heartbeat_seconds`.
+
+    The source is consumed by a separate task so that time-based flushes
+    and heartbeats happen even while the source is waiting on the LLM.
+    Closing this generator cancels that task, and so does a client
+    disconnect reported by `is_disconnected`: the CancelledError raised
+    inside the source lets it stop upstream generation and clean up.
+
+    Args:
+        stream: Source of text pieces (e.g. LLM tokens)
+        options: Resolved stream options, see resolve_stream_options
+        is_disconnected: Optional check polled every SSE_DISCONNECT_POLL_SECONDS
+
+    Yields:
+        Union[str, object]: Batched text, or HEARTBEAT
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    max_delay = options.coalesce_ms / 1000
+    heartbeat = options.heartbeat_seconds or None
+
+    async def pump():
+        try:
+            async for text in stream:
+                queue.put_nowait(text)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(_END)
+
+    async def watch():
+        while not pump_task.done():
+            await asyncio.sleep(settings.SSE_DISCONNECT_POLL_SECONDS)
+            if await is_disconnected():
+                logger.info("Client disconnected, cancelling stream")
+                pump_task.cancel()
+                return
+
+    pump_task = asyncio.create_task(pump())
+    # The watcher is its own task so it still fires if the server stops
+    # iterating this generator after a failed send.
+    watch_task = asyncio.create_task(watch()) if is_disconnected else None
+    getter: Optional[asyncio.Future] = None
+    buffer: List[str] = []
+    buffered = 0
+    deadline = 0.0
+
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(queue.get())
+            timeout = max(deadline - loop.time(), 0) if buffer else heartbeat
+            done, _ = await asyncio.wait({getter}, timeout=timeout)
+
+            if not done:
+                if buffer:
+                    yield "".join(buffer)
+                    buffer, buffered = [], 0
+                else:
+                    yield HEARTBEAT
+                continue
+
+            items = [getter.result()]
+            getter = None
+            # Take everything already queued without another wakeup
+            while not queue.empty():
+                items.append(queue.get_nowait())
+
+            for item in items:
+                if item is _END:
+                    if buffer:
+                        yield "".join(buffer)
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                if not item:
+                    continue
+                if not buffer:
+                    deadline = loop.time() + max_delay
+                buffer.append(item)
+                buffered += len(item)
+
+            if buffer and (buffered >= options.max_chars or max_delay <= 0):
+                yield "".join(buffer)
+                buffer, buffered = [], 0
+    finally:
+        if getter is not None:
+            getter.cancel()
+        pump_task.cancel()
+        if watch_task is not None:
+            watch_task.cancel()
+
+
+async def sse_frames(
+    stream: AsyncIterator[str],
+    options: Optional[StreamOptions] = None,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+) -> AsyncIterator[bytes]:
+    """
+    Turn a stream of answer text into coalesced SSE frames
+
+    Each frame carries `{"answer": <text>}`; idle streams get `: keep-alive`
+    comments so proxies do not drop the connection.
+
+    Args:
+        stream: Source of answer text pieces
+        options: Optional per-request stream options
+        is_disconnected: Optional client disconnect check, e.g. Request.is_disconnected
+    """
+    async for item in coalesce(stream, resolve_stream_options(options), is_disconnected):
+        if item is HEARTBEAT:
+            yield HEARTBEAT_FRAME
+        else:
+            yield b"data: " + dumps({"answer": item}) + b"\n\n"